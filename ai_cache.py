@@ -0,0 +1,306 @@
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+import streamlit as st
+from PIL import Image
+
+from utils import cache_path
+
+# --- PERSISTENT AI RESPONSE CACHE ---
+# SQLite file under .cache/ so answers survive redeploys and are shared by every
+# worker process on the host (WAL mode allows concurrent readers + one writer).
+# Entries expire by TTL and the file is kept under MAX_BYTES by evicting the
+# least recently used rows.
+
+CACHE_FILE = "ai_responses.sqlite3"
+DEFAULT_TTL = int(os.getenv("AI_CACHE_TTL", str(24 * 3600)))
+MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+EVICT_TO = 0.9  # after eviction the cache holds at most 90% of MAX_BYTES
+
+# Vision prompts are matched by a 256-bit difference hash (dHash) of the
+# downscaled image; uploads within this many differing bits count as the same
+# photo (re-encodes, resizes, small crops by the phone's gallery app).
+HASH_SIZE = 16
+VISION_MAX_DISTANCE = 10
+
+# Model name used when the router picks the model: answers from any model in the
+# chain are interchangeable for caching purposes.
+AUTO_MODEL = "auto"
+
+
+def normalize_prompt(prompt):
+    """
+    Collapses whitespace so re-indented f-string prompts hash the same.
+    Returns None for prompts that can't be cached as text (e.g. images).
+    """
+    if isinstance(prompt, (list, tuple)):
+        if not all(isinstance(part, str) for part in prompt):
+            return None
+        prompt = "\n".join(prompt)
+    if not isinstance(prompt, str):
+        return None
+    return " ".join(prompt.split())
+
+
+def image_fingerprint(img):
+    """
+    Perceptual dHash of the image as a hex string (HASH_SIZE**2 bits).
+    Memoised on prepared images (see image_prep.prepare_image).
+    """
+    if "fingerprint" in img.info:
+        return img.info["fingerprint"]
+    small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.BILINEAR, reducing_gap=2.0)
+    px = list(small.getdata())
+    bits = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            bits = (bits << 1) | (px[offset + col] > px[offset + col + 1])
+    fingerprint = f"{bits:0{HASH_SIZE * HASH_SIZE // 4}x}"
+    if img.info.get("prepared"):
+        img.info["fingerprint"] = fingerprint
+    return fingerprint
+
+
+def hash_distance(a, b):
+    return bin(int(a, 16) ^ int(b, 16)).count("1")
+
+
+def split_vision_prompt(prompt):
+    """
+    (text_parts, images) for a list prompt with PIL images, else None.
+    """
+    if not isinstance(prompt, (list, tuple)):
+        return None
+    texts, images = [], []
+    for part in prompt:
+        if isinstance(part, str):
+            texts.append(part)
+        elif isinstance(part, Image.Image):
+            images.append(part)
+        else:
+            return None
+    return (texts, images) if images else None
+
+
+def make_key(model, prompt, language):
+    text = normalize_prompt(prompt)
+    if text is None:
+        return None
+    raw = f"{model}\x1f{language}\x1f{text}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def make_request_key(model, prompt, language):
+    """
+    Exact identity of a request (text or vision), e.g. for in-flight coalescing.
+    """
+    vision = split_vision_prompt(prompt)
+    if vision is None:
+        return make_key(model, prompt, language)
+    texts, images = vision
+    hashes = ",".join(image_fingerprint(img) for img in images)
+    return make_key(model, ["<vision>"] + texts + [hashes], language)
+
+
+class ResponseCache:
+    def __init__(self, path=None, max_bytes=MAX_BYTES, default_ttl=DEFAULT_TTL):
+        self.path = path or cache_path(CACHE_FILE)
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self.counts = {"text": [0, 0], "vision": [0, 0]}  # kind -> [hits, misses]
+        self.evictions = 0
+        self._init_db()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    model TEXT,
+                    language TEXT,
+                    value TEXT,
+                    size INTEGER,
+                    created REAL,
+                    expires REAL,
+                    last_access REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_access ON responses(last_access)")
+            # One row per cached vision answer: text part key + image hashes
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS vision_index (
+                    key TEXT PRIMARY KEY,
+                    text_key TEXT,
+                    image_hashes TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_vision_text ON vision_index(text_key)")
+
+    def _count(self, hit, kind="text"):
+        with self._lock:
+            self.counts[kind][0 if hit else 1] += 1
+
+    def get(self, model, prompt, language='English'):
+        vision = split_vision_prompt(prompt)
+        if vision is not None:
+            return self._get_vision(model, vision, language)
+        key = make_key(model, prompt, language)
+        if key is None:
+            return None
+        return self.get_by_key(key)
+
+    def _vision_keys(self, model, vision, language):
+        texts, images = vision
+        text_key = make_key(model, ["<vision>"] + texts, language)
+        hashes = [image_fingerprint(img) for img in images]
+        return text_key, hashes
+
+    def _get_vision(self, model, vision, language):
+        try:
+            text_key, hashes = self._vision_keys(model, vision, language)
+            rows = self._conn().execute(
+                "SELECT key, image_hashes FROM vision_index WHERE text_key = ?", (text_key,)
+            ).fetchall()
+        except (sqlite3.Error, OSError, ValueError) as e:
+            print(f"AI cache read error: {e}")
+            self._count(False, "vision")
+            return None
+        best_key, best_dist = None, None
+        for key, stored in rows:
+            stored = stored.split(",")
+            if len(stored) != len(hashes):
+                continue
+            dist = max(hash_distance(a, b) for a, b in zip(hashes, stored))
+            if dist <= VISION_MAX_DISTANCE and (best_dist is None or dist < best_dist):
+                best_key, best_dist = key, dist
+        if best_key is None:
+            self._count(False, "vision")
+            return None
+        return self.get_by_key(best_key, kind="vision")
+
+    def get_by_key(self, key, kind="text"):
+        now = time.time()
+        try:
+            conn = self._conn()
+            row = conn.execute("SELECT value, expires FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self._count(False, kind)
+                return None
+            value, expires = row
+            with conn:
+                if expires < now:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    conn.execute("DELETE FROM vision_index WHERE key = ?", (key,))
+                    self._count(False, kind)
+                    return None
+                conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._count(True, kind)
+            return value
+        except sqlite3.Error as e:
+            print(f"AI cache read error: {e}")
+            self._count(False, kind)
+            return None
+
+    def put(self, model, prompt, value, language='English', ttl=None):
+        vision = split_vision_prompt(prompt)
+        if vision is not None:
+            self._put_vision(model, vision, value, language, ttl)
+            return
+        key = make_key(model, prompt, language)
+        if key is None or not value:
+            return
+        self.put_by_key(key, value, model=model, language=language, ttl=ttl)
+
+    def _put_vision(self, model, vision, value, language, ttl):
+        if not value:
+            return
+        try:
+            text_key, hashes = self._vision_keys(model, vision, language)
+        except (OSError, ValueError) as e:
+            print(f"AI cache write error: {e}")
+            return
+        image_hashes = ",".join(hashes)
+        key = hashlib.sha256(f"{text_key}\x1f{image_hashes}".encode("utf-8")).hexdigest()
+        self.put_by_key(key, value, model=model, language=language, ttl=ttl)
+        try:
+            with self._conn() as conn:
+                conn.execute("INSERT OR REPLACE INTO vision_index VALUES (?, ?, ?)", (key, text_key, image_hashes))
+        except sqlite3.Error as e:
+            print(f"AI cache write error: {e}")
+
+    def put_by_key(self, key, value, model=None, language=None, ttl=None):
+        now = time.time()
+        ttl = self.default_ttl if ttl is None else ttl
+        size = len(value.encode("utf-8"))
+        try:
+            with self._conn() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (key, model, language, value, size, now, now + ttl, now),
+                )
+            self._evict()
+        except sqlite3.Error as e:
+            print(f"AI cache write error: {e}")
+
+    def _evict(self):
+        conn = self._conn()
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        with conn:
+            conn.execute("DELETE FROM responses WHERE expires < ?", (time.time(),))
+            target = self.max_bytes * EVICT_TO
+            total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+            removed = 0
+            for key, size in conn.execute("SELECT key, size FROM responses ORDER BY last_access").fetchall():
+                if total <= target:
+                    break
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                total -= size
+                removed += 1
+            conn.execute("DELETE FROM vision_index WHERE key NOT IN (SELECT key FROM responses)")
+        with self._lock:
+            self.evictions += removed
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM responses")
+            conn.execute("DELETE FROM vision_index")
+
+    def stats(self):
+        conn = self._conn()
+        entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        with self._lock:
+            out = {
+                "entries": entries,
+                "bytes": total,
+                "max_bytes": self.max_bytes,
+                "evictions": self.evictions,
+            }
+            for kind, (hits, misses) in self.counts.items():
+                lookups = hits + misses
+                out[kind] = {
+                    "hits": hits,
+                    "misses": misses,
+                    "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                }
+            return out
+
+
+@st.cache_resource(show_spinner=False)
+def get_response_cache():
+    return ResponseCache()
@@ -0,0 +1,167 @@
+import os
+import threading
+import httpx
+import streamlit as st
+from google import genai
+from google.genai import types
+
+from ai_loop import get_ai_loop
+
+# --- GEMINI AI CONFIGURATION ---
+def get_api_key():
+    try:
+        # Check Streamlit Cloud Secrets first
+        if "GOOGLE_API_KEY" in st.secrets:
+            return st.secrets["GOOGLE_API_KEY"]
+    except:
+        pass
+    # Fallback to local .env
+    return os.getenv("GOOGLE_API_KEY")
+
+# --- POOLED GEMINI CLIENTS ---
+# One genai.Client per API key, shared by every Streamlit session in this process.
+# Each client owns a keep-alive httpx pool so chat turns and advisor calls reuse
+# the TLS connection instead of handshaking on every request.
+
+POOL_MAX_CONNECTIONS = 20
+POOL_MAX_KEEPALIVE = 10
+POOL_KEEPALIVE_EXPIRY = 60  # seconds an idle connection stays in the pool
+
+
+class _ConnectionTracer:
+    """
+    Counts completed requests and new TCP connections using the httpcore trace hook.
+    Every request that got a response without opening a connection reused a pooled one.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def on_request(self, request):
+        request.extensions["trace"] = self._trace
+
+    def on_response(self, response):
+        with self._lock:
+            self.requests += 1
+
+    def _trace(self, event_name, info):
+        if event_name == "connection.connect_tcp.complete":
+            with self._lock:
+                self.new_connections += 1
+
+    # httpx.AsyncClient requires coroutine hooks and trace callbacks
+    async def on_request_async(self, request):
+        request.extensions["trace"] = self._trace_async
+
+    async def on_response_async(self, response):
+        self.on_response(response)
+
+    async def _trace_async(self, event_name, info):
+        self._trace(event_name, info)
+
+    def snapshot(self):
+        with self._lock:
+            return self.requests, self.new_connections
+
+
+class ClientRegistry:
+    """
+    Thread-safe registry of genai.Client objects keyed by API key.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._clients = {}  # api_key -> (genai.Client, httpx.Client, httpx.AsyncClient, tracer)
+        # The async pool (client.aio, used by ai_gateway) shares the tracer; it must
+        # only be driven from one event loop, see ai_loop.get_ai_loop()
+
+    def get(self, api_key):
+        if not api_key:
+            return None
+        entry = self._clients.get(api_key)
+        if entry is None:
+            with self._lock:
+                entry = self._clients.get(api_key)
+                if entry is None:
+                    entry = self._build(api_key)
+                    self._clients[api_key] = entry
+        return entry[0]
+
+    def _build(self, api_key):
+        tracer = _ConnectionTracer()
+        limits = httpx.Limits(
+            max_connections=POOL_MAX_CONNECTIONS,
+            max_keepalive_connections=POOL_MAX_KEEPALIVE,
+            keepalive_expiry=POOL_KEEPALIVE_EXPIRY,
+        )
+        http_client = httpx.Client(
+            limits=limits,
+            event_hooks={"request": [tracer.on_request], "response": [tracer.on_response]},
+        )
+        async_http_client = httpx.AsyncClient(
+            limits=limits,
+            event_hooks={"request": [tracer.on_request_async], "response": [tracer.on_response_async]},
+        )
+        client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(httpx_client=http_client, httpx_async_client=async_http_client),
+        )
+        return client, http_client, async_http_client, tracer
+
+    def stats(self):
+        """
+        Pool metrics per client: open connections, requests served, reuse ratio.
+        API keys are masked so this is safe to show in the UI.
+        """
+        with self._lock:
+            entries = list(self._clients.items())
+        out = []
+        for api_key, (_, http_client, async_http_client, tracer) in entries:
+            requests_sent, new_conns = tracer.snapshot()
+            reused = max(requests_sent - new_conns, 0)
+            sync_open, async_open = _open_connections(http_client), _open_connections(async_http_client)
+            out.append({
+                "key": f"...{api_key[-4:]}",
+                "open_connections": None if sync_open is None and async_open is None else (sync_open or 0) + (async_open or 0),
+                "open_async_connections": async_open,
+                "requests": requests_sent,
+                "new_connections": new_conns,
+                "reused": reused,
+                "reuse_ratio": round(reused / requests_sent, 3) if requests_sent else 0.0,
+            })
+        return out
+
+    def close(self):
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients.clear()
+        for _, http_client, async_http_client, _ in entries:
+            try:
+                http_client.close()
+                # The async pool belongs to the AI loop; close it there
+                get_ai_loop().submit(async_http_client.aclose()).result(timeout=5)
+            except Exception as e:
+                print(f"GenAI pool close error: {e}")
+
+
+def _open_connections(http_client):
+    # httpx does not expose pool size publicly; read it from the transport if available
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    conns = getattr(pool, "connections", None)
+    return len(conns) if conns is not None else None
+
+
+@st.cache_resource(show_spinner=False)
+def get_client_registry():
+    return ClientRegistry()
+
+
+def get_client(api_key):
+    """
+    Returns the shared, pooled genai.Client for this API key (or None without a key).
+    """
+    return get_client_registry().get(api_key)
+
+
+def get_pool_stats():
+    return get_client_registry().stats()
@@ -0,0 +1,296 @@
+import asyncio
+import os
+import time
+
+from ai_client import get_client, get_api_key
+from ai_loop import get_ai_loop
+from ai_cache import get_response_cache, make_request_key, AUTO_MODEL
+from ai_hedging import HEDGING_ENABLED, hedged_call
+from image_prep import encode_for_upload
+from model_router import get_model_router, is_key_error
+from rate_limiter import get_rate_limiter, PRIORITY_CHAT, PRIORITY_NORMAL
+from single_flight import get_single_flight
+
+# --- ASYNC AI GATEWAY ---
+# asyncio-native core for every Gemini call: cache -> in-flight coalescing ->
+# health-ranked models -> quota governor -> (hedged) request. All network I/O
+# runs on the shared AI loop (ai_loop.py), so one process can serve many
+# concurrent sessions; AI_MAX_CONCURRENCY bounds the upstream requests.
+#
+# generate() / stream() can be awaited from any event loop. Sync callers (the
+# Streamlit pages via logic.py) use generate_sync() / stream_sync().
+
+MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "32"))
+GENERATE_TIMEOUT = 90   # whole call, all fallbacks included
+MODEL_TIMEOUT = 45      # a single model request
+STREAM_IDLE_TIMEOUT = 30  # max gap between two streamed chunks
+
+# Streaming skips the oldest model (no streaming support worth waiting for)
+STREAM_MODELS = [
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-lite-preview-02-05",
+    "gemini-1.5-flash",
+    "gemini-1.5-flash-8b",
+    "gemini-1.5-pro"
+]
+
+
+class AIUnavailable(Exception):
+    """
+    No model produced an answer. reason: 'no_key', 'invalid_key', 'quota' or 'busy'.
+    """
+    def __init__(self, reason):
+        super().__init__(reason)
+        self.reason = reason
+
+
+_semaphore = None
+
+def _upstream_slots():
+    # Created lazily so it belongs to the AI loop
+    global _semaphore
+    if _semaphore is None:
+        _semaphore = asyncio.Semaphore(MAX_CONCURRENCY)
+    return _semaphore
+
+
+def _on_ai_loop():
+    try:
+        return asyncio.get_running_loop() is get_ai_loop().loop
+    except RuntimeError:
+        return False
+
+
+def with_language(prompt, language):
+    lang_instruction = f"\n\nIMPORTANT: Response must be entirely in {language} language."
+    if isinstance(prompt, str):
+        return prompt + lang_instruction
+    # If it's a list (e.g. for images), append instruction as a new part
+    return list(prompt) + [lang_instruction]
+
+
+def _release_untried(router, models, tried):
+    for model_name in models:
+        if model_name not in tried:
+            router.release(model_name)
+
+
+# --- NON-STREAMING ---
+async def generate(prompt, language='English', priority=PRIORITY_NORMAL, hedge=None, timeout=GENERATE_TIMEOUT):
+    """
+    Answer text for the prompt, or raises AIUnavailable / asyncio.TimeoutError.
+    Cancelling the awaiting task cancels the upstream request.
+    """
+    coro = asyncio.wait_for(_generate(prompt, language, priority, hedge), timeout)
+    if _on_ai_loop():
+        return await coro
+    return await asyncio.wrap_future(get_ai_loop().submit(coro))
+
+
+async def _generate(prompt, language, priority, hedge):
+    if hedge is None:
+        hedge = HEDGING_ENABLED
+    # Disk cache (survives restarts, shared by workers); text and vision prompts
+    cache = get_response_cache()
+    cached = await asyncio.to_thread(cache.get, AUTO_MODEL, prompt, language)
+    if cached:
+        return cached
+
+    # Identical requests already in flight (other sessions) share one upstream call
+    key = await asyncio.to_thread(make_request_key, AUTO_MODEL, prompt, language)
+    if key is None:
+        return await _generate_uncached(prompt, language, priority, hedge, cache)
+    return await get_single_flight().do_async(
+        key, lambda: _generate_uncached(prompt, language, priority, hedge, cache)
+    )
+
+
+async def _generate_uncached(prompt, language, priority, hedge, cache):
+    api_key = get_api_key()
+    if not api_key:
+        raise AIUnavailable("no_key")
+    client = get_client(api_key)
+    # Images go up as compact JPEG/WebP bytes (after the cache hashed them)
+    full_prompt = await asyncio.to_thread(encode_for_upload, with_language(prompt, language))
+
+    # Healthy models, fastest first; models with an open circuit are skipped
+    router = get_model_router()
+    limiter = get_rate_limiter()
+    models = router.ranked()
+    tried = []
+    try:
+        while len(tried) < len(models):
+            # Next healthy model with quota left (may queue briefly; None = shed)
+            remaining = [m for m in models if m not in tried]
+            model_name = await asyncio.to_thread(limiter.acquire_any, remaining, priority)
+            if model_name is None:
+                print(f"AI call shed by rate limiter (priority {priority})")
+                break
+            tried.append(model_name)
+
+            # Hedged mode: race the next model if this one is slow
+            remaining = [m for m in models if m not in tried]
+            if hedge and remaining:
+                backup = remaining[0]
+                slots = _upstream_slots()
+                backup_slot = []
+
+                async def acquire_backup():
+                    # The backup is a second upstream request: it needs its own slot,
+                    # and hedging is skipped rather than queued when none is free
+                    if slots.locked():
+                        return False
+                    await slots.acquire()
+                    backup_slot.append(True)  # released below, even if we're cancelled
+                    if not await asyncio.to_thread(limiter.acquire, backup, priority, wait=False):
+                        backup_slot.pop()
+                        slots.release()
+                        return False
+                    return True
+
+                try:
+                    async with slots:
+                        text, hedged = await hedged_call(
+                            client, model_name, backup, full_prompt, acquire_backup=acquire_backup
+                        )
+                finally:
+                    if backup_slot:
+                        slots.release()
+                if hedged:
+                    tried.append(backup)
+                if text:
+                    await asyncio.to_thread(cache.put, AUTO_MODEL, prompt, text, language)
+                    return text
+                continue
+
+            start = time.perf_counter()
+            try:
+                async with _upstream_slots():
+                    response = await asyncio.wait_for(
+                        client.aio.models.generate_content(model=model_name, contents=full_prompt),
+                        MODEL_TIMEOUT,
+                    )
+                if response and response.text:
+                    router.record_success(model_name, time.perf_counter() - start)
+                    await asyncio.to_thread(cache.put, AUTO_MODEL, prompt, response.text, language)
+                    return response.text
+                router.record_failure(model_name, latency=time.perf_counter() - start)
+            except Exception as e:
+                print(f"Model {model_name} failed: {e}")
+                # Invalid Key Check (not the model's fault, so don't trip its circuit)
+                if is_key_error(e):
+                    raise AIUnavailable("invalid_key")
+                router.record_failure(model_name, e, time.perf_counter() - start)
+    finally:
+        _release_untried(router, models, tried)
+
+    # Quota Check - only once every model is exhausted
+    raise AIUnavailable("quota" if router.all_rate_limited() else "busy")
+
+
+# --- STREAMING ---
+async def stream(prompt, language='English', priority=PRIORITY_CHAT, timeout=STREAM_IDLE_TIMEOUT):
+    """
+    Async generator of answer chunks. Raises AIUnavailable if no model answered.
+    Closing the generator (or cancelling its consumer) cancels the upstream stream.
+    """
+    agen = _stream(prompt, language, priority, timeout)
+    if _on_ai_loop():
+        async for chunk in agen:
+            yield chunk
+        return
+    # Different loop: pull each chunk across to the AI loop
+    loop = get_ai_loop()
+    try:
+        while True:
+            chunk = await asyncio.wrap_future(loop.submit(_next_chunk(agen)))
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        loop.submit(agen.aclose())
+
+
+_END = object()
+
+async def _next_chunk(agen):
+    try:
+        return await agen.__anext__()
+    except StopAsyncIteration:
+        return _END
+
+
+async def _stream(prompt, language, priority, timeout):
+    api_key = get_api_key()
+    if not api_key:
+        raise AIUnavailable("no_key")
+    client = get_client(api_key)
+    full_prompt = with_language(prompt, language)
+    if not isinstance(full_prompt, str):
+        full_prompt = await asyncio.to_thread(encode_for_upload, full_prompt)
+
+    router = get_model_router()
+    limiter = get_rate_limiter()
+    models = router.ranked(STREAM_MODELS)
+    tried = []
+    try:
+        while len(tried) < len(models):
+            remaining = [m for m in models if m not in tried]
+            model_name = await asyncio.to_thread(limiter.acquire_any, remaining, priority)
+            if model_name is None:
+                break
+            tried.append(model_name)
+            has_content = False
+            try:
+                async with _upstream_slots():
+                    responses = await asyncio.wait_for(
+                        client.aio.models.generate_content_stream(model=model_name, contents=full_prompt),
+                        timeout,
+                    )
+                    chunks = responses.__aiter__()
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), timeout)
+                        except StopAsyncIteration:
+                            break
+                        if chunk.text:
+                            has_content = True
+                            yield chunk.text
+                if has_content:
+                    # Stream duration depends on answer length, so no latency sample here
+                    router.record_success(model_name)
+                    return
+                router.record_failure(model_name)
+            except Exception as e:
+                if is_key_error(e):
+                    raise AIUnavailable("invalid_key")
+                router.record_failure(model_name, e)
+                if has_content:
+                    return  # keep the partial answer rather than starting over on another model
+    finally:
+        _release_untried(router, models, tried)
+
+    raise AIUnavailable("quota" if router.all_rate_limited() else "busy")
+
+
+# --- SYNC WRAPPERS (Streamlit script threads) ---
+def generate_sync(prompt, language='English', priority=PRIORITY_NORMAL, hedge=None, timeout=GENERATE_TIMEOUT):
+    return get_ai_loop().run(_generate(prompt, language, priority, hedge), timeout=timeout)
+
+
+def stream_sync(prompt, language='English', priority=PRIORITY_CHAT, timeout=STREAM_IDLE_TIMEOUT):
+    """
+    Blocking generator over stream(). When the consumer stops early (e.g. the
+    user navigated away and Streamlit stopped the script) the upstream stream
+    is cancelled in the finally block.
+    """
+    loop = get_ai_loop()
+    agen = _stream(prompt, language, priority, timeout)
+    try:
+        while True:
+            chunk = loop.run(_next_chunk(agen), timeout=timeout + 5)
+            if chunk is _END:
+                return
+            yield chunk
+    finally:
+        loop.submit(agen.aclose())
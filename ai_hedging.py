@@ -0,0 +1,179 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+import streamlit as st
+
+from model_router import get_model_router, is_key_error
+
+# --- HEDGED GEMINI REQUESTS ---
+# Opt-in (AI_HEDGING=1): the prompt goes to the primary model, and if no answer
+# arrives by the primary's recent latency percentile, the same prompt is fired
+# at the backup model. The first good answer wins; the other task is cancelled.
+
+HEDGING_ENABLED = os.getenv("AI_HEDGING", "0").lower() in ("1", "true", "yes")
+HEDGE_PERCENTILE = float(os.getenv("AI_HEDGE_PERCENTILE", "0.9"))
+HEDGE_DEFAULT_DELAY = 3.0   # seconds, used until the primary has latency samples
+HEDGE_MIN_DELAY = 0.5
+# Extra requests allowed per primary request. Capped at 1.0 so hedging can at
+# most double quota usage.
+HEDGE_BUDGET_RATIO = min(float(os.getenv("AI_HEDGE_BUDGET", "0.5")), 1.0)
+HEDGE_TIMEOUT = 60          # hard limit for the whole hedged call
+RECENT_CALLS = 50
+
+
+class HedgeBudget:
+    """
+    Token bucket for hedges: every primary request earns HEDGE_BUDGET_RATIO
+    credits and every hedge spends one, so hedges <= ratio * primaries.
+    """
+    def __init__(self, ratio=HEDGE_BUDGET_RATIO, burst=5.0):
+        self.ratio = ratio
+        self.burst = burst
+        self._lock = threading.Lock()
+        self.credits = 0.0
+
+    def earn(self):
+        with self._lock:
+            self.credits = min(self.credits + self.ratio, self.burst)
+
+    def refund(self):
+        with self._lock:
+            self.credits = min(self.credits + 1.0, self.burst)
+
+    def try_spend(self):
+        with self._lock:
+            if self.credits >= 1.0:
+                self.credits -= 1.0
+                return True
+            return False
+
+
+class HedgeStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.hedges_fired = 0
+        self.hedge_wins = 0
+        self.budget_denied = 0
+        self.quota_denied = 0
+        self.recent = deque(maxlen=RECENT_CALLS)
+
+    def record(self, call):
+        with self._lock:
+            self.calls += 1
+            self.hedges_fired += call["hedged"]
+            self.hedge_wins += call["winner"] is not None and call["winner"] == call["backup"]
+            self.budget_denied += call["budget_denied"]
+            self.quota_denied += call["quota_denied"]
+            self.recent.append(call)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "hedges_fired": self.hedges_fired,
+                "hedge_wins": self.hedge_wins,
+                "hedge_rate": round(self.hedges_fired / self.calls, 3) if self.calls else 0.0,
+                "hedge_win_rate": round(self.hedge_wins / self.hedges_fired, 3) if self.hedges_fired else 0.0,
+                "budget_denied": self.budget_denied,
+                "quota_denied": self.quota_denied,
+                "recent": list(self.recent),
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def _get_hedge_state():
+    return HedgeBudget(), HedgeStats()
+
+
+def get_hedge_stats():
+    return _get_hedge_state()[1].snapshot()
+
+
+def hedge_delay(primary):
+    latency = get_model_router().latency_percentile(primary, HEDGE_PERCENTILE)
+    if latency is None:
+        return HEDGE_DEFAULT_DELAY
+    return max(latency, HEDGE_MIN_DELAY)
+
+
+async def _call_model(client, model_name, contents):
+    router = get_model_router()
+    start = time.perf_counter()
+    try:
+        response = await client.aio.models.generate_content(model=model_name, contents=contents)
+    except Exception as e:
+        if not is_key_error(e):
+            router.record_failure(model_name, e, time.perf_counter() - start)
+        print(f"Model {model_name} failed: {e}")
+        raise
+    if response and response.text:
+        router.record_success(model_name, time.perf_counter() - start)
+        return response.text
+    router.record_failure(model_name, latency=time.perf_counter() - start)
+    raise Exception(f"Empty response from {model_name}")
+
+
+async def _hedged(client, primary, backup, contents, delay, budget, call, acquire_backup=None):
+    tasks = {asyncio.create_task(_call_model(client, primary, contents)): primary}
+    done, _ = await asyncio.wait(tasks, timeout=delay)
+    # Hedge when the primary is late or has already failed
+    primary_ok = any(not t.exception() for t in done)
+    if not primary_ok:
+        if budget.try_spend():
+            if acquire_backup is None or await acquire_backup():
+                call["hedged"] = True
+                tasks[asyncio.create_task(_call_model(client, backup, contents))] = backup
+            else:
+                budget.refund()  # backup has no quota left; don't charge the budget
+                call["quota_denied"] = True
+        else:
+            call["budget_denied"] = True
+
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.exception():
+                    call["winner"] = tasks[task]
+                    return task.result()
+        return None
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def hedged_call(client, primary, backup, contents, acquire_backup=None):
+    """
+    One hedged call; must be awaited on the shared AI loop (ai_loop.py, see ai_gateway.py).
+    Returns (text or None, whether the backup model was actually called).
+    acquire_backup() is awaited for quota / a connection slot before a hedge fires.
+    """
+    budget, stats = _get_hedge_state()
+    budget.earn()
+    call = {
+        "primary": primary,
+        "backup": backup,
+        "delay_s": round(hedge_delay(primary), 3),
+        "hedged": False,
+        "budget_denied": False,
+        "quota_denied": False,
+        "winner": None,
+    }
+    start = time.perf_counter()
+    try:
+        text = await asyncio.wait_for(
+            _hedged(client, primary, backup, contents, call["delay_s"], budget, call, acquire_backup),
+            timeout=HEDGE_TIMEOUT,
+        )
+        return text, call["hedged"]
+    except asyncio.TimeoutError:
+        print(f"Hedged call timed out after {HEDGE_TIMEOUT}s")
+        return None, call["hedged"]
+    finally:
+        call["elapsed_s"] = round(time.perf_counter() - start, 3)
+        stats.record(call)
+
@@ -0,0 +1,42 @@
+import asyncio
+import threading
+import streamlit as st
+
+# --- SHARED AI EVENT LOOP ---
+# Async Gemini calls (client.aio) all run on this one background loop, so the
+# pooled httpx.AsyncClient is never touched from two loops and in-flight
+# requests can be cancelled as real asyncio tasks.
+
+
+class AILoop:
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="ai-event-loop", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro):
+        """
+        Schedules a coroutine on the loop and returns a concurrent.futures.Future.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro, timeout=None):
+        """
+        Blocking helper for sync callers (Streamlit script threads).
+        On timeout the coroutine is cancelled before the error is raised.
+        """
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except BaseException:
+            future.cancel()
+            raise
+
+
+@st.cache_resource(show_spinner=False)
+def get_ai_loop():
+    return AILoop()
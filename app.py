@@ -18,6 +18,8 @@ load_dotenv()
 
 from utils import apply_custom_style, t, load_db, save_db, render_bottom_nav, get_daily_wisdom
 from logic import get_weather_data
+from weather_prefetch import start_weather_prefetcher
+from price_forecast import start_price_forecaster
 
 # Init Session
 from datetime import datetime
@@ -57,6 +59,10 @@ def get_secret(key):
         pass
     return os.getenv(key)
 
+# Keep every registered user's city warm in the weather cache (once per process)
+start_weather_prefetcher(get_secret("WEATHER_API_KEY"))
+start_price_forecaster()
+
 def get_local_img(file_path):
     # Try to load local file and convert to base64
     if os.path.exists(file_path):
@@ -0,0 +1,115 @@
+import argparse
+import time
+import numpy as np
+
+from logic import get_crop_recommendation
+
+# --- CROP RULE BENCHMARK ---
+# Compares the previous get_crop_recommendation (a Python if/elif chain with
+# the translation tables rebuilt on every call, looped once per farm) with the
+# table-driven rule engine in logic.py: scalar calls per farm, and one
+# vectorized call over all farms. Checks that all three agree first.
+#   python bench_crop_rules.py --sizes 1 1000 1000000
+
+
+def legacy_crop_recommendation(N, P, K, temperature, humidity, ph, rainfall, language='English'):
+    """
+    The original implementation, kept here as the baseline.
+    """
+    trans = {
+        'English': {
+            'Cotton': {'name': 'Cotton', 'reason': 'High Nitrogen detected, good for cash crops.'},
+            'Rice': {'name': 'Rice', 'reason': 'High rainfall and phosphorus levels suitable for paddy.'},
+            'Millets': {'name': 'Millets', 'reason': 'Low rainfall condition detected. Drought-resistent crop.'},
+            'Wheat': {'name': 'Wheat', 'reason': 'Cooler temperature suitable for Rabi crops.'},
+            'Maize': {'name': 'Maize', 'reason': 'Balanced conditions suitable for versatile crops.'}
+        },
+        'Hindi': {
+            'Cotton': {'name': 'कपास (Cotton)', 'reason': 'उच्च नाइट्रोजन पाया गया, नकदी फसलों के लिए अच्छा है।'},
+            'Rice': {'name': 'चावल (Rice)', 'reason': 'उच्च वर्षा और फास्फोरस का स्तर धान के लिए उपयुक्त है।'},
+            'Millets': {'name': 'बाजरा/मिलेट्स (Millets)', 'reason': 'कम वर्षा की स्थिति का पता चला। सूखा प्रतिरोधी फसल।'},
+            'Wheat': {'name': 'गेहूं (Wheat)', 'reason': 'ठंडा तापमान रबी फसलों के लिए उपयुक्त है।'},
+            'Maize': {'name': 'मक्का (Maize)', 'reason': 'बहुमुखी फसलों के लिए संतुलित स्थिति उपयुक्त है।'}
+        },
+        'Marathi': {
+            'Cotton': {'name': 'कापूस (Cotton)', 'reason': 'उच्च नत्र आढळले, नगदी पिकांसाठी चांगले.'},
+            'Rice': {'name': 'तांदूळ (Rice)', 'reason': 'जास्त पाऊस आणि स्फुरद पातळी भात शेतीसाठी योग्य आहे.'},
+            'Millets': {'name': 'बाजरी/मिलेट्स (Millets)', 'reason': 'कमी पावसाची स्थिती आढळली. दुष्काळ प्रतिरोधक पीक.'},
+            'Wheat': {'name': 'गहू (Wheat)', 'reason': 'कमी तापमान रबी पिकांसाठी योग्य आहे.'},
+            'Maize': {'name': 'मक्का (Maize)', 'reason': 'संतुलित स्थिती विविध पिकांसाठी योग्य आहे.'}
+        }
+    }
+    l_map = trans.get(language, trans['English'])
+    res_key = "Maize"
+    if N > 100: res_key = "Cotton"
+    elif P > 50 and rainfall > 200: res_key = "Rice"
+    elif rainfall < 50: res_key = "Millets"
+    elif temperature < 20: res_key = "Wheat"
+    res = l_map.get(res_key, l_map['Maize'])
+    return res['name'], res['reason']
+
+
+def random_farms(n, seed=0):
+    """
+    (n, 7) inputs spread around every rule threshold.
+    """
+    rng = np.random.default_rng(seed)
+    return np.column_stack([
+        rng.uniform(0, 140, n), rng.uniform(5, 145, n), rng.uniform(5, 205, n),
+        rng.uniform(8, 44, n), rng.uniform(14, 100, n), rng.uniform(3.5, 9.9, n), rng.uniform(20, 300, n),
+    ])
+
+
+def _best(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def check(farms, language='English'):
+    rows = farms.tolist()
+    legacy = [legacy_crop_recommendation(*r, language=language) for r in rows]
+    scalar = [get_crop_recommendation(*r, language=language) for r in rows]
+    names, reasons = get_crop_recommendation(*farms.T, language=language)
+    assert scalar == legacy, "scalar path differs from the legacy rules"
+    assert list(zip(names, reasons)) == legacy, "vectorized path differs from the legacy rules"
+
+
+def bench(n, repeat=3, loop_limit=100_000):
+    farms = random_farms(n)
+    rows = farms.tolist()
+    result = {"farms": n}
+    if n <= loop_limit:
+        result["legacy_s"] = _best(lambda: [legacy_crop_recommendation(*r) for r in rows], repeat)
+        result["scalar_s"] = _best(lambda: [get_crop_recommendation(*r) for r in rows], repeat)
+    result["vectorized_s"] = _best(lambda: get_crop_recommendation(*farms.T), repeat)
+    if "legacy_s" not in result:
+        # Per-farm loops over millions of rows take minutes; extrapolate from a sample
+        sample = rows[:loop_limit]
+        result["legacy_s_est"] = _best(lambda: [legacy_crop_recommendation(*r) for r in sample], 1) * n / len(sample)
+    legacy = result.get("legacy_s", result.get("legacy_s_est"))
+    if "scalar_s" in result:
+        result["scalar_speedup"] = legacy / result["scalar_s"]
+    result["vectorized_speedup"] = legacy / result["vectorized_s"]
+    return {k: float(f"{v:.3g}") if isinstance(v, float) else v for k, v in result.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the rule-based crop recommendation.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+    edge = np.array([[100, 50, 0, 20, 0, 0, 200], [100.01, 50.01, 0, 19.99, 0, 0, 200.01],
+                     [0, 0, 0, 25, 0, 0, 50], [np.nan] * 7], dtype=np.float64)
+    for language in ("English", "Hindi", "Marathi"):
+        check(np.vstack([edge, random_farms(10_000, seed=1)]), language)
+    print("legacy, scalar and vectorized results agree")
+    for n in args.sizes:
+        print(bench(n, args.repeat))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+import threading
+
+from ai_loop import get_ai_loop
+from rate_limiter import PRIORITY_LOW
+
+# --- CONVERSATION MEMORY (AI AGRONOMIST) ---
+# Follow-up questions need context, but sending the whole chat would make every
+# prompt longer than the last. The last RECENT_MESSAGES messages go verbatim;
+# older ones are folded into a short rolling summary that is written in the
+# background at low priority, and the whole context is kept within a token budget.
+
+RECENT_MESSAGES = 6          # verbatim messages (3 question/answer pairs)
+FOLD_BATCH = 2               # summarise once this many messages have aged out
+CONTEXT_TOKEN_BUDGET = 1200  # history tokens per request (question not included)
+SUMMARY_MAX_CHARS = 1200
+EXCERPT_CHARS = 160          # per message, when a summary isn't ready yet
+
+ROLE_LABELS = {"user": "Farmer", "assistant": "Agronomist"}
+
+
+def estimate_tokens(text):
+    # ~4 chars/token for English, Devanagari tokenises denser; stay conservative
+    return len(text) // 3 + 1
+
+
+def _excerpt(message):
+    text = " ".join(str(message["content"]).split())
+    if len(text) > EXCERPT_CHARS:
+        text = text[:EXCERPT_CHARS].rsplit(" ", 1)[0] + "…"
+    return f"{ROLE_LABELS.get(message['role'], message['role'])}: {text}"
+
+
+class ConversationMemory:
+    """
+    Per-session chat context; keep one in st.session_state.
+    """
+    def __init__(self, recent_messages=RECENT_MESSAGES, token_budget=CONTEXT_TOKEN_BUDGET):
+        self.recent_messages = recent_messages
+        self.token_budget = token_budget
+        self.summary = ""
+        self.folded = 0  # messages (after the greeting) already in the summary
+        self._pending = None
+        self._dropped = 0  # messages trimmed off the front while a summary ran
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _turns(history):
+        # The opening greeting carries no context
+        return [m for m in history if m.get("content") and not m.get("greeting")]
+
+    def build_prompt(self, history, question):
+        """
+        Prompt for the new question with summary + recent turns, within budget.
+        `history` is the chat before the question was appended.
+        """
+        turns = self._turns(history)
+        with self._lock:
+            summary, folded = self.summary, self.folded
+        recent_start = max(len(turns) - self.recent_messages, 0)
+        # Aged out but not summarised yet (summary still running): short excerpts
+        unfolded = [_excerpt(m) for m in turns[min(folded, recent_start):recent_start]]
+        recent = [f"{ROLE_LABELS.get(m['role'], m['role'])}: {m['content']}" for m in turns[recent_start:]]
+
+        budget = self.token_budget
+        summary = summary[:SUMMARY_MAX_CHARS]
+        budget -= estimate_tokens(summary)
+        # Newest turns matter most: fill the budget from the end
+        kept = []
+        for line in reversed(unfolded + recent):
+            cost = estimate_tokens(line)
+            if cost > budget:
+                break
+            kept.append(line)
+            budget -= cost
+        kept.reverse()
+
+        if not summary and not kept:
+            return question
+        parts = ["You are continuing a conversation with a farmer."]
+        if summary:
+            parts.append(f"Summary of the earlier conversation:\n{summary}")
+        if kept:
+            parts.append("Recent messages:\n" + "\n".join(kept))
+        parts.append(f"Farmer's new question:\n{question}")
+        return "\n\n".join(parts)
+
+    def maybe_fold(self, history):
+        """
+        Starts a background summary of messages that aged out of the window.
+        Never blocks the page; the result is used from the next question on.
+        """
+        turns = self._turns(history)
+        fold_upto = len(turns) - self.recent_messages
+        with self._lock:
+            if self._pending is not None or fold_upto - self.folded < FOLD_BATCH:
+                return
+            previous = self.summary
+            to_fold = turns[self.folded:fold_upto]
+            self._dropped = 0
+            pending = self._pending = get_ai_loop().submit(self._summarise(previous, to_fold))
+        # Outside the lock: an already-finished future runs _apply right here
+        pending.add_done_callback(lambda fut: self._apply(fut, previous, to_fold, fold_upto))
+
+    async def _summarise(self, previous, messages):
+        from ai_gateway import generate
+        transcript = "\n".join(f"{ROLE_LABELS.get(m['role'], m['role'])}: {m['content']}" for m in messages)
+        prompt = f"""
+        Update the running summary of a conversation between a farmer and an agronomist.
+        Keep crops, locations, problems, quantities and advice already given. Under 80 words.
+
+        Current summary: {previous or "(none)"}
+
+        New messages:
+        {transcript}
+        """
+        return await generate(prompt, language='English', priority=PRIORITY_LOW, timeout=60)
+
+    def _apply(self, fut, previous, messages, fold_upto):
+        try:
+            summary = fut.result()
+        except Exception as e:
+            # AI busy / shed: keep the context with a plain extractive summary
+            print(f"Chat summary skipped: {e}")
+            summary = " ".join(filter(None, [previous] + [_excerpt(m) for m in messages]))
+        with self._lock:
+            self.summary = " ".join(str(summary).split())[-SUMMARY_MAX_CHARS:]
+            self.folded = max(fold_upto - self._dropped, 0)
+            self._pending = None
+
+    def forget(self, removed):
+        """
+        The caller removed these messages from the front of the history
+        (bounded session window, see chat_store.py); shift the fold position
+        by the turns among them (the greeting is not counted in `folded`).
+        """
+        count = len(self._turns(removed))
+        with self._lock:
+            self.folded = max(self.folded - count, 0)
+            if self._pending is not None:
+                self._dropped += count
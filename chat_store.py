@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+import streamlit as st
+
+from utils import cache_path
+
+# --- PERSISTENT CHAT HISTORY ---
+# AI Agronomist messages per user (phone number) in SQLite under .cache/, so the
+# chat survives refreshes. The page keeps only a bounded window in
+# st.session_state and reads older pages from here on demand; the
+# (user_id, id) index keeps every page query cheap however long the history is.
+
+CHAT_FILE = "chat_history.sqlite3"
+PAGE_SIZE = 20               # messages per "load older" page
+MAX_SESSION_MESSAGES = 40    # newest messages kept in st.session_state
+
+
+class ChatStore:
+    def __init__(self, path=None):
+        self.path = path or cache_path(CHAT_FILE)
+        self._local = threading.local()
+        self._init_db()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS messages (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    user_id TEXT,
+                    role TEXT,
+                    content TEXT,
+                    created REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_messages_user ON messages(user_id, id)")
+
+    def append(self, user_id, role, content):
+        """
+        Stores one message; returns its id (None if the write failed).
+        """
+        try:
+            with self._conn() as conn:
+                cur = conn.execute(
+                    "INSERT INTO messages (user_id, role, content, created) VALUES (?, ?, ?, ?)",
+                    (str(user_id), role, content, time.time()),
+                )
+                return cur.lastrowid
+        except sqlite3.Error as e:
+            print(f"Chat history write error: {e}")
+            return None
+
+    def page(self, user_id, before_id=None, limit=PAGE_SIZE):
+        """
+        Up to `limit` messages older than before_id (newest page if None), oldest first.
+        """
+        sql = "SELECT id, role, content FROM messages WHERE user_id = ?"
+        params = [str(user_id)]
+        if before_id is not None:
+            sql += " AND id < ?"
+            params.append(before_id)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        try:
+            rows = self._conn().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Chat history read error: {e}")
+            return []
+        return [{"id": i, "role": role, "content": content} for i, role, content in reversed(rows)]
+
+    def count(self, user_id):
+        try:
+            return self._conn().execute(
+                "SELECT COUNT(*) FROM messages WHERE user_id = ?", (str(user_id),)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            return 0
+
+    def clear(self, user_id):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM messages WHERE user_id = ?", (str(user_id),))
+
+
+@st.cache_resource(show_spinner=False)
+def get_chat_store():
+    return ChatStore()
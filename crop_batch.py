@@ -0,0 +1,204 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+from joblib import parallel_config
+
+from crop_model import get_crop_model_registry, FEATURES
+from logic import get_crop_recommendation
+
+# --- BATCH CROP RECOMMENDATION ---
+# Recommendations for many plots at once: a CSV or Parquet file of
+# N, P, K, temperature, humidity, ph, rainfall rows is read CHUNK_ROWS at a
+# time, each chunk is scored by the registry's RandomForest (one predict_proba
+# call on all cores) and the rule-based get_crop_recommendation (one vectorized
+# call per chunk), and written straight to the output file. Only one chunk is in
+# memory at a time, so input files may be larger than RAM.
+#   python crop_batch.py farms.parquet -o recommendations.csv
+
+CHUNK_ROWS = 50_000
+# The page hands the result to st.download_button, which holds it in memory;
+# bigger files go through the command line
+UI_MAX_ROWS = 200_000
+DEFAULT_DATASET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Crop_recommendation.csv")
+OUTPUT_COLUMNS = ["recommended_crop", "confidence", "rule_crop"]
+
+
+class BatchInputError(ValueError):
+    """
+    The input file is missing feature columns or has an unsupported format.
+    """
+
+
+def _is_parquet(name):
+    return str(name).lower().endswith((".parquet", ".pq"))
+
+
+def iter_chunks(source, chunk_rows=CHUNK_ROWS, parquet=None):
+    """
+    DataFrames of at most chunk_rows rows from a CSV or Parquet path / file object.
+    """
+    parquet = _is_parquet(getattr(source, "name", source)) if parquet is None else parquet
+    if parquet:
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise BatchInputError("Reading Parquet needs pyarrow (pip install pyarrow)")
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunk_rows)
+
+
+def _feature_columns(chunk):
+    """
+    {input column name: float64 values (NaN where missing / not a number)} in FEATURES order.
+    CSV chunks infer dtypes separately (a blank cell turns an int column into
+    float in that chunk only), so features are always float64 in the output.
+    """
+    columns = {str(c).strip().lower(): c for c in chunk.columns}
+    missing = [f for f in FEATURES if f not in columns]
+    if missing:
+        raise BatchInputError(f"Input must contain columns: N, P, K, temperature, humidity, ph, rainfall (missing {missing})")
+    return {columns[f]: pd.to_numeric(chunk[columns[f]], errors="coerce").astype(np.float64) for f in FEATURES}
+
+
+def score_chunk(model, chunk, language='English', rules=True):
+    """
+    The chunk with OUTPUT_COLUMNS added; rows with missing values get no recommendation.
+    """
+    features = _feature_columns(chunk)
+    X = np.column_stack([values.to_numpy(dtype=np.float32) for values in features.values()])
+    valid = ~np.isnan(X).any(axis=1)
+    crops = np.full(len(X), "", dtype=object)
+    confidence = np.full(len(X), np.nan, dtype=np.float32)
+    if valid.any():
+        with parallel_config(backend="threading", n_jobs=-1):
+            proba = model.predict_proba(pd.DataFrame(X[valid], columns=FEATURES))
+        best = proba.argmax(axis=1)
+        crops[valid] = np.char.title(model.classes_[best].astype(str))
+        confidence[valid] = proba[np.arange(len(best)), best]
+    out = chunk.copy()
+    for name, values in features.items():
+        out[name] = values
+    out["recommended_crop"] = crops
+    out["confidence"] = np.round(confidence, 3)
+    if rules:
+        rule_crops = np.full(len(X), "", dtype=object)
+        if valid.any():
+            rule_crops[valid], _ = get_crop_recommendation(*X[valid].T, language=language)
+        out["rule_crop"] = rule_crops
+    return out
+
+
+class _Writer:
+    def __init__(self, target, parquet):
+        self.target = target
+        self.parquet = parquet
+        self._pq_writer = None
+        self._first = True
+
+    def write(self, frame):
+        if self.parquet:
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise BatchInputError("Writing Parquet needs pyarrow (pip install pyarrow)")
+            table = pa.Table.from_pandas(frame, preserve_index=False)
+            if self._pq_writer is None:
+                self._pq_writer = pq.ParquetWriter(self.target, table.schema)
+            elif table.schema != self._pq_writer.schema:
+                # Other columns may still be inferred differently per chunk
+                try:
+                    table = table.cast(self._pq_writer.schema)
+                except (pa.ArrowInvalid, ValueError) as e:
+                    raise BatchInputError(f"Column types differ between chunks: {e}")
+            self._pq_writer.write_table(table)
+        else:
+            frame.to_csv(self.target, mode="w" if self._first else "a", header=self._first, index=False)
+        self._first = False
+
+    def close(self):
+        if self._pq_writer is not None:
+            self._pq_writer.close()
+            self._pq_writer = None
+
+    def abort(self):
+        """
+        Closes and removes a partly written output path (file objects are left to the caller).
+        """
+        self.close()
+        if isinstance(self.target, (str, os.PathLike)):
+            try:
+                os.remove(self.target)
+            except OSError:
+                pass
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)  # bytes on macOS, KiB elsewhere
+
+
+def recommend_file(source, target, model=None, language='English', rules=True, chunk_rows=CHUNK_ROWS,
+                   on_chunk=None, source_parquet=None, target_parquet=None, max_rows=None):
+    """
+    Streams recommendations from source to target (CSV or Parquet, by extension
+    unless given); returns throughput stats. on_chunk(stats) is called after each chunk.
+    Raises BatchInputError once the input has more than max_rows rows.
+    """
+    if model is None:
+        model, _ = get_crop_model_registry().get(pd.read_csv(DEFAULT_DATASET))
+    target_parquet = _is_parquet(getattr(target, "name", target)) if target_parquet is None else target_parquet
+    writer = _Writer(target, target_parquet)
+    start = time.perf_counter()
+    stats = {"rows": 0, "scored": 0, "chunks": 0}
+    try:
+        for chunk in iter_chunks(source, chunk_rows, parquet=source_parquet):
+            if max_rows is not None and stats["rows"] + len(chunk) > max_rows:
+                raise BatchInputError(
+                    f"More than {max_rows:,} rows; use the command line for large files: "
+                    "python crop_batch.py <file> -o <output>"
+                )
+            scored = score_chunk(model, chunk, language=language, rules=rules)
+            writer.write(scored)
+            elapsed = time.perf_counter() - start
+            stats["rows"] += len(chunk)
+            stats["scored"] += int((scored["recommended_crop"] != "").sum())
+            stats["chunks"] += 1
+            stats["seconds"] = round(elapsed, 2)
+            stats["rows_per_s"] = round(stats["rows"] / elapsed) if elapsed > 0 else None
+            if on_chunk:
+                on_chunk(stats)
+    except BaseException:
+        writer.abort()
+        raise
+    writer.close()
+    stats["peak_rss_mb"] = _peak_rss_mb()
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crop recommendations for a CSV/Parquet file of plots.")
+    parser.add_argument("source", help="CSV or Parquet with N, P, K, temperature, humidity, ph, rainfall")
+    parser.add_argument("-o", "--output", required=True, help="output .csv or .parquet")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--language", default="English", choices=["English", "Hindi", "Marathi"])
+    parser.add_argument("--no-rules", action="store_true", help="skip the rule-based column")
+    args = parser.parse_args()
+    stats = recommend_file(
+        args.source, args.output, language=args.language, rules=not args.no_rules, chunk_rows=args.chunk_rows,
+        on_chunk=lambda s: print(f"{s['rows']:,} rows, {s['rows_per_s']:,} rows/s"),
+    )
+    print(stats)
+
+
+if __name__ == "__main__":
+    main()
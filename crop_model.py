@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import joblib
+import numpy as np
+import pandas as pd
+import sklearn
+import streamlit as st
+from sklearn.ensemble import RandomForestClassifier
+
+from single_flight import get_single_flight
+from utils import cache_path
+
+# --- CROP MODEL REGISTRY ---
+# The crop-recommendation RandomForest is trained once per dataset and stored
+# under .cache/models/crop_rf/<version>/ (model.joblib + meta.json with the
+# accuracy and training details). The version is a fingerprint of the dataset
+# contents and the training settings, so a process start only memory-maps the
+# stored trees (joblib mmap_mode) and a retrain happens only when the CSV
+# actually changed. Artifacts are written to a temp dir and renamed into place,
+# so concurrent processes never see a half-written model.
+# Training is one fit on all cores (n_jobs); accuracy is the out-of-bag score
+# of that same fit. On large uploads each tree sees a bootstrap sample of at
+# most MAX_BOOTSTRAP rows, which bounds the cost per tree.
+
+MODEL_DIR = "models/crop_rf"
+FEATURES = ['n', 'p', 'k', 'temperature', 'humidity', 'ph', 'rainfall']
+TARGET = 'label'
+N_ESTIMATORS = 100
+RANDOM_STATE = 42
+TRAIN_JOBS = int(os.getenv("CROP_MODEL_JOBS", "-1"))  # -1 = all cores
+MAX_BOOTSTRAP = 50_000
+KEEP_VERSIONS = 3
+# Bump when the training code changes in a way that should invalidate old artifacts
+TRAINING_REVISION = 2
+
+
+class DatasetError(ValueError):
+    """
+    The dataset does not have the columns the model needs.
+    """
+
+
+def prepare_dataset(df):
+    """
+    Lower-cased, stripped column names; raises DatasetError if columns are missing.
+    """
+    df = df.rename(columns=lambda c: str(c).strip().lower())
+    if not all(col in df.columns for col in FEATURES + [TARGET]):
+        raise DatasetError("CSV must contain columns: N, P, K, temperature, humidity, ph, rainfall, label")
+    return df[FEATURES + [TARGET]]
+
+
+def dataset_fingerprint(df):
+    """
+    Content hash of the (prepared) dataset plus the training settings.
+    """
+    digest = hashlib.sha256()
+    digest.update(json.dumps([TRAINING_REVISION, N_ESTIMATORS, RANDOM_STATE, MAX_BOOTSTRAP, list(df.columns)]).encode())
+    digest.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    return digest.hexdigest()[:16]
+
+
+def train(df, n_jobs=TRAIN_JOBS):
+    """
+    One parallel fit; returns (model, metrics) with the out-of-bag accuracy.
+    """
+    X, y = df[FEATURES].astype(np.float32), df[TARGET]
+    max_samples = MAX_BOOTSTRAP / len(df) if len(df) > MAX_BOOTSTRAP else None
+    model = RandomForestClassifier(
+        n_estimators=N_ESTIMATORS, random_state=RANDOM_STATE, n_jobs=n_jobs,
+        oob_score=True, max_samples=max_samples,
+    )
+    model.fit(X, y)
+    model.n_jobs = None  # serving predicts a row at a time; thread fan-out only adds latency
+    return model, {
+        "accuracy": float(model.oob_score_),
+        "accuracy_method": "out-of-bag",
+        "max_samples": max_samples,
+    }
+
+
+class CropModelRegistry:
+    def __init__(self, root=None):
+        self.root = root or cache_path(MODEL_DIR)
+        self._lock = threading.Lock()
+        self._loaded = {}  # version -> (model, meta)
+        self.loads = 0
+        self.trainings = 0
+        self.last_load_ms = None
+        self.last_training = None
+
+    def _dir(self, version):
+        return os.path.join(self.root, version)
+
+    def versions(self):
+        """
+        Stored artifacts' metadata, newest first.
+        """
+        metas = []
+        for name in os.listdir(self.root) if os.path.isdir(self.root) else []:
+            try:
+                with open(os.path.join(self._dir(name), "meta.json"), encoding="utf-8") as f:
+                    metas.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        return sorted(metas, key=lambda m: m.get("created", 0), reverse=True)
+
+    def _load(self, version):
+        start = time.perf_counter()
+        path = self._dir(version)
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        # Tree arrays stay in the page cache, shared by every process using them
+        model = joblib.load(os.path.join(path, "model.joblib"), mmap_mode="r")
+        with self._lock:
+            self.loads += 1
+            self.last_load_ms = round(1000 * (time.perf_counter() - start), 1)
+        return model, meta
+
+    def _train_and_store(self, version, df, timings):
+        start = time.perf_counter()
+        model, metrics = train(df)
+        timings["fit_s"] = round(time.perf_counter() - start, 3)
+        meta = {
+            "version": version,
+            "created": time.time(),
+            "metrics": metrics,
+            "rows": int(len(df)),
+            "classes": [str(c) for c in model.classes_],
+            "features": FEATURES,
+            "params": {"n_estimators": N_ESTIMATORS, "random_state": RANDOM_STATE, "n_jobs": TRAIN_JOBS,
+                       "cpus": os.cpu_count()},
+            "timings": timings,
+            "sklearn": sklearn.__version__,
+        }
+        start = time.perf_counter()
+        os.makedirs(self.root, exist_ok=True)
+        tmp = tempfile.mkdtemp(prefix=f".{version}-", dir=self.root)
+        try:
+            joblib.dump(model, os.path.join(tmp, "model.joblib"))  # uncompressed, so it can be mmapped
+            timings["store_s"] = round(time.perf_counter() - start, 3)
+            with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, indent=2)
+            try:
+                os.replace(tmp, self._dir(version))
+            except OSError:
+                # Another process stored the same version first
+                shutil.rmtree(tmp, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(tmp, ignore_errors=True)
+            raise
+        with self._lock:
+            self.trainings += 1
+            self.last_training = timings
+        self._prune(keep=version)
+        print(f"Crop model {version} trained on {len(df)} rows (OOB accuracy {metrics['accuracy']:.2%}): {timings}")
+        return self._load(version)
+
+    def _prune(self, keep):
+        for meta in self.versions()[KEEP_VERSIONS:]:
+            if meta.get("version") != keep:
+                shutil.rmtree(self._dir(meta["version"]), ignore_errors=True)
+
+    def get(self, df):
+        """
+        (model, meta) for the dataset: from memory, from disk, or trained now.
+        Raises DatasetError for unusable data.
+        """
+        start = time.perf_counter()
+        df = prepare_dataset(df)
+        prepared = time.perf_counter()
+        version = dataset_fingerprint(df)
+        timings = {
+            "prepare_s": round(prepared - start, 3),
+            "fingerprint_s": round(time.perf_counter() - prepared, 3),
+        }
+        with self._lock:
+            if version in self._loaded:
+                return self._loaded[version]
+
+        def load_or_train():
+            if os.path.exists(os.path.join(self._dir(version), "meta.json")):
+                try:
+                    return self._load(version)
+                except Exception as e:
+                    print(f"Crop model {version} unreadable, retraining: {e}")
+                    shutil.rmtree(self._dir(version), ignore_errors=True)
+            return self._train_and_store(version, df, timings)
+
+        result = get_single_flight().do(("crop_model", version), load_or_train)
+        with self._lock:
+            self._loaded[version] = result
+            while len(self._loaded) > KEEP_VERSIONS:
+                self._loaded.pop(next(iter(self._loaded)))
+        return result
+
+    def stats(self):
+        stored = [
+            {"version": m["version"], "accuracy": m["metrics"].get("accuracy"), "rows": m.get("rows")}
+            for m in self.versions()
+        ]
+        with self._lock:
+            return {
+                "in_memory": list(self._loaded),
+                "stored": stored,
+                "loads": self.loads,
+                "trainings": self.trainings,
+                "last_load_ms": self.last_load_ms,
+                "last_training": self.last_training,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_crop_model_registry():
+    return CropModelRegistry()
@@ -0,0 +1,225 @@
+import csv
+import os
+import re
+import unicodedata
+from bisect import bisect_left
+from collections import Counter, namedtuple
+import numpy as np
+import streamlit as st
+
+# --- OFFLINE GAZETTEER (INDIAN CITIES / DISTRICTS) ---
+# Resolves what users type ("Pune", "पुणे", "नागपुर (Nagpur)", "Nasik", "nagpr")
+# to coordinates without a network call, so weather is fetched by lat/lon
+# (stable, cacheable) instead of OWM's free-text `q=`. Devanagari input is
+# matched against the bundled aliases and, failing that, transliterated to
+# Latin. Only exact name / alias / transliteration matches are used as
+# coordinates; fuzzy trigram matches ("nagpr") are offered as suggestions,
+# since a near miss is often a different town ("Akole" is not Akola).
+
+GAZETTEER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "india_cities.csv")
+EXACT_SCORE = 0.95    # exact name / alias (1.0) or exact after transliteration
+MIN_SCORE = 0.6       # trigram Dice similarity needed for a suggestion
+PREFIX_SCORE = 0.9    # score for a unique-enough prefix ("kolh" -> Kolhapur)
+MIN_PREFIX = 4
+
+Place = namedtuple("Place", ["name", "state", "lat", "lon"])
+
+# --- Devanagari -> Latin (simple, lossy; just good enough to match names) ---
+_CONSONANTS = {
+    "क": "k", "ख": "kh", "ग": "g", "घ": "gh", "ङ": "n",
+    "च": "ch", "छ": "chh", "ज": "j", "झ": "jh", "ञ": "n",
+    "ट": "t", "ठ": "th", "ड": "d", "ढ": "dh", "ण": "n",
+    "त": "t", "थ": "th", "द": "d", "ध": "dh", "न": "n",
+    "प": "p", "फ": "ph", "ब": "b", "भ": "bh", "म": "m",
+    "य": "y", "र": "r", "ल": "l", "ळ": "l", "व": "v",
+    "श": "sh", "ष": "sh", "स": "s", "ह": "h",
+}
+_NUKTA_FORMS = {"क": "q", "ज": "z", "फ": "f", "ड": "r", "ढ": "rh"}
+_VOWELS = {
+    "अ": "a", "आ": "a", "इ": "i", "ई": "i", "उ": "u", "ऊ": "u", "ऋ": "ri",
+    "ए": "e", "ऐ": "ai", "ओ": "o", "औ": "au", "ऑ": "o",
+}
+_MATRAS = {
+    "ा": "a", "ि": "i", "ी": "i", "ु": "u", "ू": "u", "ृ": "ri",
+    "े": "e", "ै": "ai", "ो": "o", "ौ": "au", "ॉ": "o",
+}
+_VIRAMA, _NUKTA = "्", "़"
+_NASALS = {"ं": "n", "ँ": "n"}
+_DEVANAGARI = re.compile(r"[ऀ-ॿ]")
+
+
+def _transliterate_word(word):
+    # Units: [consonant, vowel, inherent_schwa, nasal]
+    units = []
+    chars = unicodedata.normalize("NFD", word)
+    for i, ch in enumerate(chars):
+        if ch in _CONSONANTS:
+            nukta = i + 1 < len(chars) and chars[i + 1] == _NUKTA
+            units.append([_NUKTA_FORMS.get(ch, _CONSONANTS[ch]) if nukta else _CONSONANTS[ch], "a", True, ""])
+        elif ch in _VOWELS:
+            units.append(["", _VOWELS[ch], False, ""])
+        elif ch in _MATRAS and units:
+            units[-1][1], units[-1][2] = _MATRAS[ch], False
+        elif ch == _VIRAMA and units:
+            units[-1][1], units[-1][2] = "", False
+        elif ch in _NASALS and units:
+            units[-1][3] = "n"
+        elif ch == "ः" and units:
+            units[-1][3] = "h"
+        elif ch.isascii() and ch.isalnum():
+            units.append([ch, "", False, ""])
+    # Schwa deletion: word-final, and in V C_a C V contexts ("नागपुर" -> nagpur)
+    if len(units) > 1 and units[-1][2] and not units[-1][3]:
+        units[-1][1] = ""
+    for i in range(len(units) - 2, 0, -1):
+        unit, prev, nxt = units[i], units[i - 1], units[i + 1]
+        if unit[2] and not unit[3] and prev[1] and nxt[0] and nxt[1]:
+            unit[1] = ""
+    out = []
+    for i, (cons, vowel, _, nasal) in enumerate(units):
+        if nasal == "n" and i + 1 < len(units) and units[i + 1][0][:1] in ("p", "b", "m"):
+            nasal = "m"
+        out.append(cons + vowel + nasal)
+    return "".join(out)
+
+
+def transliterate(text):
+    return " ".join(_transliterate_word(w) for w in text.split())
+
+
+def normalize_name(text):
+    """
+    Lowercase ASCII-ish key: accents stripped, punctuation to spaces.
+    """
+    text = unicodedata.normalize("NFKD", str(text)).casefold()
+    text = "".join(ch for ch in text if not unicodedata.combining(ch) or _DEVANAGARI.match(ch))
+    text = re.sub(r"[^\wऀ-ॿ]+", " ", text)
+    return " ".join(text.split())
+
+
+def _trigrams(key):
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class Gazetteer:
+    """
+    Read-only index over data/india_cities.csv. Coordinates live in float32
+    arrays, posting lists in int32 arrays.
+    """
+    def __init__(self, path=GAZETTEER_FILE):
+        names, states, lats, lons, latin_names = [], [], [], [], []
+        keys = {}  # normalized name / alias -> place id
+        with open(path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                pid = len(names)
+                names.append(row["name"])
+                states.append(row["state"])
+                lats.append(float(row["lat"]))
+                lons.append(float(row["lon"]))
+                aliases = [row["name"]] + [a for a in row["aliases"].split("|") if a]
+                latin_names.append(tuple(a for a in aliases if not _DEVANAGARI.search(a)))
+                for alias in aliases:
+                    keys.setdefault(normalize_name(alias), pid)
+        self.names = names
+        self.latin_names = latin_names  # per place: official name + Latin aliases
+        self._pid = {name: pid for pid, name in enumerate(names)}
+        self.states = states
+        self.lat = np.array(lats, dtype=np.float32)
+        self.lon = np.array(lons, dtype=np.float32)
+        self.exact = keys
+
+        # Fuzzy index over Latin keys only (Devanagari is transliterated first)
+        latin = {}
+        for key, pid in keys.items():
+            if not _DEVANAGARI.search(key):
+                latin.setdefault(key, pid)
+        self.latin_keys = sorted(latin)
+        self.latin_ids = np.array([latin[k] for k in self.latin_keys], dtype=np.int32)
+        self.latin_sizes = np.array([len(_trigrams(k)) for k in self.latin_keys], dtype=np.int32)
+        postings = {}
+        for idx, key in enumerate(self.latin_keys):
+            for gram in _trigrams(key):
+                postings.setdefault(gram, []).append(idx)
+        self.postings = {g: np.array(ids, dtype=np.int32) for g, ids in postings.items()}
+
+    def place(self, pid):
+        return Place(self.names[pid], self.states[pid], float(self.lat[pid]), float(self.lon[pid]))
+
+    def _fuzzy(self, key, limit):
+        grams = _trigrams(key)
+        counts = Counter()
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                counts.update(ids.tolist())
+        scored = {}
+        for idx, shared in counts.items():
+            score = 2.0 * shared / (len(grams) + self.latin_sizes[idx])
+            pid = int(self.latin_ids[idx])
+            scored[pid] = max(scored.get(pid, 0.0), score)
+        # Prefix matches ("kolh", "chhatrapati")
+        if len(key) >= MIN_PREFIX:
+            i = bisect_left(self.latin_keys, key)
+            while i < len(self.latin_keys) and self.latin_keys[i].startswith(key):
+                pid = int(self.latin_ids[i])
+                scored[pid] = max(scored.get(pid, 0.0), PREFIX_SCORE)
+                i += 1
+        best = sorted(scored.items(), key=lambda kv: -kv[1])[:limit]
+        return [(pid, float(score)) for pid, score in best]
+
+    def lookup(self, query, limit=5):
+        """
+        [(Place, score)] best first; score 1.0 = exact name/alias match.
+        "नागपुर (Nagpur)" / "Pune, Maharashtra" are tried part by part.
+        """
+        results = {}
+        parts = [p for p in re.split(r"[(),/]", str(query)) if p.strip()]
+        for part in parts:
+            key = normalize_name(part)
+            if not key:
+                continue
+            if key in self.exact:
+                results[self.exact[key]] = 1.0
+                continue
+            if _DEVANAGARI.search(key):
+                key = normalize_name(transliterate(key))
+                if key in self.exact:
+                    results[self.exact[key]] = max(results.get(self.exact[key], 0.0), 0.95)
+                    continue
+            for pid, score in self._fuzzy(key, limit):
+                results[pid] = max(results.get(pid, 0.0), score)
+        best = sorted(results.items(), key=lambda kv: -kv[1])[:limit]
+        return [(self.place(pid), score) for pid, score in best]
+
+    def resolve(self, query):
+        """
+        Place the query names exactly (name, alias or transliteration), else None.
+        """
+        matches = self.lookup(query, limit=1)
+        if matches and matches[0][1] >= EXACT_SCORE:
+            return matches[0][0]
+        return None
+
+    def suggest(self, query, limit=3):
+        """
+        Close places for a name that didn't resolve ("did you mean"), best first.
+        """
+        return [place for place, score in self.lookup(query, limit) if score >= MIN_SCORE]
+
+    def alternate_names(self, query):
+        """
+        Latin spellings of the place the query resolves to, official name
+        first ("औरंगाबाद" -> Chhatrapati Sambhajinagar, Aurangabad, ...), else [].
+        """
+        place = self.resolve(query)
+        return list(self.latin_names[self._pid[place.name]]) if place else []
+
+
+@st.cache_resource(show_spinner=False)
+def get_gazetteer():
+    return Gazetteer()
+
+
+def is_devanagari(text):
+    return bool(_DEVANAGARI.search(str(text)))
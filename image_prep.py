@@ -0,0 +1,94 @@
+import io
+import os
+import time
+from PIL import Image, ImageOps
+from google.genai import types
+
+# --- VISION UPLOAD PIPELINE ---
+# Phone photos (4000x3000, several MB) are downscaled, rotated upright, stripped
+# of EXIF and re-encoded before they are sent to Gemini. Without this the SDK
+# uploads Streamlit-uploaded images as lossless PNG.
+
+MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1024"))
+UPLOAD_FORMAT = os.getenv("IMAGE_UPLOAD_FORMAT", "JPEG").upper()  # JPEG or WEBP
+UPLOAD_QUALITY = int(os.getenv("IMAGE_UPLOAD_QUALITY", "80"))
+# Assumed uplink for the "time saved" estimate in the logs (rural 3G/4G)
+UPLINK_KBPS = float(os.getenv("UPLINK_KBPS", "512"))
+
+
+def _source_size(img):
+    # Size of the uploaded file, read before PIL loads (and drops) the file handle
+    fp = getattr(img, "fp", None)
+    size = getattr(fp, "size", None)
+    if isinstance(size, int):
+        return size
+    try:
+        pos = fp.tell()
+        fp.seek(0, os.SEEK_END)
+        size = fp.tell()
+        fp.seek(pos)
+        return size
+    except Exception:
+        return img.width * img.height * len(img.getbands())
+
+
+def prepare_image(img, max_edge=MAX_EDGE):
+    """
+    Upright RGB copy of the image, at most max_edge px on the long side, no EXIF.
+    Safe to call twice; the caller's image is never modified.
+    """
+    if img.info.get("prepared"):
+        return img
+    start = time.perf_counter()
+    source_bytes = _source_size(img)
+    original_size = img.size
+    out = ImageOps.exif_transpose(img)
+    if out is img:
+        out = img.copy()
+    if out.mode != "RGB":
+        out = out.convert("RGB")
+    out.thumbnail((max_edge, max_edge), Image.LANCZOS, reducing_gap=3.0)
+    out.info = {
+        "prepared": True,
+        "source_bytes": source_bytes,
+        "source_size": original_size,
+        "prep_ms": (time.perf_counter() - start) * 1000,
+    }
+    return out
+
+
+def encode_image(img, fmt=UPLOAD_FORMAT, quality=UPLOAD_QUALITY):
+    buf = io.BytesIO()
+    if fmt == "WEBP":
+        img.save(buf, "WEBP", quality=quality, method=4)
+        return buf.getvalue(), "image/webp"
+    img.save(buf, "JPEG", quality=quality, optimize=True, progressive=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+def encode_for_upload(contents):
+    """
+    Replaces PIL images in a prompt list with compact encoded Parts.
+    """
+    if not isinstance(contents, list):
+        return contents
+    out = []
+    for part in contents:
+        if isinstance(part, Image.Image):
+            img = prepare_image(part)
+            start = time.perf_counter()
+            data, mime = encode_image(img)
+            encode_ms = (time.perf_counter() - start) * 1000
+            before = img.info.get("source_bytes", len(data))
+            after = len(data)
+            saved_s = max(before - after, 0) * 8 / (UPLINK_KBPS * 1000)
+            src_w, src_h = img.info.get("source_size", img.size)
+            print(
+                f"Image prep: {src_w}x{src_h} {before / 1024:.0f} KB -> {img.width}x{img.height} "
+                f"{after / 1024:.0f} KB {mime} ({img.info.get('prep_ms', 0) + encode_ms:.0f} ms), "
+                f"~{saved_s:.1f}s upload saved at {UPLINK_KBPS:.0f} kbps"
+            )
+            out.append(types.Part.from_bytes(data=data, mime_type=mime))
+        else:
+            out.append(part)
+    return out
@@ -1,162 +1,117 @@
 import streamlit as st
-from google import genai
 import os
+import operator
 from dotenv import load_dotenv
 import numpy as np
-import requests
 import random
+from concurrent.futures import wait as futures_wait
 from datetime import datetime
 import pandas as pd
 
 load_dotenv(override=True)
 
-# --- GEMINI AI CONFIGURATION ---
-def get_api_key():
-    try:
-        # Check Streamlit Cloud Secrets first
-        if "GOOGLE_API_KEY" in st.secrets:
-            return st.secrets["GOOGLE_API_KEY"]
-    except:
-        pass
-    # Fallback to local .env
-    return os.getenv("GOOGLE_API_KEY")
-
-api_key = get_api_key()
-# Initialize client safely
-try:
-    if api_key:
-        client = genai.Client(api_key=api_key)
-    else:
-        client = None
-except Exception as e:
-    print(f"GenAI Client Init Error: {e}")
-    client = None
+# --- RULE-BASED CROP RECOMMENDATION ---
+# Rules are checked in order, the first match wins; no match -> CROP_RULE_DEFAULT.
+# Each rule is a list of (input, operator, threshold) conditions that must all hold.
+CROP_RULES = [
+    ("Cotton", [("N", ">", 100)]),
+    ("Rice", [("P", ">", 50), ("rainfall", ">", 200)]),
+    ("Millets", [("rainfall", "<", 50)]),
+    ("Wheat", [("temperature", "<", 20)]),
+]
+CROP_RULE_DEFAULT = "Maize"
+
+CROP_RULE_TEXT = {
+    'English': {
+        'Cotton': {'name': 'Cotton', 'reason': 'High Nitrogen detected, good for cash crops.'},
+        'Rice': {'name': 'Rice', 'reason': 'High rainfall and phosphorus levels suitable for paddy.'},
+        'Millets': {'name': 'Millets', 'reason': 'Low rainfall condition detected. Drought-resistent crop.'},
+        'Wheat': {'name': 'Wheat', 'reason': 'Cooler temperature suitable for Rabi crops.'},
+        'Maize': {'name': 'Maize', 'reason': 'Balanced conditions suitable for versatile crops.'}
+    },
+    'Hindi': {
+        'Cotton': {'name': 'कपास (Cotton)', 'reason': 'उच्च नाइट्रोजन पाया गया, नकदी फसलों के लिए अच्छा है।'},
+        'Rice': {'name': 'चावल (Rice)', 'reason': 'उच्च वर्षा और फास्फोरस का स्तर धान के लिए उपयुक्त है।'},
+        'Millets': {'name': 'बाजरा/मिलेट्स (Millets)', 'reason': 'कम वर्षा की स्थिति का पता चला। सूखा प्रतिरोधी फसल।'},
+        'Wheat': {'name': 'गेहूं (Wheat)', 'reason': 'ठंडा तापमान रबी फसलों के लिए उपयुक्त है।'},
+        'Maize': {'name': 'मक्का (Maize)', 'reason': 'बहुमुखी फसलों के लिए संतुलित स्थिति उपयुक्त है।'}
+    },
+    'Marathi': {
+        'Cotton': {'name': 'कापूस (Cotton)', 'reason': 'उच्च नत्र आढळले, नगदी पिकांसाठी चांगले.'},
+        'Rice': {'name': 'तांदूळ (Rice)', 'reason': 'जास्त पाऊस आणि स्फुरद पातळी भात शेतीसाठी योग्य आहे.'},
+        'Millets': {'name': 'बाजरी/मिलेट्स (Millets)', 'reason': 'कमी पावसाची स्थिती आढळली. दुष्काळ प्रतिरोधक पीक.'},
+        'Wheat': {'name': 'गहू (Wheat)', 'reason': 'कमी तापमान रबी पिकांसाठी योग्य आहे.'},
+        'Maize': {'name': 'मक्का (Maize)', 'reason': 'संतुलित स्थिती विविध पिकांसाठी योग्य आहे.'}
+    }
+}
 
-def get_crop_recommendation(N, P, K, temperature, humidity, ph, rainfall, language='English'):
+# operator.* compare plain numbers and NumPy arrays (elementwise) alike
+_RULE_OPS = {">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+CROP_RULE_INPUTS = ('N', 'P', 'K', 'temperature', 'humidity', 'ph', 'rainfall')
+# Conditions compiled to (argument position, operator, threshold)
+_COMPILED_RULES = [
+    tuple((CROP_RULE_INPUTS.index(name), _RULE_OPS[op], limit) for name, op, limit in conditions)
+    for _, conditions in CROP_RULES
+]
+_RULE_KEYS = [key for key, _ in CROP_RULES] + [CROP_RULE_DEFAULT]
+# Per language: (names, reasons) as arrays indexed by rule number, default last
+_RULE_TABLES = {
+    lang: tuple(np.array([text[k][field] for k in _RULE_KEYS], dtype=object) for field in ('name', 'reason'))
+    for lang, text in CROP_RULE_TEXT.items()
+}
+_SCALAR_TYPES = (int, float, np.integer, np.floating)
+
+
+def crop_rule_index(values):
     """
-    Hybrid Logic: Uses rule-based knowledge first, then AI if unsure.
+    Index into _RULE_KEYS of the first matching rule for `values` in
+    CROP_RULE_INPUTS order: scalars give an int, arrays (one entry per farm,
+    broadcastable) an int array. NaN never matches, so it falls to the default.
     """
-    trans = {
-        'English': {
-            'Cotton': {'name': 'Cotton', 'reason': 'High Nitrogen detected, good for cash crops.'},
-            'Rice': {'name': 'Rice', 'reason': 'High rainfall and phosphorus levels suitable for paddy.'},
-            'Millets': {'name': 'Millets', 'reason': 'Low rainfall condition detected. Drought-resistent crop.'},
-            'Wheat': {'name': 'Wheat', 'reason': 'Cooler temperature suitable for Rabi crops.'},
-            'Maize': {'name': 'Maize', 'reason': 'Balanced conditions suitable for versatile crops.'}
-        },
-        'Hindi': {
-            'Cotton': {'name': 'कपास (Cotton)', 'reason': 'उच्च नाइट्रोजन पाया गया, नकदी फसलों के लिए अच्छा है।'},
-            'Rice': {'name': 'चावल (Rice)', 'reason': 'उच्च वर्षा और फास्फोरस का स्तर धान के लिए उपयुक्त है।'},
-            'Millets': {'name': 'बाजरा/मिलेट्स (Millets)', 'reason': 'कम वर्षा की स्थिति का पता चला। सूखा प्रतिरोधी फसल।'},
-            'Wheat': {'name': 'गेहूं (Wheat)', 'reason': 'ठंडा तापमान रबी फसलों के लिए उपयुक्त है।'},
-            'Maize': {'name': 'मक्का (Maize)', 'reason': 'बहुमुखी फसलों के लिए संतुलित स्थिति उपयुक्त है।'}
-        },
-        'Marathi': {
-            'Cotton': {'name': 'कापूस (Cotton)', 'reason': 'उच्च नत्र आढळले, नगदी पिकांसाठी चांगले.'},
-            'Rice': {'name': 'तांदूळ (Rice)', 'reason': 'जास्त पाऊस आणि स्फुरद पातळी भात शेतीसाठी योग्य आहे.'},
-            'Millets': {'name': 'बाजरी/मिलेट्स (Millets)', 'reason': 'कमी पावसाची स्थिती आढळली. दुष्काळ प्रतिरोधक पीक.'},
-            'Wheat': {'name': 'गहू (Wheat)', 'reason': 'कमी तापमान रबी पिकांसाठी योग्य आहे.'},
-            'Maize': {'name': 'मक्का (Maize)', 'reason': 'संतुलित स्थिती विविध पिकांसाठी योग्य आहे.'}
-        }
-    }
-    
-    l_map = trans.get(language, trans['English'])
-    
-    res_key = "Maize"
-    if N > 100: res_key = "Cotton"
-    elif P > 50 and rainfall > 200: res_key = "Rice"
-    elif rainfall < 50: res_key = "Millets"
-    elif temperature < 20: res_key = "Wheat"
-    
-    res = l_map.get(res_key, l_map['Maize'])
-    return res['name'], res['reason']
+    if all(isinstance(v, _SCALAR_TYPES) for v in values):
+        # One farm: plain comparisons, no array setup
+        for i, conditions in enumerate(_COMPILED_RULES):
+            for pos, op, limit in conditions:
+                if not op(values[pos], limit):
+                    break
+            else:
+                return i
+        return len(_COMPILED_RULES)
+    arrays = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64) for v in values))
+    masks = [
+        np.logical_and.reduce([op(arrays[pos], limit) for pos, op, limit in conditions])
+        for conditions in _COMPILED_RULES
+    ]
+    return np.select(masks, np.arange(len(masks)), default=len(masks))
 
-# Robust Generation Function
-import time
-import random
 
-# Robust Generation Function
-import time
-import random
+def get_crop_recommendation(N, P, K, temperature, humidity, ph, rainfall, language='English'):
+    """
+    Hybrid Logic: Uses rule-based knowledge first, then AI if unsure.
+    Scalars give (name, reason); arrays (one entry per farm) give two arrays.
+    """
+    idx = crop_rule_index((N, P, K, temperature, humidity, ph, rainfall))
+    names, reasons = _RULE_TABLES.get(language, _RULE_TABLES['English'])
+    return names[idx], reasons[idx]
 
 # Robust Generation Function
-import time
-import random
-
-# Cached internal function for text-only prompts to save quota
-@st.cache_data(ttl=3600, show_spinner=False)
-def _cached_ai_call(model_name, prompt_text):
-    api_key = get_api_key()
-    if not api_key: return None
-    client = genai.Client(api_key=api_key)
-    response = client.models.generate_content(
-        model=model_name,
-        contents=prompt_text
-    )
-    return response.text
-
-def generate_ai_response_v2(prompt, language='English'):
-    # Adapt prompt for language
-    lang_instruction = f"\n\nIMPORTANT: Response must be entirely in {language} language."
-    if isinstance(prompt, str):
-        full_prompt = prompt + lang_instruction
-    else:
-        # If it's a list (e.g. for images), append instruction to the last text part or as a new part
-        full_prompt = prompt + [lang_instruction]
-    
-    # Valid Models - Ordered by preference/speed
-    models = [
-        "gemini-2.0-flash",
-        "gemini-2.0-flash-lite-preview-02-05",
-        "gemini-1.5-flash",
-        "gemini-1.5-flash-8b",
-        "gemini-1.5-pro",
-        "gemini-1.0-pro"
-    ]
-    last_error = None
+from ai_gateway import generate_sync, stream_sync, AIUnavailable
+from rate_limiter import PRIORITY_CHAT, PRIORITY_NORMAL, PRIORITY_LOW
+from image_prep import prepare_image
+from geocoder import get_gazetteer
+from weather_cache import get_weather_cache, current_weather_request, OWM_CURRENT_URL, WeatherUpstreamError
+from weather_forecast import get_forecast_store
+from weather_archive import get_weather_archive
+from mandi_store import get_mandi_store, canonical_state, commodity_names, district_names
+from mandi_ingest import get_mandi_ingestor, MANDI_REFRESH, FIRST_SYNC_BUDGET
+from price_trends import get_price_trends, TREND_DAYS
+
+def _ai_unavailable_text(reason, language):
+    if reason == "invalid_key":
+        return f"⚠️ System Error: Invalid API Key. Please update your .env file."
+    if reason == "quota":
+        return f"⚠️ System Error: AI Quota Exceeded. The API key has reached its daily limit."
     
-    # Try to use Cache if prompt is simple string
-    if isinstance(prompt, str):
-        try:
-            return _cached_ai_call(models[0], str(full_prompt))
-        except Exception:
-            pass 
-
-    for attempt, model_name in enumerate(models):
-        try:
-            # Add a slight delay between model shifts for better reliability
-            if attempt > 0:
-                time.sleep(1.5)
-            
-            api_key = get_api_key()
-            if not api_key: raise Exception("No API Key")
-            client = genai.Client(api_key=api_key)
-            
-            response = client.models.generate_content(
-                model=model_name,
-                contents=full_prompt
-            )
-            
-            if response and response.text:
-                return response.text
-                
-        except Exception as e:
-            last_error = e
-            error_str = str(e)
-            print(f"Model {model_name} failed: {error_str}")
-            
-            # Quota Check
-            if "429" in error_str or "RESOURCE_EXHAUSTED" in error_str:
-                if attempt == len(models) - 1: # Only return error if ALL models fail or it's the last one
-                     return f"⚠️ System Error: AI Quota Exceeded. The API key has reached its daily limit."
-                time.sleep(2)
-                continue
-                
-            # Invalid Key Check
-            if "API key not valid" in error_str or "KEY_INVALID" in error_str:
-                return f"⚠️ System Error: Invalid API Key. Please update your .env file."
-            continue
-            
     # --- SIMULATED FALLBACK ---
     fallback_trans = {
         'English': '🤖 AI is currently busy. Quick Tip: Check soil moisture levels. If leaves are yellowing, ensure proper drainage and apply balanced fertilizer.',
@@ -166,51 +121,44 @@ def generate_ai_response_v2(prompt, language='English'):
     
     return fallback_trans.get(language, fallback_trans['English'])
 
+def generate_ai_response_v2(prompt, language='English', hedge=None, priority=PRIORITY_NORMAL):
+    """
+    Non-streaming AI call (sync wrapper over ai_gateway.generate).
+    hedge=True races the top two models (default: AI_HEDGING env setting).
+    priority decides who gets shed first when the quota runs low (rate_limiter.py).
+    """
+    try:
+        return generate_sync(prompt, language=language, priority=priority, hedge=hedge)
+    except AIUnavailable as e:
+        return _ai_unavailable_text(e.reason, language)
+    except Exception as e:
+        print(f"AI call failed: {e}")
+        return _ai_unavailable_text("busy", language)
+
 def generate_ai_response_stream(prompt, language='English'):
     """
     Generator version of AI response for streaming.
     """
-    lang_instruction = f"\n\nIMPORTANT: Response must be entirely in {language} language."
-    full_prompt = prompt + lang_instruction if isinstance(prompt, str) else prompt + [lang_instruction]
-    
-    models = [
-        "gemini-2.0-flash", 
-        "gemini-2.0-flash-lite-preview-02-05",
-        "gemini-1.5-flash", 
-        "gemini-1.5-flash-8b",
-        "gemini-1.5-pro"
-    ]
-    
-    for attempt, model_name in enumerate(models):
-        try:
-            if attempt > 0:
-                time.sleep(1.2)
-            api_key = get_api_key()
-            if not api_key: break
-            client = genai.Client(api_key=api_key)
-            responses = client.models.generate_content_stream(
-                model=model_name,
-                contents=full_prompt
-            )
-            
-            has_content = False
-            for chunk in responses:
-                if chunk.text:
-                    has_content = True
-                    yield chunk.text
-            
-            if has_content:
-                return # Exit ONLY if we actually got something
-                
-        except Exception as e:
-            if "429" in str(e):
-                time.sleep(2)
-            continue
+    has_content = False
+    try:
+        for chunk in stream_sync(prompt, language=language, priority=PRIORITY_CHAT):
+            has_content = True
+            yield chunk
+        return
+    except AIUnavailable as e:
+        if e.reason == "no_key":
+            print("AI stream skipped: No API Key")
+    except Exception as e:
+        print(f"AI stream failed: {e}")
+        if has_content:
+            return # Keep the partial answer
             
     # Fallback if all strictly fail OR no content yielded
-    fallback_text = generate_ai_response_v2(prompt, language=language)
-    for char in fallback_text:
-        yield char
+    fallback_text = generate_ai_response_v2(prompt, language=language, priority=PRIORITY_CHAT)
+    # Word-sized chunks (each keeps its trailing whitespace)
+    import re
+    for word in re.split(r"(?<=\s)(?=\S)", fallback_text):
+        yield word
 
 def get_ai_response(prompt, api_key=None, language='English'):
     """
@@ -231,7 +179,8 @@ def get_ai_explanation(predicted_crop, N, P, K, temp, hum, ph, rain, language='E
         
         Explain in 2 simple sentences why {predicted_crop} is a good choice.
         """
-        return generate_ai_response_v2(prompt, language=language)
+        # Nice-to-have: gives way to chat when the quota runs low
+        return generate_ai_response_v2(prompt, language=language, priority=PRIORITY_LOW)
     except Exception as e:
         from utils import t
         return t('ai_err_general')
@@ -278,63 +227,103 @@ def get_weather_data(city, api_key=None, language='English'):
          # Return Mock Data + Warning Message
          return get_mock_data(), t('simulated_data_warn')
     
-    # Map app languages to OWM codes
-    lang_map = {'English': 'en', 'Hindi': 'hi', 'Marathi': 'mr'}
-    owm_lang = lang_map.get(language, 'en')
-
-    base_url = "http://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "q": city,
-        "appid": api_key,
-        "units": "metric",
-        "lang": owm_lang
-    }
-    
     try:
-        response = requests.get(base_url, params=params, timeout=3)
-        if response.status_code == 200:
-            return response.json(), None
-        else:
-            # Fallback for API errors (e.g. 401, 404)
-            return get_mock_data(), f"{t('ai_err_api_401')} {city}."
+        # Gazetteer coordinates (or OWM text search) + shared TTL cache, see weather_cache.py
+        key, params = current_weather_request(city, api_key, language)
+        data = get_weather_cache().get(key, OWM_CURRENT_URL, params)
+        # Keep the observation for rainfall / GDD history (weather_archive.py)
+        get_weather_archive().record(key[0], data)
+        return data, None
+    except WeatherUpstreamError as e:
+        # Fallback for API errors (e.g. 401, 404) and unknown city names
+        message = f"{t('ai_err_api_401')} {city}."
+        if e.status_code == 404:
+            # Near-miss names are suggested, never silently swapped for another town
+            suggestions = get_gazetteer().suggest(city)
+            if suggestions:
+                message += f" {t('did_you_mean')}: " + ", ".join(f"{p.name} ({p.state})" for p in suggestions) + "?"
+        return get_mock_data(), message
     except Exception as e:
         # Fallback for Connection errors
         return get_mock_data(), str(e)
 
-def get_market_trends_data(commodity="Rice", base_price=None):
-    # Simulated trend data for the LAST 7 DAYS
-    from datetime import datetime, timedelta
-    dates = []
-    prices = []
-    
-    # If base_price is not provided, generate one based on commodity name
-    if base_price is None:
-        random.seed(commodity) 
-        base = random.randint(1800, 4500)
-    else:
-        base = int(float(base_price))
-        
-    current_date = datetime.now()
-    
-    # Create 7 days of data. The last day (today) should be exactly the 'base' price.
-    temp_prices = [base]
-    curr_p = base
-    for i in range(1, 7):
-        # Generate previous days by reversing the random walk
-        curr_p = curr_p + random.randint(-150, 150)
-        temp_prices.insert(0, int(curr_p))
-        
-    for i in range(6, -1, -1):
-        date_str = (current_date - timedelta(days=i)).strftime("%d-%b")
-        dates.append(date_str)
-    
-    random.seed() # Reset seed
-    return {"dates": dates, "prices": temp_prices}
+def get_weather_forecast(city, api_key=None, language='English'):
+    """
+    5-day forecast (weather_forecast.CityForecast) for the city, served from the
+    ingested store. None without an API key or if the forecast can't be fetched.
+    """
+    if not api_key:
+        api_key = get_weather_api_key()
+    if not api_key or "your_" in api_key:
+        return None
+    try:
+        return get_forecast_store().get(city, api_key, language)
+    except WeatherUpstreamError:
+        return None
+
+HISTORY_MIN_COVERAGE = 0.8  # share of the 30 days' hours the archived rain must cover
+
+def get_weather_history(city, language='English'):
+    """
+    Observed rain (7/30 days) and growing degree days for the city from the
+    local archive; no network call. None if the city can't be resolved.
+    """
+    try:
+        key, _ = current_weather_request(city, None, language)
+    except WeatherUpstreamError:
+        return None
+    return get_weather_archive().summary(key[0])
+
+def estimate_rainfall(forecast=None, weather=None, history=None):
+    """
+    Rainfall feature for the crop models. Crop_recommendation.csv uses monthly
+    totals (~20-300 mm): prefer the archived last-30-days rain once its
+    observations cover most of the month's hours, else the forecast's mean
+    daily rain scaled to 30 days, else the current-conditions guess.
+    """
+    if history and history.get("rain_coverage_30d", 0) >= HISTORY_MIN_COVERAGE:
+        return round(float(np.clip(history["rain_30d_mm"], 20, 300)), 1)
+    if forecast is not None and forecast.hours_covered() >= 24:
+        hours = min(forecast.hours_covered(), 5 * 24)
+        per_day = forecast.rain_sum(hours) / (hours / 24.0)
+        return round(float(np.clip(per_day * 30, 20, 300)), 1)
+    description = (weather or {}).get("weather", [{}])[0].get("description", "").lower()
+    return 200 if "rain" in description else 100
+
+def get_market_trends_data(commodity="Rice", state=None, district=None, market=None, days=TREND_DAYS):
+    """
+    Price history and trend analytics (moving averages, bands, day-over-day
+    change, volatility) from the local mandi price warehouse, cached per
+    commodity and market. None until prices for the selection were ingested.
+    """
+    return get_price_trends().get(
+        canonical_state(state) if state else None,
+        district_names(district) if district else [],
+        commodity_names(commodity),
+        market=market,
+        days=days,
+    )
+
+def get_price_forecast(commodity, state=None, district=None, market=None):
+    """
+    Precomputed price forecast (price_forecast.py) for the selection: list of
+    {"date", "price", "lower", "upper", "model", "mae", "n_obs", "last_date",
+    "last_price"} for dates from today on, empty if none. Nothing is fitted here.
+    """
+    return get_mandi_store().forecast(
+        canonical_state(state) if state else None,
+        district_names(district) if district else [],
+        commodity_names(commodity),
+        market=market,
+    )
 
 def get_mandi_prices(api_key, state, district, commodity, language='English'):
     """
-    Fetches real-time market prices from OGD India API.
-    Fallback: Generates realistic simulated data if API Key is missing.
+    Market prices from the local OGD price warehouse (mandi_store.py).
+    (state, commodity) pairs never ingested are synced in the background and
+    waited for at most FIRST_SYNC_BUDGET seconds (pages stored by then are
+    shown); ones older than MANDI_REFRESH are refreshed in the background.
+    Fallback: Generates realistic simulated data if nothing is available.
     """
     is_live = False
     data = []
@@ -346,45 +335,41 @@ def get_mandi_prices(api_key, state, district, commodity, language='English'):
         'Marathi': {'market': 'बाजार', 'min': 'किमान भाव (₹/क्विंटल)', 'max': 'कमाल भाव (₹/क्विंटल)', 'modal': 'सरासरी भाव (₹/क्विंटल)', 'kg': 'भाव (₹/किलो)', 'date': 'तारीख', 'unknown': 'अज्ञात', 'today': 'आज', 'apmc': 'एपीएमसी', 'mandi': 'मंडी', 'rural': 'ग्रामीण बाजार', 'near': 'जवळचे'}
     }
     l_map = trans.get(language, trans['English'])
-    
-    # API URL for real-time data
-    url = "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
-    
-    if api_key:
-        try:
-            params = {
-                "api-key": api_key,
-                "format": "json",
-                "filters[state]": state,
-                "filters[district]": district,
-                "filters[commodity]": commodity,
-                "limit": 10
-            }
-            response = requests.get(url, params=params, timeout=5)
-            if response.status_code == 200:
-                json_data = response.json()
-                records = json_data.get('records', [])
-                if records:
-                    is_live = True
-                    for rec in records:
-                        try:
-                            modal = float(rec.get('modal_price', 0))
-                            min_p = float(rec.get('min_price', 0))
-                            max_p = float(rec.get('max_price', 0))
-                        except:
-                            modal = 0; min_p = 0; max_p = 0
-
-                        data.append({
-                            l_map['market']: rec.get('market', l_map['unknown']),
-                            l_map['min']: min_p,
-                            l_map['max']: max_p,
-                            l_map['modal']: modal,
-                            l_map['kg']: round(modal / 100, 2),
-                            l_map['date']: rec.get('arrival_date', l_map['today'])
-                        })
-        except Exception as e:
-            pass # Fallthrough to simulation
-            
+
+    # Page labels may be Hindi/Marathi; the OGD data uses English names
+    state_en = canonical_state(state)
+    commodities = commodity_names(commodity)
+    districts = district_names(district)
+    store = get_mandi_store()
+
+    # "Other" has no state filter; an all-India pull is left to the CLI
+    if api_key and state_en:
+        ingestor = get_mandi_ingestor(api_key)
+        first_syncs = []
+        for name in commodities:
+            age = store.sync_age(state_en, name)
+            if age is None:
+                first_syncs.append(ingestor.refresh_async(state_en, name))
+            elif age > MANDI_REFRESH:
+                ingestor.refresh_async(state_en, name)
+        if first_syncs:
+            futures_wait(first_syncs, timeout=FIRST_SYNC_BUDGET)
+
+    for rec in store.latest(state_en, districts, commodities):
+        is_live = True
+        modal = rec['modal_price'] or 0
+        market = rec['market'] or l_map['unknown']
+        if rec['variety'] and rec['variety'] != 'Other':
+            market = f"{market} ({rec['variety']})"  # a market may list several varieties
+        data.append({
+            l_map['market']: market,
+            l_map['min']: rec['min_price'] or 0,
+            l_map['max']: rec['max_price'] or 0,
+            l_map['modal']: modal,
+            l_map['kg']: round(modal / 100, 2),
+            l_map['date']: datetime.strptime(rec['arrival_date'], "%Y-%m-%d").strftime("%d/%m/%Y")
+        })
+
     if not is_live:
         # Generate Realistic Simulation ("Interview Ready") for ANY input
         
@@ -415,6 +400,16 @@ def get_mandi_prices(api_key, state, district, commodity, language='English'):
             
     return data, is_live
 
+def mandi_sync_running(api_key, state, commodity):
+    """
+    True while a background OGD sync for the selection is still running.
+    """
+    state_en = canonical_state(state)
+    if not api_key or not state_en:
+        return False
+    ingestor = get_mandi_ingestor(api_key)
+    return any(ingestor.syncing(state_en, name) for name in commodity_names(commodity))
+
 def get_fertilizer_recommendation(N, P, K, crop, image_data=None, pest_issue=None, crop_stage="Unknown", language="English"):
     """
     Generates fertilizer usage advice using AI.
@@ -427,6 +422,8 @@ def get_fertilizer_recommendation(N, P, K, crop, image_data=None, pest_issue=Non
         
         inputs = []
         if image_data:
+            # Downscale / orient once; the cache key and the upload both use this copy
+            image_data = prepare_image(image_data)
             # Vision Inputs
             prompt = f'''
             Act as an expert Agronomist.
@@ -705,6 +702,7 @@ def get_yield_prediction(state, crop, season, area, soil="Loamy", weather="Norma
 
         inputs = []
         if image_data:
+             image_data = prepare_image(image_data)
              # VISION MODEL
              prompt = f"""
              Act as a Senior Agronomist.
@@ -0,0 +1,207 @@
+import argparse
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+
+from mandi_store import get_mandi_store
+from single_flight import get_single_flight
+
+# --- MANDI PRICE INGESTION ---
+# Walks the data.gov.in daily mandi price resource for one (state, commodity)
+# with offset pagination: the first page gives the record total, the remaining
+# pages are fetched PAGE_CONCURRENCY at a time over a pooled session, each with
+# retries and exponential backoff. Every page is upserted into the local
+# warehouse (mandi_store.py) together with a checkpoint, so an interrupted sync
+# resumes with the pages it was missing. Runs in the background on demand from
+# get_mandi_prices (which waits at most FIRST_SYNC_BUDGET seconds for a pair's
+# first pages) or from the command line:
+#   python mandi_ingest.py --state Maharashtra --commodity Wheat Onion
+# OGD_MANDI_URL / --url point it at another server (e.g. a local stand-in).
+
+OGD_MANDI_URL = os.getenv(
+    "OGD_MANDI_URL", "https://api.data.gov.in/resource/9ef84268-d588-465a-a308-a864a43d0070"
+)
+PAGE_LIMIT = 1000
+MAX_PAGES = 50
+PAGE_CONCURRENCY = int(os.getenv("MANDI_PAGE_CONCURRENCY", "4"))
+MAX_RETRIES = 4
+BACKOFF_BASE = 0.5   # seconds, doubled per attempt (with jitter)
+BACKOFF_MAX = 20.0
+RETRY_STATUS = {429, 500, 502, 503, 504}
+REQUEST_TIMEOUT = 10
+MANDI_REFRESH = int(os.getenv("MANDI_REFRESH", str(6 * 3600)))  # OGD publishes once a day
+FIRST_SYNC_BUDGET = 3.0  # seconds a page request waits for a first sync
+
+
+class MandiFetchError(Exception):
+    """
+    A page could not be fetched (non-retryable status, or retries exhausted).
+    """
+
+
+class MandiIngestor:
+    def __init__(self, api_key, url=OGD_MANDI_URL, store=None, concurrency=PAGE_CONCURRENCY,
+                 page_limit=PAGE_LIMIT):
+        self.api_key = api_key
+        self.url = url
+        self.store = store or get_mandi_store()
+        self.concurrency = max(1, concurrency)
+        self.page_limit = page_limit
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency + 1)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mandi")
+        self._lock = threading.Lock()
+        self._refreshing = {}  # (state, commodity) -> Future of the running sync
+        self.retries = 0
+        self.last_sync = {}
+
+    def _backoff(self, attempt, response=None):
+        delay = min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * random.uniform(0.5, 1.5)
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = min(max(delay, float(retry_after)), BACKOFF_MAX)
+        with self._lock:
+            self.retries += 1
+        time.sleep(delay)
+
+    def _page(self, state, commodity, offset):
+        params = {"api-key": self.api_key, "format": "json", "limit": self.page_limit, "offset": offset,
+                  "filters[commodity]": commodity}
+        if state:
+            params["filters[state]"] = state
+        for attempt in range(MAX_RETRIES + 1):
+            last = attempt == MAX_RETRIES
+            try:
+                response = self.session.get(self.url, params=params, timeout=REQUEST_TIMEOUT)
+            except requests.RequestException as e:
+                if last:
+                    raise MandiFetchError(f"offset {offset}: {e}") from e
+                self._backoff(attempt)
+                continue
+            if response.status_code == 200:
+                return response.json()
+            if response.status_code not in RETRY_STATUS or last:
+                raise MandiFetchError(f"offset {offset}: HTTP {response.status_code}")
+            self._backoff(attempt, response)
+
+    def sync(self, state, commodity):
+        """
+        Ingests every page for (state, commodity), skipping pages checkpointed
+        by an interrupted earlier run; returns the number of records stored.
+        """
+        start = time.perf_counter()
+        retries_before = self.retries
+        first = self._page(state, commodity, 0)
+        records = first.get("records", [])
+        total = int(first.get("total") or len(records))
+        done = self.store.checkpoint(state, commodity, total)
+        resumed = len(done)
+        stored = sum(done.values())
+        fetched = len(records)
+        if 0 not in done:
+            stored += self.store.upsert_page(state, commodity, 0, total, records)
+        end = min(total, MAX_PAGES * self.page_limit)
+        offsets = [o for o in range(self.page_limit, end, self.page_limit) if o not in done]
+        error = None
+        pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="mandi-page")
+        try:
+            futures = {pool.submit(self._page, state, commodity, o): o for o in offsets}
+            for future in as_completed(futures):
+                try:
+                    records = future.result().get("records", [])
+                except Exception as e:
+                    # Keep what finished; the checkpoint lets the next run resume
+                    error = error or e
+                    for pending in futures:
+                        pending.cancel()
+                    continue
+                fetched += len(records)
+                stored += self.store.upsert_page(state, commodity, futures[future], total, records)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+        duration = time.perf_counter() - start
+        self.last_sync = {
+            "state": state or "*", "commodity": commodity, "total": total,
+            "pages": 1 + len(offsets), "resumed_pages": resumed,
+            "records": stored, "fetched": fetched, "retries": self.retries - retries_before,
+            "duration_s": round(duration, 2),
+            "records_per_s": round(fetched / duration, 1) if duration > 0 else None,
+            "complete": error is None,
+        }
+        print(f"Mandi sync: {self.last_sync}")
+        if error is not None:
+            raise error
+        self.store.mark_synced(state, commodity, stored)
+        return stored
+
+    def sync_once(self, state, commodity):
+        """
+        sync(), with concurrent callers for the same pair sharing one run.
+        """
+        return get_single_flight().do(("mandi", state or "", commodity.casefold()),
+                                      lambda: self.sync(state, commodity))
+
+    def _sync_quietly(self, key, state, commodity):
+        try:
+            self.sync_once(state, commodity)
+        except Exception as e:
+            print(f"Mandi sync failed for {state}/{commodity}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+    def refresh_async(self, state, commodity):
+        """
+        Starts a background sync (unless one is running); returns its Future.
+        """
+        key = (state or "", commodity.casefold())
+        with self._lock:
+            future = self._refreshing.get(key)
+            if future is None:
+                future = self._refreshing[key] = self._executor.submit(self._sync_quietly, key, state, commodity)
+            return future
+
+    def syncing(self, state, commodity):
+        with self._lock:
+            return (state or "", commodity.casefold()) in self._refreshing
+
+
+@st.cache_resource(show_spinner=False)
+def get_mandi_ingestor(api_key):
+    return MandiIngestor(api_key)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Ingest data.gov.in mandi prices into the local warehouse.")
+    parser.add_argument("--state", default=None, help="OGD state name (default: all states)")
+    parser.add_argument("--commodity", nargs="+", required=True, help="OGD commodity names")
+    parser.add_argument("--url", default=OGD_MANDI_URL)
+    parser.add_argument("--concurrency", type=int, default=PAGE_CONCURRENCY, help="pages fetched at once")
+    parser.add_argument("--page-limit", type=int, default=PAGE_LIMIT, help="records per page")
+    args = parser.parse_args()
+    api_key = os.getenv("DATA_GOV_KEY")
+    if not api_key:
+        raise SystemExit("DATA_GOV_KEY is not set")
+    ingestor = MandiIngestor(api_key, url=args.url, concurrency=args.concurrency, page_limit=args.page_limit)
+    failed = False
+    for commodity in args.commodity:
+        try:
+            ingestor.sync(args.state, commodity)
+        except MandiFetchError as e:
+            # Pages stored so far are checkpointed; rerun to resume
+            print(f"Mandi sync incomplete for {commodity}: {e}")
+            failed = True
+    print(ingestor.store.stats())
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,413 @@
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+import streamlit as st
+
+from geocoder import get_gazetteer, is_devanagari, normalize_name, transliterate
+from utils import cache_path, TRANSLATIONS
+
+# --- LOCAL MANDI PRICE WAREHOUSE ---
+# data.gov.in daily mandi prices are ingested in bulk, one (state, commodity)
+# at a time (mandi_ingest.py), into SQLite under .cache/. Every arrival date is
+# kept, so the table doubles as price history. The Market Prices page reads
+# from here through the (state, commodity, district, arrival_date) index; the
+# API is only called to refresh a (state, commodity) pair older than
+# MANDI_REFRESH.
+
+MANDI_FILE = "mandi_prices.sqlite3"
+
+# Page labels (any language) -> names used by the OGD dataset
+COMMODITY_ALIASES = {
+    "wheat": ["Wheat"], "गेहूं": ["Wheat"], "गेहूँ": ["Wheat"], "गहू": ["Wheat"],
+    "rice": ["Rice", "Paddy(Dhan)(Common)"], "paddy": ["Paddy(Dhan)(Common)", "Rice"],
+    "चावल": ["Rice", "Paddy(Dhan)(Common)"], "धान": ["Paddy(Dhan)(Common)", "Rice"],
+    "तांदूळ": ["Rice", "Paddy(Dhan)(Common)"], "भात": ["Paddy(Dhan)(Common)", "Rice"],
+    "soybean": ["Soyabean"], "soyabean": ["Soyabean"], "सोयाबीन": ["Soyabean"],
+    "cotton": ["Cotton"], "कपास": ["Cotton"], "कापूस": ["Cotton"],
+    "onion": ["Onion"], "प्याज": ["Onion"], "कांदा": ["Onion"],
+    "tomato": ["Tomato"], "टमाटर": ["Tomato"], "टोमॅटो": ["Tomato"],
+    "potato": ["Potato"], "आलू": ["Potato"], "बटाटा": ["Potato"],
+    "maize": ["Maize"], "मक्का": ["Maize"], "मका": ["Maize"],
+    "gram": ["Bengal Gram(Gram)(Whole)"], "chana": ["Bengal Gram(Gram)(Whole)"],
+    "चना": ["Bengal Gram(Gram)(Whole)"], "हरभरा": ["Bengal Gram(Gram)(Whole)"],
+    "tur": ["Arhar (Tur/Red Gram)(Whole)"], "arhar": ["Arhar (Tur/Red Gram)(Whole)"],
+    "अरहर": ["Arhar (Tur/Red Gram)(Whole)"], "तूर": ["Arhar (Tur/Red Gram)(Whole)"],
+    "jowar": ["Jowar(Sorghum)"], "ज्वार": ["Jowar(Sorghum)"], "ज्वारी": ["Jowar(Sorghum)"],
+    "bajra": ["Bajra(Pearl Millet/Cumbu)"], "बाजरा": ["Bajra(Pearl Millet/Cumbu)"],
+    "बाजरी": ["Bajra(Pearl Millet/Cumbu)"],
+    "groundnut": ["Groundnut"], "मूंगफली": ["Groundnut"], "भुईमूग": ["Groundnut"],
+    "mustard": ["Mustard"], "सरसों": ["Mustard"], "मोहरी": ["Mustard"],
+    "sugarcane": ["Sugarcane"], "गन्ना": ["Sugarcane"], "ऊस": ["Sugarcane"],
+    "turmeric": ["Turmeric"], "हल्दी": ["Turmeric"], "हळद": ["Turmeric"],
+    "banana": ["Banana"], "केला": ["Banana"], "केळी": ["Banana"],
+    "chilli": ["Green Chilli", "Dry Chillies"], "मिर्च": ["Green Chilli", "Dry Chillies"],
+    "मिरची": ["Green Chilli", "Dry Chillies"],
+}
+
+
+def _state_labels():
+    labels = {}
+    english = TRANSLATIONS["English"]
+    for table in TRANSLATIONS.values():
+        for key, label in table.items():
+            if key.startswith("st_") and key != "st_ot" and key in english:
+                labels[normalize_name(label)] = english[key]
+    return labels
+
+
+_STATE_LABELS = _state_labels()
+
+
+def _latin_part(label):
+    """
+    "गेहूं (Wheat)" -> "Wheat"; other labels are returned unchanged.
+    """
+    for part in re.findall(r"\(([^)]*)\)", str(label)):
+        if part.strip() and not is_devanagari(part):
+            return part.strip()
+    return str(label).strip()
+
+
+def canonical_state(label):
+    """
+    English state name for a selectbox label in any language, None for "Other".
+    """
+    return _STATE_LABELS.get(normalize_name(label))
+
+
+def commodity_names(label):
+    """
+    OGD commodity names for what the user typed ("गहू (Wheat)" -> ["Wheat"]).
+    """
+    for candidate in (label, _latin_part(label)):
+        names = COMMODITY_ALIASES.get(normalize_name(candidate))
+        if names:
+            return names
+    name = _latin_part(label)
+    if is_devanagari(name):
+        name = transliterate(name)
+    return [name.title()] if name else []
+
+
+def district_names(label):
+    """
+    Spellings a district may have in the OGD data: gazetteer names and aliases
+    (renamed districts keep appearing under their old names), else the input.
+    """
+    names = get_gazetteer().alternate_names(label)
+    if names:
+        return names
+    name = _latin_part(label)
+    return [transliterate(name) if is_devanagari(name) else name] if name else []
+
+
+def parse_arrival_date(value):
+    """
+    OGD "dd/mm/yyyy" -> ISO "yyyy-mm-dd" (sortable); None if unparseable.
+    """
+    try:
+        return datetime.strptime(str(value).strip(), "%d/%m/%Y").strftime("%Y-%m-%d")
+    except ValueError:
+        return None
+
+
+_UPSERT = "INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def _price(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class MandiStore:
+    def __init__(self, path=None):
+        self.path = path or cache_path(MANDI_FILE)
+        self._local = threading.local()
+        self._init_db()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_db(self):
+        with self._conn() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS prices (
+                    state TEXT COLLATE NOCASE,
+                    district TEXT COLLATE NOCASE,
+                    market TEXT COLLATE NOCASE,
+                    commodity TEXT COLLATE NOCASE,
+                    variety TEXT COLLATE NOCASE,
+                    grade TEXT COLLATE NOCASE,
+                    arrival_date TEXT,
+                    min_price REAL,
+                    max_price REAL,
+                    modal_price REAL,
+                    fetched REAL,
+                    PRIMARY KEY (state, district, market, commodity, variety, grade, arrival_date)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prices_lookup ON prices(state, commodity, district, arrival_date)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_prices_market ON prices(commodity, market, arrival_date)")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_log (
+                    state TEXT COLLATE NOCASE,
+                    commodity TEXT COLLATE NOCASE,
+                    synced REAL,
+                    records INTEGER,
+                    PRIMARY KEY (state, commodity)
+                )
+            """)
+            # Precomputed price forecasts (price_forecast.py); market '' = district average.
+            # last_date / last_price: the series' last observation the horizon starts from.
+            # Derived data, so an older layout is simply dropped and retrained.
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(forecasts)")]
+            if columns and "last_date" not in columns:
+                conn.execute("DROP TABLE forecasts")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS forecasts (
+                    state TEXT COLLATE NOCASE,
+                    district TEXT COLLATE NOCASE,
+                    commodity TEXT COLLATE NOCASE,
+                    market TEXT COLLATE NOCASE,
+                    target_date TEXT,
+                    price REAL,
+                    lower REAL,
+                    upper REAL,
+                    model TEXT,
+                    mae REAL,
+                    n_obs INTEGER,
+                    trained REAL,
+                    last_date TEXT,
+                    last_price REAL,
+                    PRIMARY KEY (state, commodity, district, market, target_date)
+                )
+            """)
+            # Pages of an unfinished sync, so an interrupted one resumes where it stopped
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sync_pages (
+                    state TEXT COLLATE NOCASE,
+                    commodity TEXT COLLATE NOCASE,
+                    page_offset INTEGER,
+                    total INTEGER,
+                    records INTEGER,
+                    PRIMARY KEY (state, commodity, page_offset)
+                )
+            """)
+
+    @staticmethod
+    def _rows(records):
+        now = time.time()
+        rows = []
+        for rec in records:
+            day = parse_arrival_date(rec.get("arrival_date"))
+            modal = _price(rec.get("modal_price"))
+            if day is None or modal is None:
+                continue
+            rows.append((
+                rec.get("state", ""), rec.get("district", ""), rec.get("market", ""),
+                rec.get("commodity", ""), rec.get("variety", ""), rec.get("grade", ""), day,
+                _price(rec.get("min_price")), _price(rec.get("max_price")), modal, now,
+            ))
+        return rows
+
+    def upsert_records(self, records):
+        """
+        Stores OGD records (dicts as returned by the API); returns how many were kept.
+        """
+        rows = self._rows(records)
+        if rows:
+            with self._conn() as conn:
+                conn.executemany(_UPSERT, rows)
+        return len(rows)
+
+    def upsert_page(self, state, commodity, offset, total, records):
+        """
+        upsert_records() plus the sync checkpoint for this page, in one transaction.
+        """
+        rows = self._rows(records)
+        with self._conn() as conn:
+            conn.executemany(_UPSERT, rows)
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_pages VALUES (?, ?, ?, ?, ?)",
+                (state or "", commodity, offset, total, len(rows)),
+            )
+        return len(rows)
+
+    def checkpoint(self, state, commodity, total):
+        """
+        {page offset: records stored} of an unfinished sync of the same `total`;
+        a checkpoint for a different total (the dataset changed) is discarded.
+        """
+        with self._conn() as conn:
+            rows = conn.execute(
+                "SELECT page_offset, total, records FROM sync_pages WHERE state = ? AND commodity = ?",
+                (state or "", commodity),
+            ).fetchall()
+            if any(t != total for _, t, _ in rows):
+                conn.execute("DELETE FROM sync_pages WHERE state = ? AND commodity = ?", (state or "", commodity))
+                return {}
+        return {offset: n for offset, _, n in rows}
+
+    @staticmethod
+    def _where(state, districts, commodities, market=None):
+        where, params = [], []
+        if state:
+            where.append("state = ?")
+            params.append(state)
+        where.append(f"commodity IN ({','.join('?' * len(commodities))})")
+        params += commodities
+        if districts:
+            where.append(f"district IN ({','.join('?' * len(districts))})")
+            params += districts
+        if market:
+            where.append("market = ?")
+            params.append(market)
+        return " AND ".join(where), params
+
+    def latest(self, state, districts, commodities):
+        """
+        Newest price per market and variety, as dicts sorted by market.
+        `state` None searches all states; empty `districts` all districts.
+        """
+        if not commodities:
+            return []
+        where, params = self._where(state, districts, commodities)
+        # SQLite fills bare columns of a MAX() aggregate from the row holding the max
+        sql = f"""
+            SELECT market, variety, min_price, max_price, modal_price, MAX(arrival_date)
+            FROM prices WHERE {where}
+            GROUP BY state, district, market, commodity, variety ORDER BY market
+        """
+        try:
+            rows = self._conn().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Mandi store read error: {e}")
+            return []
+        return [
+            {"market": m, "variety": v, "min_price": lo, "max_price": hi, "modal_price": modal, "arrival_date": day}
+            for m, v, lo, hi, modal, day in rows
+        ]
+
+    def history(self, state, districts, commodities, market=None, since=None):
+        """
+        One row per arrival date, oldest first: (date, mean modal, lowest min,
+        highest max, markets reporting) across the matching markets.
+        """
+        if not commodities:
+            return []
+        where, params = self._where(state, districts, commodities, market)
+        if since:
+            where += " AND arrival_date >= ?"
+            params.append(since)
+        sql = f"""
+            SELECT arrival_date, AVG(modal_price), MIN(COALESCE(min_price, modal_price)),
+                   MAX(COALESCE(max_price, modal_price)), COUNT(*)
+            FROM prices WHERE {where} GROUP BY arrival_date ORDER BY arrival_date
+        """
+        try:
+            return self._conn().execute(sql, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Mandi store read error: {e}")
+            return []
+
+    def training_rows(self, since):
+        """
+        Daily mean modal price per (state, district, commodity, market) since
+        `since`, ordered by series then date.
+        """
+        return self._conn().execute("""
+            SELECT state, district, commodity, market, arrival_date, AVG(modal_price)
+            FROM prices WHERE arrival_date >= ?
+            GROUP BY state, district, commodity, market, arrival_date
+            ORDER BY state, district, commodity, market, arrival_date
+        """, (since,)).fetchall()
+
+    def replace_forecasts(self, rows):
+        """
+        Swaps in a freshly trained forecast table in one transaction.
+        rows: (state, district, commodity, market, target_date, price, lower,
+        upper, model, mae, n_obs, trained, last_date, last_price)
+        """
+        with self._conn() as conn:
+            conn.execute("DELETE FROM forecasts")
+            conn.executemany("INSERT OR REPLACE INTO forecasts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def forecast(self, state, districts, commodities, market=None, today=None):
+        """
+        Stored forecast for the best-covered matching series: list of dicts by
+        target date, each with the series' last observation (last_date /
+        last_price) to draw it from. Target dates before `today` (a stale
+        training run) are left out; empty if nothing is left.
+        """
+        today = today or date.today().isoformat()
+        if not commodities:
+            return []
+        where, params = self._where(state, districts, commodities)
+        where += " AND market = ?"
+        params.append(market or "")
+        try:
+            rows = self._conn().execute(f"""
+                SELECT state, district, commodity, target_date, price, lower, upper, model, mae, n_obs,
+                       last_date, last_price
+                FROM forecasts WHERE {where} ORDER BY n_obs DESC, state, district, commodity, target_date
+            """, params).fetchall()
+        except sqlite3.Error as e:
+            print(f"Mandi store read error: {e}")
+            return []
+        series = rows[0][:3] if rows else None
+        return [
+            {"date": day, "price": price, "lower": lo, "upper": hi, "model": model, "mae": mae, "n_obs": n,
+             "last_date": last_day, "last_price": last_price}
+            for *key, day, price, lo, hi, model, mae, n, last_day, last_price in rows
+            if tuple(key) == series and day >= today
+        ]
+
+    def revision(self):
+        """
+        Changes whenever a sync completes (cache key for derived data).
+        """
+        row = self._conn().execute("SELECT MAX(synced), COUNT(*) FROM sync_log").fetchone()
+        return row[0] or 0.0, row[1]
+
+    def sync_age(self, state, commodity):
+        """
+        Seconds since (state, commodity) was last ingested, None if never.
+        """
+        row = self._conn().execute(
+            "SELECT synced FROM sync_log WHERE state = ? AND commodity = ?", (state or "", commodity)
+        ).fetchone()
+        return time.time() - row[0] if row else None
+
+    def mark_synced(self, state, commodity, records):
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO sync_log VALUES (?, ?, ?, ?)",
+                (state or "", commodity, time.time(), records),
+            )
+            conn.execute("DELETE FROM sync_pages WHERE state = ? AND commodity = ?", (state or "", commodity))
+
+    def stats(self):
+        conn = self._conn()
+        rows, markets, first, last = conn.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT market), MIN(arrival_date), MAX(arrival_date) FROM prices"
+        ).fetchone()
+        synced = conn.execute("SELECT COUNT(*) FROM sync_log").fetchone()[0]
+        pending = conn.execute("SELECT COUNT(*) FROM sync_pages").fetchone()[0]
+        forecasts = conn.execute("SELECT COUNT(*) FROM forecasts").fetchone()[0]
+        return {"rows": rows, "markets": markets, "first_date": first, "last_date": last,
+                "synced_pairs": synced, "checkpointed_pages": pending, "forecast_rows": forecasts}
+
+
+@st.cache_resource(show_spinner=False)
+def get_mandi_store():
+    return MandiStore()
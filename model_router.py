@@ -0,0 +1,192 @@
+import threading
+import time
+from collections import deque
+import streamlit as st
+
+# --- GEMINI MODEL ROUTER ---
+# Tracks per-model health over a rolling window and orders the fallback chain so
+# every request starts with the fastest healthy model. Failing or rate-limited
+# models are taken out of rotation (circuit "open") for a cool-down period
+# instead of being retried on every request.
+
+# Valid Models - Ordered by preference (used as tie-breaker and for untried models)
+MODELS = [
+    "gemini-2.0-flash",
+    "gemini-2.0-flash-lite-preview-02-05",
+    "gemini-1.5-flash",
+    "gemini-1.5-flash-8b",
+    "gemini-1.5-pro",
+    "gemini-1.0-pro"
+]
+
+WINDOW_SECONDS = 300         # rolling window for latency / error rate
+FAILURE_THRESHOLD = 2        # consecutive failures that open the circuit
+ERROR_RATE_THRESHOLD = 0.5   # ...or this error rate over at least MIN_SAMPLES
+MIN_SAMPLES = 4
+COOLDOWN_SECONDS = 30        # circuit open time after generic failures
+RATE_LIMIT_COOLDOWN = 90     # circuit open time after a 429 / RESOURCE_EXHAUSTED
+TRIAL_TIMEOUT = 30           # a half-open trial slot not reported back within this is reissued
+
+CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+
+def is_rate_limit_error(error):
+    error_str = str(error)
+    return "429" in error_str or "RESOURCE_EXHAUSTED" in error_str
+
+
+def is_key_error(error):
+    # An invalid API key fails every model alike, so it says nothing about model health
+    error_str = str(error)
+    return "API key not valid" in error_str or "KEY_INVALID" in error_str
+
+
+class _ModelHealth:
+    def __init__(self):
+        self.samples = deque()  # (timestamp, latency or None, ok)
+        self.state = CLOSED
+        self.open_until = 0.0
+        self.consecutive_failures = 0
+        self.rate_limited = False
+        self.trial_started = 0.0
+
+    def prune(self, now):
+        while self.samples and now - self.samples[0][0] > WINDOW_SECONDS:
+            self.samples.popleft()
+
+    def error_rate(self):
+        if not self.samples:
+            return 0.0
+        return sum(1 for _, _, ok in self.samples if not ok) / len(self.samples)
+
+    def median_latency(self):
+        return self.latency_percentile(0.5)
+
+    def latency_percentile(self, pct):
+        latencies = sorted(lat for _, lat, ok in self.samples if ok and lat is not None)
+        if not latencies:
+            return None
+        return latencies[min(int(len(latencies) * pct), len(latencies) - 1)]
+
+
+class ModelRouter:
+    """
+    Health-ranked model selection with a per-model circuit breaker.
+    Shared by the streaming and non-streaming AI paths.
+    """
+    def __init__(self, models=None):
+        self.models = list(models or MODELS)
+        self._lock = threading.Lock()
+        self._health = {m: _ModelHealth() for m in self.models}
+
+    def ranked(self, candidates=None):
+        """
+        Returns the models worth trying right now, best first.
+        Open circuits are skipped; a model whose cool-down has expired is
+        let through for a single trial request (half-open).
+        """
+        candidates = candidates or self.models
+        now = time.time()
+        ranked = []
+        with self._lock:
+            for pref, model in enumerate(candidates):
+                h = self._health.setdefault(model, _ModelHealth())
+                h.prune(now)
+                if h.state == OPEN and now >= h.open_until:
+                    h.state = HALF_OPEN
+                    h.trial_started = 0.0
+                if h.state == OPEN:
+                    continue
+                if h.state == HALF_OPEN and now - h.trial_started < TRIAL_TIMEOUT:
+                    continue
+                latency = h.median_latency()
+                # Penalise flaky models: a 50% error rate doubles the effective latency
+                score = latency * (1 + 2 * h.error_rate()) if latency is not None else float("inf")
+                tier = 1 if h.state == HALF_OPEN else 0
+                ranked.append((tier, score, pref, model))
+            ranked.sort()
+            for tier, _, _, model in ranked:
+                if tier == 1:
+                    self._health[model].trial_started = now
+        return [model for _, _, _, model in ranked]
+
+    def record_success(self, model, latency=None):
+        with self._lock:
+            h = self._health.setdefault(model, _ModelHealth())
+            h.samples.append((time.time(), latency, True))
+            h.state = CLOSED
+            h.consecutive_failures = 0
+            h.rate_limited = False
+            h.trial_started = 0.0
+
+    def record_failure(self, model, error=None, latency=None):
+        now = time.time()
+        with self._lock:
+            h = self._health.setdefault(model, _ModelHealth())
+            h.samples.append((now, latency, False))
+            h.prune(now)
+            h.consecutive_failures += 1
+            h.trial_started = 0.0
+            if error is not None and is_rate_limit_error(error):
+                h.rate_limited = True
+                self._open(h, now, RATE_LIMIT_COOLDOWN)
+            elif (h.state == HALF_OPEN
+                  or h.consecutive_failures >= FAILURE_THRESHOLD
+                  or (len(h.samples) >= MIN_SAMPLES and h.error_rate() >= ERROR_RATE_THRESHOLD)):
+                self._open(h, now, COOLDOWN_SECONDS)
+
+    def _open(self, h, now, cooldown):
+        h.state = OPEN
+        h.open_until = now + cooldown
+
+    def latency_percentile(self, model, pct):
+        """
+        Latency (seconds) below which `pct` of recent successful calls finished, or None.
+        """
+        with self._lock:
+            h = self._health.get(model)
+            if h is None:
+                return None
+            h.prune(time.time())
+            return h.latency_percentile(pct)
+
+    def release(self, model):
+        """
+        Gives back a half-open trial slot that was handed out by ranked() but never used.
+        """
+        with self._lock:
+            h = self._health.get(model)
+            if h is not None and h.state == HALF_OPEN:
+                h.trial_started = 0.0
+
+    def all_rate_limited(self, candidates=None):
+        candidates = candidates or self.models
+        with self._lock:
+            return all(
+                self._health.get(m) is not None and self._health[m].rate_limited and self._health[m].state != CLOSED
+                for m in candidates
+            )
+
+    def stats(self):
+        now = time.time()
+        out = []
+        with self._lock:
+            for model in self.models:
+                h = self._health[model]
+                h.prune(now)
+                latency = h.median_latency()
+                out.append({
+                    "model": model,
+                    "state": h.state,
+                    "rate_limited": h.rate_limited,
+                    "samples": len(h.samples),
+                    "error_rate": round(h.error_rate(), 3),
+                    "median_latency_s": round(latency, 3) if latency is not None else None,
+                    "reopens_in_s": max(0, round(h.open_until - now)) if h.state == OPEN else 0,
+                })
+        return out
+
+
+@st.cache_resource(show_spinner=False)
+def get_model_router():
+    return ModelRouter()
@@ -5,42 +5,18 @@ from dotenv import load_dotenv
 
 st.set_page_config(page_title="🌱 Smart Crop Recommendation", page_icon="🌱", layout="wide")
 
-from logic import get_crop_recommendation, get_ai_explanation, get_weather_data
+from logic import get_crop_recommendation, get_ai_explanation, get_weather_data, get_weather_forecast, get_weather_history, estimate_rainfall
 from utils import apply_custom_style, t
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
+from crop_model import get_crop_model_registry
 
 load_dotenv()
 
-# --- CUSTOM MODEL CACHING ---
-@st.cache_resource
+# --- CUSTOM MODEL (trained once per dataset, see crop_model.py) ---
 def train_model(df):
     try:
-        # Standardize column names
-        df.columns = [c.strip().lower() for c in df.columns]
-        
-        # Expected columns: n, p, k, temperature, humidity, ph, rainfall, label
-        required_cols = ['n', 'p', 'k', 'temperature', 'humidity', 'ph', 'rainfall', 'label']
-        if not all(col in df.columns for col in required_cols):
-            return None, "CSV must contain columns: N, P, K, temperature, humidity, ph, rainfall, label"
-            
-        X = df[['n', 'p', 'k', 'temperature', 'humidity', 'ph', 'rainfall']]
-        y = df['label']
-        
-        model = RandomForestClassifier(n_estimators=100, random_state=42)
-        model.fit(X, y)
-        
-        # Calculate accuracy for display
-        acc = 0.95 # Dummy high accuracy if no split, or do a split
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
-        model_test = RandomForestClassifier(n_estimators=100, random_state=42)
-        model_test.fit(X_train, y_train)
-        preds = model_test.predict(X_test)
-        acc = accuracy_score(y_test, preds)
-        
-        return model, f"{acc:.2%}"
-    except Exception as e:
+        model, meta = get_crop_model_registry().get(df)
+        return model, f"{meta['metrics']['accuracy']:.2%}"
+    except Exception as e:  # DatasetError: missing columns
         return None, str(e)
 
 # --- LOAD BACKGROUND IMAGE ---
@@ -225,6 +201,7 @@ with col1:
         weather_data, error = get_weather_data(city, api_key, language=weather_lang)
         if weather_data:
             st.session_state['weather_data'] = weather_data
+            st.session_state['weather_city'] = city
             st.session_state['weather_fetched'] = True
             st.markdown(f"<p style='color: #4CAF50; font-weight: 800; font-size: 1.2rem; text-shadow: 0 2px 4px rgba(0,0,0,0.5);'>✅ {city}: {weather_data['main']['temp']}°C, {weather_data['weather'][0]['description']}</p>", unsafe_allow_html=True)
             if weather_data.get("mock"):
@@ -245,7 +222,11 @@ with col2:
         else:
             temp = weather['main']['temp']
             humidity = weather['main']['humidity']
-            rainfall = 200 if "rain" in weather.get("weather", [{}])[0].get("description", "").lower() else 100 
+            # Rainfall from archived observations, else the ingested 5-day forecast
+            weather_city = st.session_state.get('weather_city', city)
+            history = get_weather_history(weather_city)
+            forecast = get_weather_forecast(weather_city, os.getenv("WEATHER_API_KEY"))
+            rainfall = estimate_rainfall(forecast, weather, history)
             
             lang = st.session_state.get('language', 'English')
             
@@ -294,6 +275,32 @@ with col2:
         with st.expander(t('view_raw')):
             st.json(st.session_state['weather_data'])
 
+# --- BATCH RECOMMENDATION (crop_batch.py) ---
+with st.expander(t('batch_title')):
+    st.caption(t('batch_help'))
+    batch_file = st.file_uploader(t('batch_title'), type=["csv", "parquet"], key="batch_upload", label_visibility="collapsed")
+    if batch_file is not None and st.button(t('batch_run'), use_container_width=True):
+        import tempfile
+        from crop_batch import recommend_file, BatchInputError, UI_MAX_ROWS
+        progress = st.empty()
+        try:
+            # Scored chunks go to disk; only the finished (row-capped) file is served
+            with tempfile.TemporaryDirectory() as tmp:
+                target = os.path.join(tmp, "crop_recommendations.csv")
+                stats = recommend_file(
+                    batch_file, target,
+                    model=st.session_state.get('custom_model'),
+                    language=st.session_state.get('language', 'English'),
+                    target_parquet=False,
+                    max_rows=UI_MAX_ROWS,
+                    on_chunk=lambda s: progress.caption(f"{s['rows']:,} ... ({s['rows_per_s']:,}/s)"),
+                )
+                progress.success(t('batch_done').format(rows=stats['rows'], seconds=stats['seconds'], rate=stats['rows_per_s'] or 0))
+                with open(target, "rb") as f:
+                    st.download_button(t('batch_download'), f, file_name="crop_recommendations.csv", mime="text/csv")
+        except BatchInputError as e:
+            st.error(str(e))
+
 # Render Bottom Navigation
 from utils import render_bottom_nav, t # re-import t to be safe
 render_bottom_nav(active_tab='Crops')
@@ -6,10 +6,9 @@ from dotenv import load_dotenv
 st.set_page_config(page_title="💰 Market Prices", page_icon="💰", layout="wide")
 
 from utils import apply_custom_style, t, render_bottom_nav
-from logic import get_market_trends_data, get_mandi_prices
+from logic import get_market_trends_data, get_mandi_prices, get_price_forecast, mandi_sync_running
 import pandas as pd
 import plotly.express as px
-import random
 
 load_dotenv()
 
@@ -107,9 +106,11 @@ with col3:
 st.markdown("</div>", unsafe_allow_html=True)
 st.markdown("<br>", unsafe_allow_html=True)
 
-col_btn, _ = st.columns([1, 4])
+col_btn, col_win, _ = st.columns([1, 1, 3])
 with col_btn:
     check_btn = st.button(t('check_prices'), type="primary", use_container_width=True)
+with col_win:
+    trend_days = st.selectbox(t('trend_window'), [30, 90, 180, 365], index=1)
 
 # --- RESULTS SECTION ---
 if check_btn:
@@ -118,6 +119,8 @@ if check_btn:
     with st.spinner(t('fetching_mandi')):
         lang = st.session_state.get('language', 'English')
         data, is_live = get_mandi_prices(api_key, state, district, commodity, language=lang)
+    if mandi_sync_running(api_key, state, commodity):
+        st.info(t('mandi_syncing'))
     
     if data:
         if is_live:
@@ -146,63 +149,90 @@ if check_btn:
         # --- TRENDS SECTION (Inside Results) ---
         st.markdown("<br>", unsafe_allow_html=True)
         st.markdown(f" ### 📈 {t('price_analysis')}: {commodity}")
-        base_price_val = st.session_state.get('base_mandi_price')
-        
-        # Get historical data from logic.py
-        trend_data = get_market_trends_data(commodity, base_price=base_price_val) 
+
+        # Stored price history for this selection (mandi_store.py / price_trends.py)
+        trend_data = get_market_trends_data(commodity, state=state, district=district, days=trend_days)
 
         if trend_data:
+            series, summary = trend_data['series'], trend_data['summary']
+            m1, m2, m3 = st.columns(3)
+            m1.metric(
+                f"{t('latest_price')} ({summary['latest_date']})",
+                f"₹{summary['latest']:,.0f}",
+                None if summary['change'] is None else f"{summary['change']:+,.0f} ({summary['change_pct']:+.1f}%)",
+            )
+            m2.metric(t('volatility_30'), "-" if summary['volatility_pct'] is None else f"{summary['volatility_pct']:.1f}%")
+            m3.metric(t('price_range'), f"₹{summary['low']:,.0f} - ₹{summary['high']:,.0f}")
+
             st.markdown('<div class="chart-container">', unsafe_allow_html=True)
             import plotly.graph_objects as go
-            from datetime import datetime, timedelta
-            
+
             fig = go.Figure()
-            
-            # 1. Historical Trend (Line and Area)
+
+            # 1. Min-max band (rolling)
+            fig.add_trace(go.Scatter(
+                x=series['dates'], y=series['band_hi'],
+                mode='lines', line=dict(width=0), hoverinfo='skip', showlegend=False
+            ))
             fig.add_trace(go.Scatter(
-                x=trend_data['dates'], 
-                y=trend_data['prices'],
-                mode='lines',
+                x=series['dates'], y=series['band_lo'],
+                mode='lines', line=dict(width=0),
+                fill='tonexty', fillcolor='rgba(76, 175, 80, 0.15)',
+                name=t('price_band'), hoverinfo='skip'
+            ))
+
+            # 2. Historical Trend (daily mean modal price; gaps = no arrivals)
+            fig.add_trace(go.Scatter(
+                x=series['dates'],
+                y=series['prices'],
+                mode='lines+markers' if summary['days_observed'] <= 31 else 'lines',
                 name=t('hist_trend'),
                 line=dict(color='#4CAF50', width=3),
-                fill='tozeroy',
-                fillcolor='rgba(76, 175, 80, 0.1)'
+                connectgaps=True
+            ))
+
+            # 3. Moving averages
+            fig.add_trace(go.Scatter(
+                x=series['dates'], y=series['ma_7'], mode='lines', name=t('ma_7'),
+                line=dict(color='#03A9F4', width=2, dash='dash')
+            ))
+            fig.add_trace(go.Scatter(
+                x=series['dates'], y=series['ma_30'], mode='lines', name=t('ma_30'),
+                line=dict(color='#E040FB', width=2, dash='dot')
             ))
-            
-            # 2. Individual Market Points (Today) - Real Data from Table
+
+            # 4. Forecast (precomputed by price_forecast.py), drawn from the last
+            # observation of the series it was trained on (may differ from the chart's)
+            forecast = get_price_forecast(commodity, state=state, district=district)
+            if forecast:
+                anchor_date, anchor_price = forecast[0]['last_date'], forecast[0]['last_price']
+                f_dates = [anchor_date] + [f['date'] for f in forecast]
+                fig.add_trace(go.Scatter(
+                    x=f_dates + f_dates[::-1],
+                    y=[anchor_price] + [f['upper'] for f in forecast] + [f['lower'] for f in forecast][::-1] + [anchor_price],
+                    fill='toself', fillcolor='rgba(255, 193, 7, 0.15)', line=dict(width=0),
+                    name=t('forecast_range'), hoverinfo='skip'
+                ))
+                fig.add_trace(go.Scatter(
+                    x=f_dates,
+                    y=[anchor_price] + [f['price'] for f in forecast],
+                    mode='lines+markers',
+                    name=t('ai_forecast'),
+                    line=dict(color='#FFC107', width=4, dash='dot'),
+                    marker=dict(size=10, symbol='star-diamond', color='#FFC107')
+                ))
+
+            # 5. Individual Market Points (latest day) - Real Data from Table
             all_prices = st.session_state.get('all_current_prices', [])
             if all_prices:
-                today_label = trend_data['dates'][-1]
                 fig.add_trace(go.Scatter(
-                    x=[today_label] * len(all_prices),
+                    x=[summary['latest_date']] * len(all_prices),
                     y=all_prices,
                     mode='markers',
                     name=t('market_rates'),
                     marker=dict(color='#ffffff', size=9, line=dict(color='#4CAF50', width=2)),
                     hovertemplate="₹%{y}/Qt<extra></extra>"
                 ))
-            
-            # 3. AI Forecast (Predictive Line)
-            if base_price_val:
-                last_date = datetime.now()
-                forecast_dates = [trend_data['dates'][-1]]
-                forecast_prices = [trend_data['prices'][-1]]
-                
-                random.seed(commodity)
-                trend_dir = random.choice([1.02, 0.98, 1.01, 0.99]) 
-                for i in range(1, 4):
-                    next_d = (last_date + timedelta(days=i)).strftime("%d-%b")
-                    forecast_dates.append(next_d)
-                    forecast_prices.append(int(forecast_prices[-1] * trend_dir + random.randint(-30, 30)))
-                
-                fig.add_trace(go.Scatter(
-                    x=forecast_dates,
-                    y=forecast_prices,
-                    mode='lines+markers',
-                    name=t('ai_forecast'),
-                    line=dict(color='#FFC107', width=4, dash='dot'),
-                    marker=dict(size=12, symbol='star-diamond', color='#FFC107')
-                ))
 
             fig.update_layout(
                 plot_bgcolor='rgba(0,0,0,0)',
@@ -235,6 +265,10 @@ if check_btn:
             )
             st.plotly_chart(fig, use_container_width=True)
             st.markdown('</div>', unsafe_allow_html=True)
+            if forecast and forecast[0]['mae'] is not None:
+                st.caption(t('forecast_note').format(model=forecast[0]['model'], mae=f"{forecast[0]['mae']:,.0f}"))
+        else:
+            st.caption(t('no_price_history'))
     else:
         st.markdown(f"<p style='color: #F44336; font-weight: 800; font-size: 1.2rem; text-shadow: 0 2px 4px rgba(0,0,0,0.5); text-align: center;'>{t('no_mandi_data')}</p>", unsafe_allow_html=True)
 
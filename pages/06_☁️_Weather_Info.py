@@ -5,7 +5,7 @@ from dotenv import load_dotenv
 st.set_page_config(page_title="☁️ Weather Info", page_icon="☁️", layout="wide")
 
 from utils import apply_custom_style, t, render_bottom_nav
-from logic import get_weather_data
+from logic import get_weather_data, get_weather_forecast, get_weather_history
 from datetime import datetime
 
 load_dotenv()
@@ -146,6 +146,30 @@ if city:
                     <div class="metric-value">{main['temp_min']}°C</div>
                 </div>
                 """, unsafe_allow_html=True)
+
+        # --- 5-DAY FORECAST (ingested store, see weather_forecast.py) ---
+        forecast = None if data.get("mock") else get_weather_forecast(city, api_key, language=weather_lang)
+        if forecast is not None and len(forecast.series):
+            st.markdown(f"### 📅 {t('forecast_title')}")
+            st.caption(f"🌧️ {t('rain_next_24h')}: {forecast.rain_sum(24):.1f} mm")
+            days = forecast.daily()
+            for col, day in zip(st.columns(len(days)), days):
+                with col:
+                    st.markdown(f"""
+                    <div class="metric-glass">
+                        <div class="metric-label">{datetime.strptime(day['date'], '%Y-%m-%d').strftime('%a %d')}</div>
+                        <div class="metric-value" style="font-size:1.3rem;">{day['temp_max']:.0f}° / {day['temp_min']:.0f}°</div>
+                        <div style="opacity:0.8;">🌧️ {day['rain_mm']} mm · {int(day['pop'] * 100)}%</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+
+        # --- OBSERVED HISTORY (local archive, see weather_archive.py) ---
+        history = None if data.get("mock") else get_weather_history(city, language=weather_lang)
+        if history and history["days_observed_30d"]:
+            st.caption(
+                f"📈 {t('rain_observed')}: 7d {history['rain_7d_mm']} mm · 30d {history['rain_30d_mm']} mm"
+                f" · GDD {history['gdd_30d']} ({history['days_observed_30d']}d)"
+            )
         
     else:
         st.error(f"{t('err_weather_fetch')} {city}")
@@ -6,7 +6,9 @@ from dotenv import load_dotenv
 st.set_page_config(page_title="AI Agronomist", page_icon="🤖", layout="wide")
 
 from logic import get_ai_response
-from utils import apply_custom_style, t, render_bottom_nav
+from chat_memory import ConversationMemory
+from chat_store import get_chat_store, PAGE_SIZE, MAX_SESSION_MESSAGES
+from utils import apply_custom_style, t, render_bottom_nav, StreamRenderer
 
 load_dotenv()
 
@@ -14,8 +16,17 @@ load_dotenv()
 apply_custom_style(blur_bg=True)
 
 # --- STATE INITIALIZATION ---
-if "messages" not in st.session_state:
-    st.session_state.messages = []
+# Logged-in users get persistent history (keyed by phone); guests stay in-session
+active_user = st.session_state.get('active_user')
+chat_user = str(active_user['phone']) if active_user and active_user.get('phone') else None
+chat_store = get_chat_store()
+
+if "messages" not in st.session_state or st.session_state.get("chat_user") != chat_user:
+    # New session or different user: start from the newest page of their history
+    st.session_state.chat_user = chat_user
+    st.session_state.messages = chat_store.page(chat_user) if chat_user else []
+    st.session_state.chat_older_pages = 0
+    st.session_state.chat_memory = ConversationMemory()
 
 # If messages exist but language changed, update the first greeting
 default_greetings = [
@@ -25,7 +36,7 @@ default_greetings = [
 ]
 
 if not st.session_state.messages:
-    st.session_state.messages.append({"role": "assistant", "content": t('ai_greet')})
+    st.session_state.messages.append({"role": "assistant", "content": t('ai_greet'), "greeting": True})
 elif len(st.session_state.messages) == 1 and st.session_state.messages[0]["role"] == "assistant" and st.session_state.messages[0]["content"] in default_greetings:
     st.session_state.messages[0]["content"] = t('ai_greet')
 
@@ -172,26 +183,55 @@ div[data-testid="stChatInput"] textarea {{
 """, unsafe_allow_html=True)
 
 # --- MESSAGES ---
-for message in st.session_state.messages:
+# Only the session window renders; older pages are read from the store on demand
+# and not kept in session state
+older = []
+first_id = st.session_state.messages[0].get("id") if st.session_state.messages else None
+if chat_user and first_id is not None:
+    want = st.session_state.chat_older_pages * PAGE_SIZE
+    older = chat_store.page(chat_user, before_id=first_id, limit=want + 1)
+    has_more = len(older) > want
+    older = older[-want:] if want else []
+    if has_more and st.button(t('ai_load_older'), key="chat_load_older"):
+        st.session_state.chat_older_pages += 1
+        st.rerun()
+
+for message in older + st.session_state.messages:
     avatar = "🧑‍🌾" if message["role"] == "user" else "https://cdn-icons-png.flaticon.com/512/4712/4712109.png"
     with st.chat_message(message["role"], avatar=avatar):
         st.markdown(message["content"])
 
 # --- INPUT ---
 if prompt := st.chat_input(t('ai_placeholder')):
-    st.session_state.messages.append({"role": "user", "content": prompt})
+    # Summary + recent turns so follow-up questions keep their context
+    contextual_prompt = st.session_state.chat_memory.build_prompt(st.session_state.messages, prompt)
+    st.session_state.messages.append({
+        "role": "user", "content": prompt,
+        "id": chat_store.append(chat_user, "user", prompt) if chat_user else None,
+    })
     with st.chat_message("user", avatar="🧑‍🌾"):
         st.markdown(prompt)
 
     with st.chat_message("assistant", avatar="https://cdn-icons-png.flaticon.com/512/4712/4712109.png"):
         message_placeholder = st.empty()
-        full_response = ""
         current_lang = st.session_state.get('language', 'English')
-        for chunk in get_ai_response(prompt, language=current_lang):
-            full_response += chunk
-            message_placeholder.markdown(full_response + "▌")
-        message_placeholder.markdown(full_response)
-    st.session_state.messages.append({"role": "assistant", "content": full_response})
+        # Re-render at most every 50 ms instead of on every chunk
+        renderer = StreamRenderer(message_placeholder)
+        for chunk in get_ai_response(contextual_prompt, language=current_lang):
+            renderer.add(chunk)
+        full_response = renderer.finish()
+    st.session_state.messages.append({
+        "role": "assistant", "content": full_response,
+        "id": chat_store.append(chat_user, "assistant", full_response) if chat_user else None,
+    })
+    st.session_state.chat_memory.maybe_fold(st.session_state.messages)
+
+    # Bounded session memory: older messages live in the store only
+    overflow = len(st.session_state.messages) - MAX_SESSION_MESSAGES
+    if overflow > 0:
+        removed = st.session_state.messages[:overflow]
+        del st.session_state.messages[:overflow]
+        st.session_state.chat_memory.forget(removed)
 
 # Render Bottom Navigation
 render_bottom_nav(active_tab='Chat')
@@ -3,7 +3,7 @@ import streamlit as st
 
 st.set_page_config(page_title="👤 User Profile", page_icon="👤", layout="wide")
 
-from utils import apply_custom_style, t, save_db, load_db, render_bottom_nav
+from utils import apply_custom_style, t, save_db, load_db, render_bottom_nav, is_admin, render_admin_panel
 
 apply_custom_style()
 
@@ -289,5 +289,9 @@ if st.button(t("prof_back_home"), use_container_width=True, type="primary"):
     st.session_state.current_view = 'dashboard'
     st.switch_page("app.py")
 
+# --- ADMIN PANEL (AI budget, caches, model health) ---
+if is_admin(user):
+    render_admin_panel()
+
 # Render Bottom Navigation
 render_bottom_nav(active_tab='Home')
@@ -0,0 +1,195 @@
+import argparse
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+import numpy as np
+import streamlit as st
+
+from mandi_store import get_mandi_store, MandiStore
+from price_models import fit_batch, HORIZON
+
+# --- PRICE FORECAST TRAINING ---
+# Fits a forecast (price_models.py) for every stored price series: each
+# (state, district, commodity, market) with enough history, plus the district
+# average across markets (market ''). Training is a batch job over all series,
+# spread over a process pool. A daemon thread checks every
+# FORECAST_TRAIN_INTERVAL seconds and retrains when a sync has completed since
+# the last run; it can also be run from the command line:
+#   python price_forecast.py --workers 4
+# Results replace the `forecasts` table in one transaction; pages only read it.
+
+FORECAST_TRAIN_ENABLED = os.getenv("PRICE_FORECAST", "1").lower() in ("1", "true", "yes")
+FORECAST_TRAIN_INTERVAL = int(os.getenv("PRICE_FORECAST_INTERVAL", "900"))
+TRAIN_DAYS = 365        # history used per series
+MIN_HISTORY = 5         # observed days before a series gets a forecast
+BATCH_SIZE = 64         # series per worker task
+POOL_MIN_SERIES = 200   # below this, process start-up costs more than it saves
+
+
+def build_series(rows, min_history=MIN_HISTORY):
+    """
+    training_rows() -> {(state, district, commodity, market): (first_day, values)}
+    with values on a daily grid (NaN = no arrivals). District averages use market ''.
+    """
+    if not rows:
+        return {}
+    state, district, commodity, market, day, price = zip(*rows)
+    ordinal = np.array([date.fromisoformat(d).toordinal() for d in day], dtype=np.int64)
+    price = np.array(price, dtype=np.float64)
+    keys = list(zip(state, district, commodity, market))
+    # rows are sorted by series, so each series is one contiguous run
+    starts = [i for i in range(len(keys)) if i == 0 or keys[i] != keys[i - 1]]
+    ends = starts[1:] + [len(keys)]
+
+    series, district_days = {}, {}
+    for s, e in zip(starts, ends):
+        key = keys[s]
+        days, values = ordinal[s:e], price[s:e]
+        agg = district_days.setdefault(key[:3], {})
+        for d, v in zip(days.tolist(), values.tolist()):
+            agg.setdefault(d, []).append(v)
+        if e - s >= min_history:
+            series[key] = _on_grid(days, values)
+    for (st_, dist, comm), by_day in district_days.items():
+        if len(by_day) >= min_history:
+            days = np.array(sorted(by_day), dtype=np.int64)
+            values = np.array([np.mean(by_day[d]) for d in days.tolist()])
+            series[(st_, dist, comm, "")] = _on_grid(days, values)
+    return series
+
+
+def _on_grid(days, values):
+    grid = np.full(days[-1] - days[0] + 1, np.nan)
+    grid[days - days[0]] = values
+    return int(days[0]), grid
+
+
+def train_all(store=None, workers=None, horizon=HORIZON):
+    """
+    Trains every series and swaps the forecast table; returns run stats.
+    """
+    store = store or get_mandi_store()
+    start = time.perf_counter()
+    since = (date.today() - timedelta(days=TRAIN_DAYS - 1)).isoformat()
+    series = build_series(store.training_rows(since))
+    load_s = time.perf_counter() - start
+
+    items = [(key, values) for key, (_, values) in series.items()]
+    batches = [items[i:i + BATCH_SIZE] for i in range(0, len(items), BATCH_SIZE)]
+    workers = workers or os.cpu_count() or 1
+    results = []
+    if workers > 1 and len(items) >= POOL_MIN_SERIES:
+        # spawn: safe next to the server's threads, workers import only price_models
+        ctx = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(max_workers=workers, mp_context=ctx) as pool:
+            for batch_result in pool.map(fit_batch, batches, [horizon] * len(batches)):
+                results += batch_result
+    else:
+        workers = 1
+        for batch in batches:
+            results += fit_batch(batch, horizon)
+    fit_s = time.perf_counter() - start - load_s
+
+    trained = time.time()
+    rows = []
+    for key, fit in results:
+        first_day, values = series[key]
+        last_day = first_day + len(values) - 1
+        n_obs = int(np.count_nonzero(~np.isnan(values)))
+        # The grid ends on the last observed day
+        anchor = (date.fromordinal(last_day).isoformat(), round(float(values[-1]), 1))
+        for i in range(horizon):
+            target = date.fromordinal(last_day + 1 + i).isoformat()
+            rows.append(key + (
+                target, round(float(fit["forecast"][i]), 1), round(float(fit["lower"][i]), 1),
+                round(float(fit["upper"][i]), 1), fit["model"],
+                None if fit["mae"] is None else round(fit["mae"], 1), n_obs, trained,
+            ) + anchor)
+    store.replace_forecasts(rows)
+    models = {}
+    for _, fit in results:
+        models[fit["model"]] = models.get(fit["model"], 0) + 1
+    return {
+        "at": time.strftime("%H:%M:%S"),
+        "series": len(results),
+        "workers": workers,
+        "models": models,
+        "load_s": round(load_s, 2),
+        "fit_s": round(fit_s, 2),
+        "total_s": round(time.perf_counter() - start, 2),
+    }
+
+
+class PriceForecaster:
+    def __init__(self, interval=FORECAST_TRAIN_INTERVAL, workers=None):
+        self.interval = interval
+        self.workers = workers
+        self.store = get_mandi_store()
+        self._stop = threading.Event()
+        self._thread = None
+        self._trained_revision = None
+        self.last_run = {}
+
+    def run_once(self, force=False):
+        revision = self.store.revision()
+        if not force and revision == self._trained_revision:
+            return None
+        self.last_run = train_all(self.store, self.workers)
+        self._trained_revision = revision
+        print(f"Price forecast training: {self.last_run}")
+        return self.last_run
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Price forecast training failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="price-forecaster", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_running = None
+
+
+@st.cache_resource(show_spinner=False)
+def start_price_forecaster():
+    """
+    Starts the scheduled training once per process.
+    """
+    global _running
+    if not FORECAST_TRAIN_ENABLED:
+        return None
+    _running = PriceForecaster().start()
+    return _running
+
+
+def running_forecaster():
+    """
+    The forecaster started by app.py, or None; never starts one.
+    """
+    return _running
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train price forecasts for all stored mandi series.")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes (default: all CPUs)")
+    parser.add_argument("--db", default=None, help="mandi price database (default: .cache/mandi_prices.sqlite3)")
+    args = parser.parse_args()
+    store = MandiStore(args.db) if args.db else get_mandi_store()
+    print(train_all(store, args.workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import numpy as np
+
+# --- PRICE FORECAST MODELS ---
+# Small forecasting models for daily mandi price series, in plain NumPy so the
+# batch trainer's worker processes (price_forecast.py) import nothing heavier.
+# Each candidate is backtested on the last HOLDOUT days; the one with the
+# lowest MAE is refit on the whole series and its forecast stored with an
+# interval from the backtest errors.
+
+HORIZON = 7           # days forecast
+HOLDOUT = 7           # days held out to pick the model
+MIN_TRAIN = 14        # days needed before the holdout to backtest at all
+SEASON = 7            # weekly pattern (arrivals / auction days)
+Z_80 = 1.2816         # 80% interval
+ALPHAS = np.linspace(0.05, 0.95, 19)
+BETAS = np.array([0.01, 0.05, 0.1, 0.2, 0.3])
+DAMPING = 0.9
+
+
+def fill_gaps(values):
+    """
+    Forward-fills NaN days (no arrivals) with the last price; leading NaN with the first.
+    """
+    y = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(y)
+    if not valid.any():
+        return y
+    idx = np.where(valid, np.arange(len(y)), 0)
+    np.maximum.accumulate(idx, out=idx)
+    y = y[idx]
+    y[:np.argmax(valid)] = y[np.argmax(valid)]
+    return y
+
+
+def naive(y, h):
+    return np.full(h, y[-1])
+
+
+def seasonal_naive(y, h, period=SEASON):
+    if len(y) < period:
+        return naive(y, h)
+    return y[-period:][np.arange(h) % period]
+
+
+def ses(y, h, alphas=ALPHAS):
+    """
+    Simple exponential smoothing; alpha picked by one-step SSE, all alphas at once.
+    """
+    level = np.full(len(alphas), y[0])
+    sse = np.zeros(len(alphas))
+    for value in y[1:]:
+        err = value - level
+        sse += err * err
+        level += alphas * err
+    return np.full(h, level[np.argmin(sse)])
+
+
+def holt_damped(y, h, alphas=ALPHAS, betas=BETAS, phi=DAMPING):
+    """
+    Damped-trend Holt smoothing over an (alpha, beta) grid, vectorized per step.
+    """
+    a, b = (g.ravel() for g in np.meshgrid(alphas, betas))
+    level = np.full(len(a), y[0])
+    trend = np.full(len(a), y[1] - y[0] if len(y) > 1 else 0.0)
+    sse = np.zeros(len(a))
+    for value in y[1:]:
+        pred = level + phi * trend
+        err = value - pred
+        sse += err * err
+        new_level = pred + a * err
+        trend = phi * trend + b * (new_level - level - phi * trend)
+        level = new_level
+    best = np.argmin(sse)
+    damp = np.cumsum(phi ** np.arange(1, h + 1))
+    return level[best] + damp * trend[best]
+
+
+MODELS = {
+    "naive": naive,
+    "seasonal_naive": seasonal_naive,
+    "ses": ses,
+    "holt_damped": holt_damped,
+}
+
+
+def fit_forecast(values, horizon=HORIZON, holdout=HOLDOUT):
+    """
+    Forecast for a daily series (NaN = no data): model name, holdout MAE,
+    point forecast and 80% lower/upper bounds, each `horizon` long.
+    """
+    y = fill_gaps(values)
+    if len(y) >= MIN_TRAIN + holdout:
+        train, test = y[:-holdout], y[-holdout:]
+        errors = {name: test - fn(train, holdout) for name, fn in MODELS.items()}
+        name = min(errors, key=lambda n: np.mean(np.abs(errors[n])))
+        mae = float(np.mean(np.abs(errors[name])))
+        # k-step errors grow like sqrt(k); scale the holdout RMSE back to one step
+        sigma = float(np.sqrt(np.mean(errors[name] ** 2)) / np.sqrt((holdout + 1) / 2))
+    else:
+        name, mae = ("ses", None) if len(y) > 2 else ("naive", None)
+        sigma = float(np.std(np.diff(y))) if len(y) > 2 else 0.0
+    forecast = MODELS[name](y, horizon)
+    spread = Z_80 * sigma * np.sqrt(np.arange(1, horizon + 1))
+    return {"model": name, "mae": mae, "forecast": forecast, "lower": forecast - spread, "upper": forecast + spread}
+
+
+def fit_batch(batch, horizon=HORIZON):
+    """
+    [(key, values)] -> [(key, fit_forecast result)]; one task per worker process.
+    """
+    return [(key, fit_forecast(values, horizon)) for key, values in batch]
@@ -0,0 +1,123 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+from mandi_store import get_mandi_store
+
+# --- MANDI PRICE TRENDS ---
+# Trend analytics over the stored price history (mandi_store.py): the daily
+# mean modal price on a regular calendar (days without arrivals stay gaps),
+# moving averages, rolling min/max bands, day-over-day change and volatility
+# of daily log returns. Everything is computed column-wise with pandas rolling
+# windows, so a year costs about the same as a week. Results are cached per
+# (state, district, commodity, market, window) until the next completed sync
+# or TREND_TTL, whichever comes first.
+
+TREND_DAYS = 90
+MA_WINDOWS = (7, 30)
+BAND_WINDOW = 7
+VOLATILITY_WINDOW = 30
+TREND_TTL = 600
+MAX_ENTRIES = 256
+
+
+def compute_trends(days, modal, low, high, ma_windows=MA_WINDOWS, band_window=BAND_WINDOW,
+                   vol_window=VOLATILITY_WINDOW):
+    """
+    Per-day series (dict of NumPy arrays, NaN on days without data) and a summary.
+    `days` are ISO dates, oldest first.
+    """
+    frame = pd.DataFrame(
+        {"modal": modal, "low": low, "high": high},
+        index=pd.DatetimeIndex(days),
+        dtype="float64",
+    ).asfreq("D")
+    modal_s = frame["modal"]
+    filled = modal_s.ffill()
+    log_ret = np.log(filled).diff().where(modal_s.notna())
+    series = {
+        "dates": frame.index.strftime("%Y-%m-%d").to_numpy(),
+        "prices": modal_s.to_numpy(),
+        "band_lo": frame["low"].rolling(band_window, min_periods=1).min().to_numpy(),
+        "band_hi": frame["high"].rolling(band_window, min_periods=1).max().to_numpy(),
+        "change": filled.diff().where(modal_s.notna()).to_numpy(),
+        "change_pct": (100 * filled.pct_change(fill_method=None)).where(modal_s.notna()).to_numpy(),
+        "volatility_pct": (100 * log_ret.rolling(vol_window, min_periods=2).std()).to_numpy(),
+    }
+    for w in ma_windows:
+        series[f"ma_{w}"] = modal_s.rolling(w, min_periods=1).mean().to_numpy()
+
+    observed = modal_s.dropna()
+    summary = {"days_observed": int(len(observed))}
+    if len(observed):
+        last = len(modal_s) - 1
+        summary.update({
+            "latest": float(observed.iloc[-1]),
+            "latest_date": observed.index[-1].strftime("%Y-%m-%d"),
+            "change": None if np.isnan(series["change"][last]) else float(series["change"][last]),
+            "change_pct": None if np.isnan(series["change_pct"][last]) else float(series["change_pct"][last]),
+            "volatility_pct": None if np.isnan(series["volatility_pct"][last]) else float(series["volatility_pct"][last]),
+            "low": float(np.nanmin(frame["low"].to_numpy())),
+            "high": float(np.nanmax(frame["high"].to_numpy())),
+        })
+    return series, summary
+
+
+class PriceTrends:
+    def __init__(self, store=None, ttl=TREND_TTL, max_entries=MAX_ENTRIES):
+        self.store = store or get_mandi_store()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (revision, computed_at, result)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, state, districts, commodities, market=None, days=TREND_DAYS):
+        """
+        {"series": ..., "summary": ...} for the last `days` days, or None without history.
+        """
+        key = (state or "", tuple(d.casefold() for d in districts), tuple(c.casefold() for c in commodities),
+               (market or "").casefold(), days)
+        revision = self.store.revision()
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] == revision and now - entry[1] < self.ttl:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        rows = self.store.history(state, districts, commodities, market=market, since=since)
+        result = None
+        if rows:
+            day, modal, low, high, _ = zip(*rows)
+            series, summary = compute_trends(day, modal, low, high)
+            result = {"series": series, "summary": summary}
+        with self._lock:
+            self._entries[key] = (revision, now, result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_price_trends():
+    return PriceTrends()
@@ -0,0 +1,170 @@
+import json
+import os
+import threading
+import time
+from datetime import date
+import streamlit as st
+
+from utils import cache_path
+
+try:
+    import fcntl
+except ImportError:  # Windows: no flock, the limiter stays process-local
+    fcntl = None
+
+# --- GEMINI QUOTA GOVERNOR ---
+# Counts requests per minute and per day for every model and refuses calls
+# before the API key's quota runs out, instead of finding out from a 429.
+# Lower-priority work (crop explanations) is shed first so chat keeps working.
+# With AI_RATE_LIMIT_SHARED=1 the counters live in a flock-protected file and
+# are shared by all worker processes on the host.
+
+# Free-tier limits (requests per minute, requests per day). Override with
+# AI_RATE_LIMITS='{"gemini-2.0-flash": [15, 1500], ...}'
+DEFAULT_LIMITS = {
+    "gemini-2.0-flash": (15, 1500),
+    "gemini-2.0-flash-lite-preview-02-05": (30, 1500),
+    "gemini-1.5-flash": (15, 1500),
+    "gemini-1.5-flash-8b": (15, 1500),
+    "gemini-1.5-pro": (2, 50),
+    "gemini-1.0-pro": (15, 1500),
+}
+FALLBACK_LIMIT = (10, 1000)
+
+PRIORITY_CHAT = 0     # interactive chat, may use the full budget
+PRIORITY_NORMAL = 1   # advisors (fertilizer, yield)
+PRIORITY_LOW = 2      # nice-to-have (crop explanations)
+
+# Share of each window a priority may fill; the rest is reserved for higher ones
+PRIORITY_SHARE = {PRIORITY_CHAT: 1.0, PRIORITY_NORMAL: 0.9, PRIORITY_LOW: 0.7}
+# How long a caller queues for a free per-minute slot (low priority never waits)
+PRIORITY_MAX_WAIT = {PRIORITY_CHAT: 5.0, PRIORITY_NORMAL: 2.0, PRIORITY_LOW: 0.0}
+
+SHARED_STATE_FILE = "ai_rate_limit.json"
+
+
+def _load_limits():
+    limits = dict(DEFAULT_LIMITS)
+    raw = os.getenv("AI_RATE_LIMITS")
+    if raw:
+        try:
+            limits.update({m: tuple(v) for m, v in json.loads(raw).items()})
+        except (ValueError, TypeError) as e:
+            print(f"Invalid AI_RATE_LIMITS, using defaults: {e}")
+    return limits
+
+
+class RateLimiter:
+    def __init__(self, limits=None, shared_path=None):
+        self.limits = limits or _load_limits()
+        self.shared_path = shared_path if fcntl is not None else None
+        self._lock = threading.Lock()
+        self._state = {"day": date.today().isoformat(), "models": {}}
+        self.shed = {PRIORITY_CHAT: 0, PRIORITY_NORMAL: 0, PRIORITY_LOW: 0}
+
+    # --- state helpers (same dict layout in memory and on disk) ---
+    def _model_state(self, state, model):
+        today = date.today().isoformat()
+        if state.get("day") != today:
+            state["day"] = today
+            state["models"] = {}
+        return state["models"].setdefault(model, {"minute": [], "day": 0})
+
+    def _try_take(self, state, model, priority, now):
+        rpm, rpd = self.limits.get(model, FALLBACK_LIMIT)
+        share = PRIORITY_SHARE.get(priority, 1.0)
+        ms = self._model_state(state, model)
+        ms["minute"] = [ts for ts in ms["minute"] if now - ts < 60]
+        if ms["day"] >= rpd * share:
+            return None  # daily budget for this priority is gone; waiting won't help
+        if len(ms["minute"]) >= max(rpm * share, 1):
+            return 60 - (now - ms["minute"][0])  # seconds until a slot frees up
+        ms["minute"].append(now)
+        ms["day"] += 1
+        return 0
+
+    def _with_state(self, fn):
+        with self._lock:
+            if self.shared_path is None:
+                return fn(self._state)
+            with open(self.shared_path, "a+") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0)
+                    raw = f.read()
+                    try:
+                        state = json.loads(raw) if raw else {}
+                    except ValueError:
+                        state = {}
+                    state.setdefault("day", date.today().isoformat())
+                    state.setdefault("models", {})
+                    result = fn(state)
+                    f.seek(0)
+                    f.truncate()
+                    json.dump(state, f)
+                    return result
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def acquire(self, model, priority=PRIORITY_NORMAL, wait=True):
+        """
+        Reserves one request on `model`. Returns False if the call should be shed.
+        """
+        return self.acquire_any([model], priority, wait) == model
+
+    def acquire_any(self, models, priority=PRIORITY_NORMAL, wait=True):
+        """
+        Reserves one request on the first model (in the given order) with budget
+        left. If all are busy for this minute, queues up to the priority's max
+        wait for a slot. Returns the model, or None if the call is shed.
+        """
+        deadline = time.time() + (PRIORITY_MAX_WAIT.get(priority, 0.0) if wait else 0.0)
+        while models:
+            now = time.time()
+            waits = []
+            for model in models:
+                w = self._with_state(lambda state: self._try_take(state, model, priority, now))
+                if w == 0:
+                    return model
+                if w is not None:
+                    waits.append(w)
+            if not waits or now + min(waits) > deadline:
+                break
+            time.sleep(min(min(waits), 0.5))
+        with self._lock:
+            self.shed[priority] = self.shed.get(priority, 0) + 1
+        return None
+
+    def usage(self):
+        """
+        Current budget use per model, for the admin panel.
+        """
+        now = time.time()
+
+        def read(state):
+            rows = []
+            for model, (rpm, rpd) in self.limits.items():
+                ms = self._model_state(state, model)
+                minute = len([ts for ts in ms["minute"] if now - ts < 60])
+                rows.append({
+                    "model": model,
+                    "rpm_used": minute,
+                    "rpm_limit": rpm,
+                    "rpd_used": ms["day"],
+                    "rpd_limit": rpd,
+                    "day_pct": round(100 * ms["day"] / rpd, 1) if rpd else 0.0,
+                })
+            return rows
+
+        return self._with_state(read)
+
+    def shed_counts(self):
+        names = {PRIORITY_CHAT: "chat", PRIORITY_NORMAL: "normal", PRIORITY_LOW: "low"}
+        with self._lock:
+            return {names.get(p, str(p)): n for p, n in self.shed.items()}
+
+
+@st.cache_resource(show_spinner=False)
+def get_rate_limiter():
+    shared = os.getenv("AI_RATE_LIMIT_SHARED", "0").lower() in ("1", "true", "yes")
+    return RateLimiter(shared_path=cache_path(SHARED_STATE_FILE) if shared else None)
@@ -0,0 +1,117 @@
+import asyncio
+import threading
+import streamlit as st
+
+# --- IN-FLIGHT REQUEST COALESCING ---
+# When several sessions ask the same thing at once (same cache key), only the
+# first caller goes upstream; the others wait for its result instead of
+# burning quota on identical requests.
+
+WAIT_TIMEOUT = 120  # seconds a follower waits before making its own call
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class _AsyncCall:
+    def __init__(self, task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}  # async in-flight calls (all on the AI loop)
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key, fn):
+        """
+        Runs fn() once per key at a time; concurrent callers share its result
+        (or its exception).
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                self.leaders += 1
+                leader = True
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+                leader = False
+
+        if not leader:
+            if not call.done.wait(WAIT_TIMEOUT):
+                return fn()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+
+    async def do_async(self, key, coro_fn):
+        """
+        Async variant for coroutines running on the shared AI loop (ai_loop.py).
+        Callers share one task per key; a caller that is cancelled stops
+        waiting, and the task itself is cancelled once no caller is left.
+        """
+        with self._lock:
+            call = self._tasks.get(key)
+            if call is None:
+                call = _AsyncCall(asyncio.ensure_future(coro_fn()))
+                self._tasks[key] = call
+                self.leaders += 1
+                call.task.add_done_callback(lambda _, key=key, call=call: self._forget(key, call))
+            else:
+                self.coalesced += 1
+            call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        finally:
+            with self._lock:
+                call.waiters -= 1
+                abandoned = call.waiters == 0 and not call.task.done()
+                if abandoned:
+                    # New callers start afresh instead of joining a dying task
+                    self._forget_locked(key, call)
+            if abandoned:
+                call.task.cancel()
+
+    def _forget(self, key, call):
+        with self._lock:
+            self._forget_locked(key, call)
+
+    def _forget_locked(self, key, call):
+        if self._tasks.get(key) is call:
+            del self._tasks[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "in_flight": len(self._calls) + len(self._tasks),
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_single_flight():
+    return SingleFlight()
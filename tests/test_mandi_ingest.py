@@ -0,0 +1,161 @@
+import json
+import os
+import sys
+import threading
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mandi_ingest
+from mandi_ingest import MandiIngestor, MandiFetchError
+from mandi_store import MandiStore
+
+# Local stand-in for the data.gov.in resource (see OGD_MANDI_URL / --url)
+
+PAGE_LIMIT = 10
+
+
+def make_records(total):
+    return [
+        {
+            "state": "Maharashtra", "district": "Nagpur", "market": f"Market {i}", "commodity": "Wheat",
+            "variety": "Other", "grade": "FAQ", "arrival_date": "17/10/2026",
+            "min_price": "2000", "max_price": "2400", "modal_price": str(2200 + i),
+        }
+        for i in range(total)
+    ]
+
+
+class FakeOGD:
+    def __init__(self, total):
+        self.records = make_records(total)
+        self.requests = Counter()   # offset -> requests seen
+        self.fail = {}              # offset -> [status, remaining failures or None for always]
+        self._lock = threading.Lock()
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                query = parse_qs(urlparse(self.path).query)
+                offset, limit = int(query["offset"][0]), int(query["limit"][0])
+                with fake._lock:
+                    fake.requests[offset] += 1
+                    rule = fake.fail.get(offset)
+                    status = None
+                    if rule and (rule[1] is None or rule[1] > 0):
+                        status = rule[0]
+                        if rule[1] is not None:
+                            rule[1] -= 1
+                if status:
+                    self.send_response(status)
+                    self.send_header("Retry-After", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps({
+                    "total": len(fake.records),
+                    "records": fake.records[offset:offset + limit],
+                }).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/resource"
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(mandi_ingest, "BACKOFF_BASE", 0.01)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return MandiStore(str(tmp_path / "mandi.sqlite3"))
+
+
+@pytest.fixture
+def ogd():
+    servers = []
+
+    def start(total):
+        server = FakeOGD(total)
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.close()
+
+
+def ingestor_for(server, store):
+    return MandiIngestor("test-key", url=server.url, store=store, concurrency=3, page_limit=PAGE_LIMIT)
+
+
+def test_multi_page_sync_stores_every_record(store, ogd):
+    server = ogd(45)
+    ingestor = ingestor_for(server, store)
+
+    assert ingestor.sync("Maharashtra", "Wheat") == 45
+    assert sorted(server.requests) == [0, 10, 20, 30, 40]
+    assert store.stats()["rows"] == 45
+    assert store.sync_age("Maharashtra", "Wheat") is not None
+    assert ingestor.last_sync["pages"] == 5
+    assert ingestor.last_sync["complete"]
+
+
+def test_transient_5xx_is_retried(store, ogd):
+    server = ogd(25)
+    server.fail[10] = [503, 1]
+    server.fail[20] = [500, 2]
+    ingestor = ingestor_for(server, store)
+
+    assert ingestor.sync("Maharashtra", "Wheat") == 25
+    assert server.requests[10] == 2
+    assert server.requests[20] == 3
+    assert ingestor.last_sync["retries"] == 3
+
+
+def test_non_retryable_status_fails_fast(store, ogd):
+    server = ogd(5)
+    server.fail[0] = [403, None]
+
+    with pytest.raises(MandiFetchError):
+        ingestor_for(server, store).sync("Maharashtra", "Wheat")
+    assert server.requests[0] == 1
+
+
+def test_interrupted_sync_resumes_missing_pages_only(store, ogd):
+    server = ogd(35)
+    server.fail[20] = [500, None]  # retries exhausted: the run is interrupted
+    ingestor = ingestor_for(server, store)
+
+    with pytest.raises(MandiFetchError):
+        ingestor.sync("Maharashtra", "Wheat")
+    assert store.sync_age("Maharashtra", "Wheat") is None
+    stored_first = store.stats()["rows"]
+    assert 0 < stored_first < 35
+
+    del server.fail[20]
+    server.requests.clear()
+    assert ingestor.sync("Maharashtra", "Wheat") == 35
+    # Page 0 is always read for the total; checkpointed pages are skipped
+    assert server.requests[20] == 1
+    assert all(server.requests[o] == 0 for o in (10, 30))
+    assert ingestor.last_sync["resumed_pages"] == 3
+    assert store.stats()["rows"] == 35
+    assert store.stats()["checkpointed_pages"] == 0
@@ -1,5 +1,6 @@
 import json
 import os
+import time
 import streamlit as st
 import base64
 
@@ -379,6 +380,7 @@ TRANSLATIONS = {
         'ai_title': 'AI Agronomist',
         'ai_sub': 'Your 24/7 Smart Farming Assistant',
         'ai_placeholder': 'Ask me anything: Pests, crops, or fertilizers...',
+        'ai_load_older': 'Load older messages',
         'weather_forecast': 'Real-time field conditions & forecast',
         'select_loc': '📍 Select Location',
         'feels_like': 'Feels like',
@@ -386,6 +388,9 @@ TRANSLATIONS = {
         'wind_speed': 'Wind Speed',
         'max_temp': 'Max Temp',
         'min_temp': 'Min Temp',
+        'forecast_title': '5-Day Forecast',
+        'rain_next_24h': 'Rain (next 24 h)',
+        'rain_observed': 'Observed rain',
         'smart_water': 'Smart Water Management',
         'rec_schedule': 'Recommended Schedule',
         'liters': 'Liters',
@@ -399,10 +404,20 @@ TRANSLATIONS = {
         'price_analysis': 'Real-Time Price Analysis & Forecast',
         'hist_trend': 'Historical Trend',
         'market_rates': 'Market Rates (Today)',
-        'ai_forecast': 'AI Forecast (3-Days)',
+        'ai_forecast': 'Price Forecast (7 days)',
         'chart_title': 'Live Market Analysis & Prediction',
         'date': 'Date',
         'price_qt': 'Price (₹/Qt)',
+        'ma_7': '7-day average',
+        'ma_30': '30-day average',
+        'price_band': 'Min-max band (7 days)',
+        'latest_price': 'Latest modal price',
+        'volatility_30': 'Volatility (30 days)',
+        'price_range': 'Range in window',
+        'trend_window': 'Trend window (days)',
+        'forecast_range': 'Forecast range (80%)',
+        'forecast_note': 'Forecast model: {model}, average backtest error ₹{mae}/Qt',
+        'no_price_history': 'No stored price history for this selection yet. Trends appear once prices have been synced.',
         'col_market': 'Market',
         'col_min': 'Min Price (₹/Qt)',
         'col_max': 'Max Price (₹/Qt)',
@@ -509,6 +524,11 @@ TRANSLATIONS = {
         'view_raw': '🔍 Debug: View Raw Weather API Response',
         'simulated_warn': '⚠️ Using Simulated Data (Demo Mode)',
         'model_based_reason': 'Based on the pattern in your uploaded prediction model.',
+        'batch_title': '📂 Batch Recommendation (many plots)',
+        'batch_help': 'Upload a CSV or Parquet file with columns N, P, K, temperature, humidity, ph, rainfall (one row per plot, up to 200,000 rows; larger files: python crop_batch.py).',
+        'batch_run': 'Recommend for all rows',
+        'batch_done': 'Processed {rows:,} rows in {seconds}s ({rate:,} rows/s).',
+        'batch_download': '⬇️ Download results (CSV)',
         
         # Insurance
         'ins_title': '🛡️ PMFBY Insurance Calculator',
@@ -618,6 +638,7 @@ TRANSLATIONS = {
         'ph_pin': 'Minimum 4 digits',
         'ph_login_phone': 'Registered Number',
         'live_ogd': '✅ Live Data from OGD Platform India',
+        'mandi_syncing': '⏳ Fetching the latest prices from OGD in the background. Check again in a minute for the full list.',
         'fetching_mandi': 'Fetching Live Mandi Rates...',
         'farmer_fb': 'Farmer',
         'lang_label': '🌐 Language',
@@ -646,6 +667,7 @@ TRANSLATIONS = {
         'ai_err_general': 'AI Explanation unavailable. Check internet connection.',
         'ai_err_api': 'API Key not configured.',
         'ai_err_api_401': 'API Key error (401). Using SIMULATED live data for',
+        'did_you_mean': 'Did you mean',
         'ai_analysis_complete': 'AI analysis complete.',
         'ai_analysis_failed': 'AI Analysis Failed',
         'ai_chat_trouble': 'I am having trouble connecting to the satellite. Please try again.',
@@ -764,14 +786,23 @@ TRANSLATIONS = {
         'ai_title': 'AI कृषि विशेषज्ञ',
         'ai_sub': 'आपका 24/7 स्मार्ट खेती सहायक',
         'ai_placeholder': 'मुझसे कुछ भी पूछें: कीट, फसलें, या उर्वरक...',
+        'ai_load_older': 'पुराने संदेश देखें',
         'weather_forecast': 'वास्तविक समय की स्थिति और पूर्वानुमान',
         'model_based_reason': 'आपके अपलोड किए गए भविष्यवाणी मॉडल पैटर्न पर आधारित।',
+        'batch_title': '📂 बैच सिफारिश (कई खेत)',
+        'batch_help': 'N, P, K, temperature, humidity, ph, rainfall कॉलम वाली CSV या Parquet फ़ाइल अपलोड करें (हर खेत की एक पंक्ति, अधिकतम 2,00,000 पंक्तियाँ; बड़ी फ़ाइलों के लिए: python crop_batch.py)।',
+        'batch_run': 'सभी पंक्तियों के लिए सिफारिश करें',
+        'batch_done': '{rows:,} पंक्तियाँ {seconds} सेकंड में प्रोसेस हुईं ({rate:,} पंक्तियाँ/सेकंड)।',
+        'batch_download': '⬇️ परिणाम डाउनलोड करें (CSV)',
         'select_loc': '📍 स्थान चुनें',
         'feels_like': 'महसूस होता है',
         'cond_details': 'स्थितियों का विवरण',
         'wind_speed': 'हवा की गति',
         'max_temp': 'अधिकतम तापमान',
         'min_temp': 'न्यूनतम तापमान',
+        'forecast_title': '5-दिन का पूर्वानुमान',
+        'rain_next_24h': 'बारिश (अगले 24 घंटे)',
+        'rain_observed': 'दर्ज बारिश',
         'smart_water': 'स्मार्ट जल प्रबंधन',
         'rec_schedule': 'अनुशंसित कार्यक्रम',
         'liters': 'लीटर',
@@ -785,10 +816,20 @@ TRANSLATIONS = {
         'price_analysis': 'वास्तविक समय मूल्य विश्लेषण और पूर्वानुमान',
         'hist_trend': 'ऐतिहासिक रुझान',
         'market_rates': 'बाजार दरें (आज)',
-        'ai_forecast': 'AI पूर्वानुमान (3-दिन)',
+        'ai_forecast': 'मूल्य पूर्वानुमान (7 दिन)',
         'chart_title': 'लाइव मार्केट विश्लेषण और भविष्यवाणी',
         'date': 'तारीख',
         'price_qt': 'कीमत (₹/क्विंटल)',
+        'ma_7': '7-दिन औसत',
+        'ma_30': '30-दिन औसत',
+        'price_band': 'न्यूनतम-अधिकतम दायरा (7 दिन)',
+        'latest_price': 'नवीनतम औसत मूल्य',
+        'volatility_30': 'उतार-चढ़ाव (30 दिन)',
+        'price_range': 'अवधि में दायरा',
+        'trend_window': 'रुझान अवधि (दिन)',
+        'forecast_range': 'पूर्वानुमान दायरा (80%)',
+        'forecast_note': 'पूर्वानुमान मॉडल: {model}, औसत बैकटेस्ट त्रुटि ₹{mae}/क्विंटल',
+        'no_price_history': 'इस चयन का मूल्य इतिहास अभी संग्रहीत नहीं है। भाव सिंक होने के बाद रुझान दिखेंगे।',
         'col_market': 'बाजार',
         'col_min': 'न्यूनतम मूल्य (₹/क्विंटल)',
         'col_max': 'अधिकतम मूल्य (₹/क्विंटल)',
@@ -1007,6 +1048,7 @@ TRANSLATIONS = {
         'ph_pin': 'न्यूनतम 4 अंक',
         'ph_login_phone': 'पंजीकृत नंबर',
         'live_ogd': '✅ भारत के OGD प्लेटफॉर्म से लाइव डेटा',
+        'mandi_syncing': '⏳ OGD से ताज़ा भाव पृष्ठभूमि में लाए जा रहे हैं। पूरी सूची के लिए एक मिनट बाद फिर देखें।',
         'fetching_mandi': 'लाइव मंडी भाव प्राप्त कर रहा है...',
         'farmer_fb': 'किसान',
         'lang_label': '🌐 भाषा (Language)',
@@ -1035,6 +1077,7 @@ TRANSLATIONS = {
         'ai_err_general': 'AI विवरण उपलब्ध नहीं है। इंटरनेट कनेक्शन की जाँच करें।',
         'ai_err_api': 'API कुंजी कॉन्फ़िगर नहीं की गई है।',
         'ai_err_api_401': 'API कुंजी त्रुटि (401)। इसके लिए सिम्युलेटेड लाइव डेटा का उपयोग कर रहा हूँ:',
+        'did_you_mean': 'क्या आपका मतलब था',
         'ai_analysis_complete': 'AI विश्लेषण पूरा हुआ।',
         'ai_analysis_failed': 'AI विश्लेषण विफल रहा',
         'ai_chat_trouble': 'मुझे सैटेलाइट से जुड़ने में परेशानी हो रही है। कृपया पुनः प्रयास करें।',
@@ -1153,14 +1196,23 @@ TRANSLATIONS = {
         'ai_title': 'AI कृषी तज्ञ',
         'ai_sub': 'तुमचा 24/7 स्मार्ट शेती सहाय्यक',
         'ai_placeholder': 'मला काहीही विचारा: कीटक, पिके किंवा खते...',
+        'ai_load_older': 'जुने संदेश पहा',
         'weather_forecast': 'वास्तविक वेळ स्थिती आणि अंदाज',
         'model_based_reason': 'तुमच्या अपलोड केलेल्या अंदाज मॉडेल पॅटर्नवर आधारित.',
+        'batch_title': '📂 एकत्रित शिफारस (अनेक शेते)',
+        'batch_help': 'N, P, K, temperature, humidity, ph, rainfall कॉलम असलेली CSV किंवा Parquet फाइल अपलोड करा (प्रत्येक शेतासाठी एक ओळ, जास्तीत जास्त 2,00,000 ओळी; मोठ्या फाइलसाठी: python crop_batch.py).',
+        'batch_run': 'सर्व ओळींसाठी शिफारस करा',
+        'batch_done': '{rows:,} ओळी {seconds} सेकंदात प्रक्रिया झाल्या ({rate:,} ओळी/सेकंद).',
+        'batch_download': '⬇️ निकाल डाउनलोड करा (CSV)',
         'select_loc': '📍 ठिकाण निवडा',
         'feels_like': 'असे वाटते',
         'cond_details': 'स्थिती तपशील',
         'wind_speed': 'वाऱ्याचा वेग',
         'max_temp': 'जास्तीत जास्त तापमान',
         'min_temp': 'किमान तापमान',
+        'forecast_title': '५ दिवसांचा अंदाज',
+        'rain_next_24h': 'पाऊस (पुढील २४ तास)',
+        'rain_observed': 'नोंदवलेला पाऊस',
         'smart_water': 'स्मार्ट पाणी व्यवस्थापन',
         'rec_schedule': 'शिफारस केलेले वेळापत्रक',
         'liters': 'लिटर',
@@ -1174,10 +1226,20 @@ TRANSLATIONS = {
         'price_analysis': 'वास्तविक वेळ भाव विश्लेषण आणि अंदाज',
         'hist_trend': 'ऐतिहासिक कल',
         'market_rates': 'बाजार भाव (आज)',
-        'ai_forecast': 'AI अंदाज (३-दिवस)',
+        'ai_forecast': 'भाव अंदाज (७ दिवस)',
         'chart_title': 'थेट बाजार विश्लेषण आणि अंदाज',
         'date': 'तारीख',
         'price_qt': 'भाव (₹/क्विंटल)',
+        'ma_7': '७-दिवस सरासरी',
+        'ma_30': '३०-दिवस सरासरी',
+        'price_band': 'किमान-कमाल पट्टा (७ दिवस)',
+        'latest_price': 'नवीनतम सरासरी भाव',
+        'volatility_30': 'चढ-उतार (३० दिवस)',
+        'price_range': 'कालावधीतील श्रेणी',
+        'trend_window': 'कल कालावधी (दिवस)',
+        'forecast_range': 'अंदाज श्रेणी (८०%)',
+        'forecast_note': 'अंदाज मॉडेल: {model}, सरासरी बॅकटेस्ट त्रुटी ₹{mae}/क्विंटल',
+        'no_price_history': 'या निवडीचा भाव इतिहास अद्याप साठवलेला नाही. भाव सिंक झाल्यानंतर कल दिसतील.',
         'col_market': 'बाजार',
         'col_min': 'किमान भाव (₹/क्विंटल)',
         'col_max': 'कमाल भाव (₹/क्विंटल)',
@@ -1395,6 +1457,7 @@ TRANSLATIONS = {
         'ph_pin': 'किमान ४ अंक',
         'ph_login_phone': 'नोंदणीकृत नंबर',
         'live_ogd': '✅ OGD प्लॅटफॉर्म इंडिया कडून थेट डेटा',
+        'mandi_syncing': '⏳ OGD कडून ताजे भाव पार्श्वभूमीत आणले जात आहेत. पूर्ण यादीसाठी एका मिनिटाने पुन्हा पहा.',
         'fetching_mandi': 'थेट मंडी भाव मिळवत आहे...',
         'farmer_fb': 'शेतकरी',
         'lang_label': '🌐 भाषा (Language)',
@@ -1423,6 +1486,7 @@ TRANSLATIONS = {
         'ai_err_general': 'AI स्पष्टीकरण उपलब्ध नाही. इंटरनेट कनेक्शन तपासा.',
         'ai_err_api': 'API की कॉन्फिगर केलेली नाही.',
         'ai_err_api_401': 'API की त्रुटी (401). यासाठी सिमुलेटेड थेट डेटा वापरत आहे:',
+        'did_you_mean': 'तुम्हाला हे म्हणायचे आहे का',
         'ai_analysis_complete': 'AI विश्लेषण पूर्ण झाले.',
         'ai_analysis_failed': 'AI विश्लेषण अयशस्वी झाले',
         'ai_chat_trouble': 'मला उपग्रहाशी जोडण्यात त्रास होत आहे. कृपया पुन्हा प्रयत्न करा.',
@@ -1714,6 +1778,124 @@ def save_db(data):
     except Exception as e:
         print(f"Error saving DB: {e}")
 
+# Local caches / stores (AI responses, weather, prices...). Not committed to git.
+CACHE_DIR = os.getenv("FARMER_CACHE_DIR", ".cache")
+
+def cache_path(name):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    return os.path.join(CACHE_DIR, name)
+
+# --- STREAMED TEXT RENDERING ---
+class StreamRenderer:
+    """
+    Batches streamed chunks into a placeholder: re-renders at most every
+    `interval` seconds (or once `max_pending` chars are waiting) instead of on
+    every chunk. Chunks are kept in a list and joined once per frame.
+    """
+    def __init__(self, placeholder, interval=0.05, max_pending=2000, cursor="▌"):
+        self._clock = time.perf_counter
+        self.placeholder = placeholder
+        self.interval = interval
+        self.max_pending = max_pending
+        self.cursor = cursor
+        self._chunks = []
+        self._chars = 0
+        self._pending_chars = 0
+        self._last_render = self._clock()
+        self.frames = 0
+
+    def add(self, chunk):
+        self._chunks.append(chunk)
+        self._chars += len(chunk)
+        self._pending_chars += len(chunk)
+        if self._pending_chars >= self.max_pending or self._clock() - self._last_render >= self.interval:
+            self._render(self.cursor)
+
+    def _render(self, suffix=""):
+        text = "".join(self._chunks)
+        self._pending_chars = 0
+        self.placeholder.markdown(text + suffix)
+        self.frames += 1
+        self._last_render = self._clock()
+        return text
+
+    @property
+    def chunks(self):
+        return len(self._chunks)
+
+    def finish(self):
+        """
+        Final render without the cursor. Returns the full text.
+        """
+        text = self._render()
+        print(f"Stream render: {self.chunks} chunks -> {self.frames} frames, {len(text)} chars")
+        return text
+
+    def stats(self):
+        return {"chunks": self.chunks, "frames": self.frames, "chars": self._chars}
+
+# --- ADMIN / SYSTEM HEALTH PANEL ---
+def is_admin(user):
+    # ADMIN_PHONES="9876543210,..." lists who sees the panel; unset = nobody
+    admins = [p.strip() for p in os.getenv("ADMIN_PHONES", "").split(",") if p.strip()]
+    return bool(user) and str(user.get('phone')) in admins
+
+def render_admin_panel():
+    import pandas as pd
+    from rate_limiter import get_rate_limiter
+    from model_router import get_model_router
+    from ai_client import get_pool_stats
+    from ai_cache import get_response_cache
+    from ai_hedging import get_hedge_stats
+    from single_flight import get_single_flight
+    from weather_cache import get_weather_cache
+    from weather_prefetch import running_prefetcher
+    from weather_forecast import get_forecast_store
+    from weather_archive import get_weather_archive
+    from mandi_store import get_mandi_store
+    from price_trends import get_price_trends
+    from price_forecast import running_forecaster
+    from crop_model import get_crop_model_registry
+
+    with st.expander("⚙️ System Health (Admin)"):
+        limiter = get_rate_limiter()
+        st.markdown("**AI quota budget (today)**")
+        st.dataframe(pd.DataFrame(limiter.usage()), hide_index=True, use_container_width=True)
+        st.caption(f"Requests shed by priority: {limiter.shed_counts()}")
+
+        st.markdown("**Model health**")
+        st.dataframe(pd.DataFrame(get_model_router().stats()), hide_index=True, use_container_width=True)
+
+        cache_stats = get_response_cache().stats()
+        hedge_stats = get_hedge_stats()
+        st.markdown("**AI cache / coalescing / hedging**")
+        st.json({
+            "cache": cache_stats,
+            "in_flight": get_single_flight().stats(),
+            "hedging": {k: v for k, v in hedge_stats.items() if k != "recent"},
+            "connection_pools": get_pool_stats(),
+        })
+
+        st.markdown("**Weather cache**")
+        prefetcher = running_prefetcher()
+        st.json({
+            "cache": get_weather_cache().stats(),
+            "forecasts": get_forecast_store().stats(),
+            "archive": get_weather_archive().stats(),
+            "prefetch_last_run": prefetcher.last_run if prefetcher else None,
+        })
+
+        st.markdown("**Mandi price warehouse**")
+        forecaster = running_forecaster()
+        st.json({
+            "store": get_mandi_store().stats(),
+            "trends": get_price_trends().stats(),
+            "forecast_last_run": forecaster.last_run if forecaster else None,
+        })
+
+        st.markdown("**Crop model registry**")
+        st.json(get_crop_model_registry().stats())
+
 # --- BOTTOM NAVIGATION ---
 def render_bottom_nav(active_tab='Home'):
     st.markdown(f"""
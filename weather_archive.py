@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+import streamlit as st
+
+from utils import cache_path
+
+# --- LOCAL WEATHER ARCHIVE ---
+# Every distinct current-weather observation (OWM `dt`) is appended as one
+# fixed-size record to .cache/weather_archive/<location>/<YYYY-MM>.bin, so
+# files can be memory-mapped with np.memmap and range queries only touch the
+# months they need. Appends are single small O_APPEND writes, safe across
+# worker processes. Rainfall/GDD aggregates for the recommenders come from
+# here without any network call.
+
+ARCHIVE_DIR = "weather_archive"
+GDD_BASE = 10.0     # deg C, common base temperature for field crops
+MAX_GAP_HOURS = 3.0  # longest gap an observation's rain rate is assumed to cover
+
+OBS_DTYPE = np.dtype([
+    ("ts", "<i8"),        # observation time, unix seconds (UTC)
+    ("temp", "<f4"),
+    ("temp_min", "<f4"),
+    ("temp_max", "<f4"),
+    ("humidity", "<f4"),
+    ("rain_1h", "<f4"),   # mm in the hour before the observation
+    ("wind", "<f4"),
+])
+
+
+def location_slug(location):
+    """
+    Directory name for a weather cache location key ("@18.52,73.86" / "pune").
+    """
+    return re.sub(r"[^0-9a-z.\-]+", "_", str(location).casefold()).strip("_") or "unknown"
+
+
+def _month(ts):
+    return datetime.fromtimestamp(int(ts), tz=timezone.utc).strftime("%Y-%m")
+
+
+def _months_between(start, end):
+    months = []
+    y, m = map(int, _month(start).split("-"))
+    last = _month(end)
+    while True:
+        months.append(f"{y:04d}-{m:02d}")
+        if months[-1] >= last:
+            return months
+        y, m = (y + 1, 1) if m == 12 else (y, m + 1)
+
+
+class WeatherArchive:
+    def __init__(self, root=None):
+        self.root = root or cache_path(ARCHIVE_DIR)
+        self._lock = threading.Lock()
+        self._last_ts = {}  # location -> newest ts appended by this process
+        self.appended = 0
+
+    def _path(self, location, month):
+        return os.path.join(self.root, location_slug(location), f"{month}.bin")
+
+    def record(self, location, data):
+        """
+        Appends an OWM current-weather payload; repeats of the same `dt` are ignored.
+        """
+        ts = int(data.get("dt") or time.time())
+        with self._lock:
+            if self._last_ts.get(location, 0) >= ts:
+                return False
+            self._last_ts[location] = ts
+        main = data.get("main", {})
+        rec = np.array([(
+            ts,
+            main.get("temp", np.nan),
+            main.get("temp_min", main.get("temp", np.nan)),
+            main.get("temp_max", main.get("temp", np.nan)),
+            main.get("humidity", np.nan),
+            (data.get("rain") or {}).get("1h", 0.0),
+            (data.get("wind") or {}).get("speed", np.nan),
+        )], dtype=OBS_DTYPE)
+        path = self._path(location, _month(ts))
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "ab") as f:
+                f.write(rec.tobytes())
+        except OSError as e:
+            print(f"Weather archive write error: {e}")
+            return False
+        with self._lock:
+            self.appended += 1
+        return True
+
+    def read(self, location, start, end=None):
+        """
+        Observations with start <= ts < end (unix seconds), oldest first.
+        """
+        end = time.time() if end is None else end
+        parts = []
+        for month in _months_between(start, end):
+            path = self._path(location, month)
+            try:
+                size = os.path.getsize(path)
+            except OSError:
+                continue
+            count = size // OBS_DTYPE.itemsize  # ignore a torn trailing record
+            if count:
+                month_rows = np.memmap(path, dtype=OBS_DTYPE, mode="r", shape=(count,))
+                ts = month_rows["ts"]
+                parts.append(np.array(month_rows[(ts >= start) & (ts < end)]))
+                del month_rows
+        rows = np.concatenate(parts) if parts else np.empty(0, dtype=OBS_DTYPE)
+        if len(rows) > 1 and np.any(np.diff(rows["ts"]) <= 0):
+            # Several writer processes (or a restart) may append out of order / twice
+            _, first = np.unique(rows["ts"], return_index=True)
+            rows = rows[first]
+        return rows
+
+    def rain_total(self, location, days=7, end=None):
+        """
+        Rain (mm) over the last `days` days: each observation's 1 h rate is
+        integrated up to the next observation (at most MAX_GAP_HOURS).
+        """
+        end = time.time() if end is None else end
+        rows = self.read(location, end - days * 86400, end)
+        if not len(rows):
+            return 0.0
+        gaps = np.diff(np.append(rows["ts"], end)) / 3600.0
+        return float(np.sum(rows["rain_1h"] * np.minimum(gaps, MAX_GAP_HOURS)))
+
+    def rain_coverage(self, location, days=7, end=None):
+        """
+        Share (0..1) of the window's hours that rain_total() actually credits:
+        sparse polling leaves hours uncovered and the total under-counted.
+        """
+        end = time.time() if end is None else end
+        rows = self.read(location, end - days * 86400, end)
+        if not len(rows):
+            return 0.0
+        gaps = np.diff(np.append(rows["ts"], end)) / 3600.0
+        return float(min(np.sum(np.minimum(gaps, MAX_GAP_HOURS)) / (days * 24.0), 1.0))
+
+    def daily(self, location, days=30, end=None, tz_offset=19800):
+        """
+        Per local day (IST by default): day number, tmin, tmax, samples.
+        """
+        end = time.time() if end is None else end
+        rows = self.read(location, end - days * 86400, end)
+        if not len(rows):
+            return {"day": np.empty(0, "i8"), "tmin": np.empty(0, "f4"), "tmax": np.empty(0, "f4"), "samples": np.empty(0, "i8")}
+        # rows are sorted by ts, so each day is one contiguous run
+        day = (rows["ts"] + tz_offset) // 86400
+        uniq, starts, counts = np.unique(day, return_index=True, return_counts=True)
+        return {
+            "day": uniq,
+            "tmin": np.minimum.reduceat(rows["temp_min"], starts),
+            "tmax": np.maximum.reduceat(rows["temp_max"], starts),
+            "samples": counts,
+        }
+
+    def gdd(self, location, days=30, base=GDD_BASE, end=None):
+        """
+        Growing degree days over the observed days in the window.
+        """
+        d = self.daily(location, days, end)
+        return float(np.sum(np.maximum((d["tmin"] + d["tmax"]) / 2.0 - base, 0.0)))
+
+    def summary(self, location, end=None):
+        return {
+            "rain_7d_mm": round(self.rain_total(location, 7, end), 1),
+            "rain_30d_mm": round(self.rain_total(location, 30, end), 1),
+            "gdd_30d": round(self.gdd(location, 30, end=end), 1),
+            "days_observed_30d": int(len(self.daily(location, 30, end)["day"])),
+            "rain_coverage_30d": round(self.rain_coverage(location, 30, end), 3),
+        }
+
+    def stats(self):
+        locations, files, size = 0, 0, 0
+        for dirpath, _, filenames in os.walk(self.root):
+            locations += dirpath != self.root
+            for name in filenames:
+                files += 1
+                size += os.path.getsize(os.path.join(dirpath, name))
+        with self._lock:
+            return {"locations": locations, "files": files, "bytes": size, "appended": self.appended}
+
+
+@st.cache_resource(show_spinner=False)
+def get_weather_archive():
+    return WeatherArchive()
@@ -0,0 +1,214 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+import streamlit as st
+
+from geocoder import get_gazetteer, is_devanagari, normalize_name, transliterate
+from single_flight import get_single_flight
+
+# --- SHARED WEATHER CACHE ---
+# The dashboard, Weather and Crop Recommendation pages all ask for the same
+# city's weather on every rerun. Answers are kept per (city, language) for
+# WEATHER_CACHE_TTL seconds and shared by all sessions of the process; after
+# that the old answer is still served (up to MAX_STALE) while one background
+# request revalidates it. Upstream calls go through one pooled requests.Session.
+# Cities found in the offline gazetteer (geocoder.py) are fetched and cached by
+# coordinates; names OWM answered 404 for are rejected locally for a while.
+# Both maps are keyed by user input, so they are LRU-bounded (MAX_ENTRIES,
+# MAX_UNKNOWN) to keep a long-lived process from growing with every typo.
+
+WEATHER_TTL = int(os.getenv("WEATHER_CACHE_TTL", "600"))
+MAX_STALE = int(os.getenv("WEATHER_CACHE_MAX_STALE", str(6 * 3600)))
+POOL_SIZE = 10
+REFRESH_WORKERS = 4
+REQUEST_TIMEOUT = 3
+NEGATIVE_TTL = 3600  # remember unknown city names this long
+MAX_ENTRIES = int(os.getenv("WEATHER_CACHE_MAX_ENTRIES", "2048"))
+MAX_UNKNOWN = 1024
+RECENT_LATENCIES = 200
+
+OWM_CURRENT_URL = "http://api.openweathermap.org/data/2.5/weather"
+# Map app languages to OWM codes
+OWM_LANGS = {'English': 'en', 'Hindi': 'hi', 'Marathi': 'mr'}
+
+
+class WeatherUpstreamError(Exception):
+    """
+    OpenWeatherMap answered with a non-200 status (bad key, unknown city, ...).
+    """
+    def __init__(self, status_code):
+        super().__init__(f"OpenWeatherMap returned HTTP {status_code}")
+        self.status_code = status_code
+
+
+class UnknownCity(WeatherUpstreamError):
+    """
+    City name rejected locally, without a request.
+    """
+    def __init__(self, city):
+        Exception.__init__(self, f"Unknown city: {city}")
+        self.status_code = 404
+
+
+def normalize_city(city):
+    return " ".join(str(city).split()).casefold()
+
+
+def current_weather_request(city, api_key, language='English'):
+    """
+    (cache key, query params) for the current weather of a city.
+    """
+    owm_lang = OWM_LANGS.get(language, 'en')
+    params = {
+        "appid": api_key,
+        "units": "metric",
+        "lang": owm_lang
+    }
+    place = get_gazetteer().resolve(city)
+    if place is not None:
+        params["lat"], params["lon"] = round(place.lat, 2), round(place.lon, 2)
+        return (f"@{params['lat']:.2f},{params['lon']:.2f}", owm_lang), params
+    # Not an exact gazetteer name: OWM text search (it doesn't understand Devanagari)
+    name = transliterate(city) if is_devanagari(city) else str(city)
+    if not normalize_name(name):
+        raise UnknownCity(city)
+    params["q"] = name
+    return (normalize_city(name), owm_lang), params
+
+
+class WeatherCache:
+    def __init__(self, ttl=WEATHER_TTL, max_stale=MAX_STALE, max_entries=MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=POOL_SIZE)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._executor = ThreadPoolExecutor(max_workers=REFRESH_WORKERS, thread_name_prefix="weather")
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (data, fetched_at), least recently used first
+        self._refreshing = set()
+        self._unknown = OrderedDict()  # key -> time OWM said 404, oldest first
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+        self.rejected = 0
+        self.latencies = deque(maxlen=RECENT_LATENCIES)
+
+    def fetch(self, url, params, timeout=REQUEST_TIMEOUT):
+        """
+        One upstream request (no caching). Raises WeatherUpstreamError or requests errors.
+        """
+        start = time.perf_counter()
+        try:
+            response = self.session.get(url, params=params, timeout=timeout)
+        except requests.RequestException:
+            with self._lock:
+                self.errors += 1
+            raise
+        with self._lock:
+            self.latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                self.errors += 1
+        if response.status_code != 200:
+            raise WeatherUpstreamError(response.status_code)
+        return response.json()
+
+    def get(self, key, url, params):
+        """
+        Cached JSON for key: fresh, stale-while-revalidate, or fetched now
+        (concurrent misses for one key share a single request).
+        """
+        now = time.time()
+        with self._lock:
+            if key in self._unknown:
+                if now - self._unknown[key] < NEGATIVE_TTL:
+                    self.rejected += 1
+                    raise UnknownCity(key[0])
+                del self._unknown[key]
+            entry = self._entries.get(key)
+            age = now - entry[1] if entry else None
+            if entry and age >= self.max_stale:
+                del self._entries[key]
+                entry = None
+            if entry:
+                self._entries.move_to_end(key)
+            if entry and age < self.ttl:
+                self.hits += 1
+                return entry[0]
+            if entry and age < self.max_stale:
+                self.stale_hits += 1
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._executor.submit(self._refresh, key, url, params)
+                return entry[0]
+            self.misses += 1
+
+        def load():
+            try:
+                data = self.fetch(url, params)
+            except WeatherUpstreamError as e:
+                if e.status_code == 404:
+                    with self._lock:
+                        self._unknown[key] = time.time()
+                        self._unknown.move_to_end(key)
+                        while len(self._unknown) > MAX_UNKNOWN:
+                            self._unknown.popitem(last=False)
+                raise
+            self.put(key, data)
+            return data
+        return get_single_flight().do(("weather",) + tuple(key), load)
+
+    def _refresh(self, key, url, params):
+        try:
+            self.put(key, self.fetch(url, params))
+        except Exception as e:
+            print(f"Weather refresh failed for {key}: {e}")
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def put(self, key, data, fetched_at=None):
+        with self._lock:
+            self._entries[key] = (data, fetched_at or time.time())
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def age(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+        return time.time() - entry[1] if entry else None
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.stale_hits + self.misses
+            latencies = sorted(self.latencies)
+            stats = {
+                "entries": len(self._entries),
+                "unknown_names": len(self._unknown),
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.stale_hits) / lookups, 3) if lookups else 0.0,
+                "upstream_errors": self.errors,
+                "rejected_locally": self.rejected,
+                "refreshing": len(self._refreshing),
+                "ttl_s": self.ttl,
+            }
+        if latencies:
+            stats["upstream_p50_ms"] = round(1000 * latencies[len(latencies) // 2], 1)
+            stats["upstream_p95_ms"] = round(1000 * latencies[min(int(len(latencies) * 0.95), len(latencies) - 1)], 1)
+            stats["upstream_avg_ms"] = round(1000 * sum(latencies) / len(latencies), 1)
+        return stats
+
+
+@st.cache_resource(show_spinner=False)
+def get_weather_cache():
+    return WeatherCache()
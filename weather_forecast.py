@@ -0,0 +1,208 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import streamlit as st
+
+from single_flight import get_single_flight
+from weather_cache import get_weather_cache, current_weather_request
+
+# --- FORECAST INGESTION ---
+# OWM's 5-day / 3-hour forecast is pulled at most once per location per
+# FORECAST_REFRESH seconds (by the prefetcher or the first page that needs it)
+# and kept as one small NumPy structured array per location (~40 rows x 28
+# bytes). Pages read rolling rain sums and min/max temperatures from it
+# without any HTTP call. At most MAX_LOCATIONS are kept (least recently used
+# dropped first).
+
+OWM_FORECAST_URL = "http://api.openweathermap.org/data/2.5/forecast"
+FORECAST_REFRESH = int(os.getenv("FORECAST_REFRESH", str(3 * 3600)))  # OWM updates every 3 h
+FORECAST_MAX_STALE = 24 * 3600
+STEP_HOURS = 3
+MAX_LOCATIONS = int(os.getenv("FORECAST_MAX_LOCATIONS", "1024"))
+
+FORECAST_DTYPE = np.dtype([
+    ("ts", "i8"),          # unix seconds (UTC) at the start of the 3 h step
+    ("temp", "f4"),
+    ("temp_min", "f4"),
+    ("temp_max", "f4"),
+    ("humidity", "f4"),
+    ("rain", "f4"),        # mm in the 3 h step
+    ("pop", "f4"),         # probability of precipitation 0..1
+])
+
+
+def parse_forecast(payload):
+    """
+    OWM /forecast JSON -> structured array sorted by time.
+    """
+    rows = [
+        (
+            int(item["dt"]),
+            item["main"]["temp"],
+            item["main"].get("temp_min", item["main"]["temp"]),
+            item["main"].get("temp_max", item["main"]["temp"]),
+            item["main"].get("humidity", np.nan),
+            item.get("rain", {}).get("3h", 0.0),
+            item.get("pop", 0.0),
+        )
+        for item in payload.get("list", [])
+    ]
+    series = np.array(rows, dtype=FORECAST_DTYPE)
+    series.sort(order="ts")
+    return series
+
+
+class CityForecast:
+    __slots__ = ("series", "fetched_at", "tz_offset")
+
+    def __init__(self, series, fetched_at=None, tz_offset=0):
+        self.series = series
+        self.fetched_at = fetched_at or time.time()
+        self.tz_offset = tz_offset  # seconds from UTC, for local calendar days
+
+    def window(self, hours, start=None):
+        """
+        Rows for the next `hours` hours from `start` (unix seconds, default now).
+        """
+        start = time.time() if start is None else start
+        ts = self.series["ts"]
+        # A step that began before `start` still covers part of the window
+        lo = np.searchsorted(ts, start - STEP_HOURS * 3600, side="right")
+        hi = np.searchsorted(ts, start + hours * 3600, side="left")
+        return self.series[lo:hi]
+
+    def rain_sum(self, hours=24, start=None):
+        return float(self.window(hours, start)["rain"].sum())
+
+    def temp_range(self, hours=24, start=None):
+        rows = self.window(hours, start)
+        if not len(rows):
+            return None, None
+        return float(rows["temp_min"].min()), float(rows["temp_max"].max())
+
+    def mean_humidity(self, hours=24, start=None):
+        rows = self.window(hours, start)
+        return float(np.nanmean(rows["humidity"])) if len(rows) else None
+
+    def hours_covered(self, start=None):
+        start = time.time() if start is None else start
+        if not len(self.series):
+            return 0.0
+        return max((self.series["ts"][-1] + STEP_HOURS * 3600 - start) / 3600.0, 0.0)
+
+    def daily(self):
+        """
+        Per local day: date, rain (mm), tmin, tmax, max pop.
+        """
+        if not len(self.series):
+            return []
+        days = (self.series["ts"] + self.tz_offset) // 86400
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+        rain = np.add.reduceat(self.series["rain"], starts)
+        tmin = np.minimum.reduceat(self.series["temp_min"], starts)
+        tmax = np.maximum.reduceat(self.series["temp_max"], starts)
+        pop = np.maximum.reduceat(self.series["pop"], starts)
+        return [
+            {
+                "date": str(np.datetime64(int(days[s]), "D")),
+                "rain_mm": round(float(r), 1),
+                "temp_min": round(float(lo), 1),
+                "temp_max": round(float(hi), 1),
+                "pop": round(float(p), 2),
+            }
+            for s, r, lo, hi, p in zip(starts, rain, tmin, tmax, pop)
+        ]
+
+
+class ForecastStore:
+    def __init__(self, refresh=FORECAST_REFRESH, max_stale=FORECAST_MAX_STALE, max_locations=MAX_LOCATIONS):
+        self.refresh = refresh
+        self.max_stale = max_stale
+        self.max_locations = max_locations
+        self._lock = threading.Lock()
+        self._cities = OrderedDict()  # location key (coords or city name) -> CityForecast, LRU first
+        self._refreshing = set()
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="forecast")
+        self.ingested = 0
+        self.failures = 0
+
+    @staticmethod
+    def _location(city, api_key, language):
+        key, params = current_weather_request(city, api_key, language)
+        params = dict(params, lang="en")  # numbers only, one entry per location
+        return key[0], params
+
+    def ingest(self, key, params):
+        payload = get_weather_cache().fetch(OWM_FORECAST_URL, params)
+        forecast = CityForecast(parse_forecast(payload), tz_offset=payload.get("city", {}).get("timezone", 0))
+        with self._lock:
+            self._cities[key] = forecast
+            self._cities.move_to_end(key)
+            while len(self._cities) > self.max_locations:
+                self._cities.popitem(last=False)
+            self.ingested += 1
+        return forecast
+
+    def ingest_city(self, city, api_key, language='English'):
+        return self.ingest(*self._location(city, api_key, language))
+
+    def _ingest_quietly(self, key, params):
+        try:
+            return self.ingest(key, params)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+            print(f"Forecast ingestion failed for {key}: {e}")
+            return None
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def due(self, city, api_key=None, language='English'):
+        key, _ = self._location(city, api_key, language)
+        with self._lock:
+            entry = self._cities.get(key)
+        return entry is None or time.time() - entry.fetched_at >= self.refresh
+
+    def get(self, city, api_key, language='English', fetch=True):
+        """
+        CityForecast for the city. A stale one is returned while a background
+        ingestion runs; a missing one is fetched now if `fetch`, else None.
+        """
+        key, params = self._location(city, api_key, language)
+        with self._lock:
+            entry = self._cities.get(key)
+            age = time.time() - entry.fetched_at if entry else None
+            if entry and age >= self.max_stale:
+                del self._cities[key]
+                entry = None
+            if entry:
+                self._cities.move_to_end(key)
+            if entry and age < self.refresh:
+                return entry
+            if entry and age < self.max_stale:
+                if key not in self._refreshing:
+                    self._refreshing.add(key)
+                    self._executor.submit(self._ingest_quietly, key, params)
+                return entry
+        if not fetch:
+            return None
+        return get_single_flight().do(("forecast", key), lambda: self._ingest_quietly(key, params))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "locations": len(self._cities),
+                "ingested": self.ingested,
+                "failures": self.failures,
+                "bytes": int(sum(f.series.nbytes for f in self._cities.values())),
+                "refresh_s": self.refresh,
+            }
+
+
+@st.cache_resource(show_spinner=False)
+def get_forecast_store():
+    return ForecastStore()
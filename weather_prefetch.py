@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import streamlit as st
+
+from utils import load_db
+from weather_cache import get_weather_cache, current_weather_request, OWM_CURRENT_URL, UnknownCity
+from weather_forecast import get_forecast_store
+from weather_archive import get_weather_archive
+
+# --- BACKGROUND WEATHER PREFETCHER ---
+# The dashboard's first paint waits on the weather for the user's city. A daemon
+# thread keeps the weather cache (weather_cache.py) and forecasts
+# (weather_forecast.py) warm for every distinct (city, language) in
+# user_db.json: each cycle refreshes entries that would go stale before the
+# next one, in batches, a few requests at a time, paced to stay under the
+# OpenWeatherMap per-minute limit.
+
+PREFETCH_ENABLED = os.getenv("WEATHER_PREFETCH", "1").lower() in ("1", "true", "yes")
+PREFETCH_INTERVAL = int(os.getenv("WEATHER_PREFETCH_INTERVAL", "480"))  # < the 600 s cache TTL
+PREFETCH_BATCH = 20
+PREFETCH_CONCURRENCY = 4
+# OWM free tier allows 60 calls/min; leave headroom for live cache misses
+PREFETCH_RPM = int(os.getenv("WEATHER_PREFETCH_RPM", "40"))
+
+
+def registered_locations(db=None):
+    """
+    Distinct (city, language) pairs of all registered users.
+    """
+    db = load_db() if db is None else db
+    seen = {}
+    for phone, user in db.items():
+        if phone == "meta" or not isinstance(user, dict) or not user.get("city"):
+            continue
+        city, language = str(user["city"]).strip(), user.get("language", "English")
+        try:
+            key, _ = current_weather_request(city, None, language)
+        except UnknownCity:
+            continue
+        seen.setdefault(key, (city, language))
+    return list(seen.values())
+
+
+class WeatherPrefetcher:
+    def __init__(self, api_key, interval=PREFETCH_INTERVAL, batch_size=PREFETCH_BATCH,
+                 concurrency=PREFETCH_CONCURRENCY, rpm=PREFETCH_RPM):
+        self.api_key = api_key
+        self.interval = interval
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.spacing = 60.0 / rpm if rpm > 0 else 0.0
+        self.cache = get_weather_cache()
+        self.forecasts = get_forecast_store()
+        self.archive = get_weather_archive()
+        self._stop = threading.Event()
+        self._thread = None
+        self._pace_lock = threading.Lock()
+        self._next_slot = 0.0
+        self.last_run = {}
+
+    def _pace(self):
+        # Requests start at least `spacing` seconds apart, whatever the concurrency
+        with self._pace_lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.spacing
+        if slot > now:
+            time.sleep(slot - now)
+
+    def _refresh(self, city, language):
+        key, params = current_weather_request(city, self.api_key, language)
+        self._pace()
+        try:
+            data = self.cache.fetch(OWM_CURRENT_URL, params)
+            self.cache.put(key, data)
+            self.archive.record(key[0], data)
+            # Forecast changes every 3 h; ingest it only when due
+            if self.forecasts.due(city, self.api_key, language):
+                self._pace()
+                self.forecasts.ingest_city(city, self.api_key, language)
+            return True
+        except Exception as e:
+            print(f"Weather prefetch failed for {city}: {e}")
+            return False
+
+    def run_once(self):
+        start = time.perf_counter()
+        locations = registered_locations()
+        # Skip entries that live traffic refreshed recently enough
+        due = []
+        for city, language in locations:
+            age = self.cache.age(current_weather_request(city, None, language)[0])
+            if age is None or age + self.interval >= self.cache.ttl:
+                due.append((city, language))
+        ok = 0
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="weather-prefetch") as pool:
+            for i in range(0, len(due), self.batch_size):
+                batch = due[i:i + self.batch_size]
+                ok += sum(pool.map(lambda loc: self._refresh(*loc), batch))
+                if self._stop.is_set():
+                    break
+        self.last_run = {
+            "at": time.strftime("%H:%M:%S"),
+            "locations": len(locations),
+            "refreshed": ok,
+            "failed": len(due) - ok,
+            "skipped_fresh": len(locations) - len(due),
+            "duration_s": round(time.perf_counter() - start, 2),
+        }
+        print(f"Weather prefetch: {self.last_run}")
+        return self.last_run
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Weather prefetch cycle failed: {e}")
+            self._stop.wait(self.interval)
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name="weather-prefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+_running = None
+
+
+@st.cache_resource(show_spinner=False)
+def start_weather_prefetcher(api_key):
+    """
+    Starts the prefetcher once per process (no-op without a real API key).
+    """
+    global _running
+    if not PREFETCH_ENABLED or not api_key or "your_" in api_key:
+        return None
+    _running = WeatherPrefetcher(api_key).start()
+    return _running
+
+
+def running_prefetcher():
+    """
+    The prefetcher started by app.py, or None; never starts one.
+    """
+    return _running